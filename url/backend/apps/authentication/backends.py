@@ -0,0 +1,41 @@
+"""
+Authentication backends.
+
+``PooledModelBackend`` is Django's ``ModelBackend`` with password
+verification moved onto the bounded hashing pool.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import identify_hasher
+
+from .hashing import hash_pool
+
+User = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """Email/password authentication with hashing off the request thread."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway so response time does not reveal whether the
+            # account exists (mirrors ModelBackend).
+            hash_pool.make_password(password)
+            return None
+
+        if not hash_pool.check_password(password, user.password):
+            return None
+        if not self.user_can_authenticate(user):
+            return None
+
+        if identify_hasher(user.password).must_update(user.password):
+            user.password = hash_pool.make_password(password)
+            user.save(update_fields=["password"])
+        return user
@@ -0,0 +1,185 @@
+"""
+In-memory membership filter in front of the JWT token blacklist.
+
+``rest_framework_simplejwt.token_blacklist`` answers "is this jti
+blacklisted?" with a join across ``OutstandingToken`` / ``BlacklistedToken``
+on every refresh. Almost every token checked is *not* blacklisted, so each
+process keeps:
+
+• a Bloom filter of every live blacklisted jti — a negative answer is
+  definitive and skips the database entirely;
+• an exact, bounded set of recently blacklisted jtis — confirms the common
+  positive case (a rotated token being replayed) without a query.
+
+Only Bloom positives that miss the recent set fall back to the database.
+
+Processes stay in sync through two tiny values in the Django cache:
+
+• a *watermark* — the highest ``BlacklistedToken.id`` written, raised
+  atomically (``cache_set_max``). When it moves past the local one, new
+  rows are pulled with an indexed ``id > n`` range query, plus any lower
+  ids that earlier syncs skipped because their transaction had not
+  committed yet (``IdGaps``); a row committing below the published
+  watermark is picked up by the next periodic sync. This needs a shared
+  cache (Redis, required in production): with a per-process cache no
+  other worker would ever see the watermark move, so there every Bloom
+  miss runs the range query first instead — otherwise a
+  token blacklisted by another worker could be replayed here until the next
+  ``TOKEN_BLACKLIST_SYNC_SECONDS`` sync.
+• a *generation* — bumped by compaction, telling every process to rebuild
+  its filter from the live rows only.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from apps.common.bloom import BloomFilter
+from apps.common.idgaps import IdGaps
+from apps.common.utils import cache_is_shared, cache_set_max
+from core.logging import auth_logger as logger
+
+WATERMARK_CACHE_KEY = "token_blacklist:watermark"
+GENERATION_CACHE_KEY = "token_blacklist:generation"
+
+# How long an id skipped by a sync is re-read while its row may still commit.
+COMMIT_GRACE_SECONDS = 300
+
+
+class TokenBlacklistFilter:
+    """Per-process Bloom filter + recent-jti set over the blacklist tables."""
+
+    def __init__(
+        self,
+        *,
+        capacity: int,
+        error_rate: float,
+        recent_size: int,
+        sync_seconds: float,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.recent_size = recent_size
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._recent = OrderedDict()
+        self._ids = IdGaps(ttl=COMMIT_GRACE_SECONDS)
+        self._generation = None
+        self._synced_at = 0.0
+
+    # -- public API ---------------------------------------------------------
+
+    def contains(self, jti: str) -> bool:
+        """Return ``True`` if *jti* is blacklisted."""
+        state = cache.get_many([WATERMARK_CACHE_KEY, GENERATION_CACHE_KEY])
+        with self._lock:
+            # Checked under the lock: reset() may drop the filter at any time.
+            self._refresh_if_stale(state)
+            if jti not in self._bloom and not cache_is_shared():
+                self._sync()  # the watermark cannot reach this process
+            if jti not in self._bloom:
+                return False
+            if jti in self._recent:
+                return True
+        # Bloom filter hit that is not in the exact set: either an older
+        # entry or a false positive — only the database can tell.
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def record(self, blacklisted: BlacklistedToken) -> None:
+        """Add a freshly written blacklist row and publish the new watermark."""
+        with self._lock:
+            if self._bloom is None:
+                self._rebuild()
+            self._add(blacklisted.token.jti)
+        cache_set_max(WATERMARK_CACHE_KEY, blacklisted.pk)
+
+    def invalidate(self) -> None:
+        """Tell every process to rebuild its filter (used after compaction)."""
+        try:
+            cache.incr(GENERATION_CACHE_KEY)
+        except ValueError:
+            cache.set(GENERATION_CACHE_KEY, 1, None)
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop local state; the next lookup rebuilds from the database."""
+        with self._lock:
+            self._bloom = None
+            self._recent.clear()
+            self._ids.reset()
+            self._generation = None
+            self._synced_at = 0.0
+
+    # -- internals ----------------------------------------------------------
+
+    def _add(self, jti: str) -> None:
+        self._bloom.add(jti)
+        self._recent[jti] = None
+        self._recent.move_to_end(jti)
+        while len(self._recent) > self.recent_size:
+            self._recent.popitem(last=False)
+
+    def _refresh_if_stale(self, state: dict) -> None:
+        """Rebuild or sync from the published *state*; the caller holds the lock."""
+        generation = state.get(GENERATION_CACHE_KEY, 0)
+        published = state.get(WATERMARK_CACHE_KEY, 0)
+        if self._bloom is None or generation != self._generation:
+            self._rebuild(generation)
+        elif (
+            published > self._ids.watermark
+            or time.monotonic() - self._synced_at >= self.sync_seconds
+        ):
+            self._sync()
+
+    def _rebuild(self, generation: int | None = None) -> None:
+        started = time.monotonic()
+        now = timezone.now()
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=now).count()
+        self._bloom = BloomFilter(max(self.capacity, live * 2), self.error_rate)
+        self._recent.clear()
+        self._ids.reset()
+        # Expired rows are read too (their ids are not gaps) but not added.
+        rows = BlacklistedToken.objects.order_by("id").values_list(
+            "id", "token__jti", "token__expires_at"
+        )
+        for pk, jti, expires_at in rows.iterator(chunk_size=5000):
+            if expires_at > now:
+                self._add(jti)
+            self._ids.seen((pk,))
+        self._generation = cache.get(GENERATION_CACHE_KEY, 0) if generation is None else generation
+        self._synced_at = time.monotonic()
+        logger.info(
+            "Token blacklist filter rebuilt: %d entries in %.1fms",
+            len(self._bloom),
+            (time.monotonic() - started) * 1000,
+        )
+
+    def _sync(self) -> None:
+        rows = (
+            BlacklistedToken.objects
+            .filter(self._ids.lookup())
+            .order_by("id")
+            .values_list("id", "token__jti")
+        )
+        ids = []
+        for pk, jti in rows:
+            self._add(jti)
+            ids.append(pk)
+        self._ids.seen(ids)
+        if self._bloom.is_saturated:
+            self._rebuild(self._generation)
+        self._synced_at = time.monotonic()
+
+
+blacklist_filter = TokenBlacklistFilter(
+    capacity=settings.TOKEN_BLACKLIST_FILTER_CAPACITY,
+    error_rate=settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE,
+    recent_size=settings.TOKEN_BLACKLIST_RECENT_SIZE,
+    sync_seconds=settings.TOKEN_BLACKLIST_SYNC_SECONDS,
+)
@@ -0,0 +1,32 @@
+"""
+Functions run inside the password hashing pool's worker processes.
+
+Workers are spawned, not forked, so they import this module before Django
+is set up: nothing here may import models or DRF at module level.
+"""
+
+import os
+
+
+def init_worker():
+    """Configure Django in a freshly spawned worker."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.development")
+    django.setup()
+
+
+def noop() -> None:
+    """Submitted by ``PasswordHashPool.start`` to boot the workers."""
+
+
+def make_password(raw_password: str) -> str:
+    from django.contrib.auth.hashers import make_password
+
+    return make_password(raw_password)
+
+
+def check_password(raw_password: str, encoded: str) -> bool:
+    from django.contrib.auth.hashers import check_password
+
+    return check_password(raw_password, encoded)
@@ -0,0 +1,160 @@
+"""
+Bounded process pool for password hashing and verification.
+
+PBKDF2 is deliberately CPU-heavy. Running it on the request thread lets a
+login storm pin every gunicorn worker; running it in a small per-process
+pool caps how much CPU authentication can take, and the bounded admission
+queue turns overload into a fast 503 instead of an ever-growing backlog.
+
+Set ``PASSWORD_HASH_WORKERS = 0`` to hash inline (no pool).
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from core.exceptions import AuthenticationBusy
+from core.logging import auth_logger as logger
+
+from . import hash_workers
+
+
+class PasswordHashPool:
+    """
+    Run ``make_password`` / ``check_password`` in worker processes.
+
+    At most ``max_workers + max_queue`` calls are admitted at once; further
+    calls raise ``AuthenticationBusy``. A call holds its slot until its
+    worker process finishes it — including calls the request stopped
+    waiting for after ``timeout`` — so the cap bounds real CPU work.
+
+    Workers are started with the ``spawn`` method: forking a threaded
+    gunicorn worker copies locks other threads may hold. Each gunicorn
+    worker builds its own pool in ``post_worker_init`` (``start``).
+    """
+
+    def __init__(self, *, max_workers: int, max_queue: int, timeout: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._rejected = 0
+
+    # -- public API ---------------------------------------------------------
+
+    def make_password(self, raw_password: str) -> str:
+        """Return the encoded hash of *raw_password*."""
+        return self._run(hash_workers.make_password, raw_password)
+
+    def check_password(self, raw_password: str, encoded: str) -> bool:
+        """Return ``True`` if *raw_password* matches *encoded*."""
+        return self._run(hash_workers.check_password, raw_password, encoded)
+
+    def start(self) -> None:
+        """Create the pool and start its workers ahead of the first login."""
+        if self.max_workers <= 0:
+            return
+        executor = self._get_executor()
+        for _ in range(self.max_workers):
+            executor.submit(hash_workers.noop)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of pool size, queue depth and throughput counters.
+
+        ``completed`` and ``failed`` count calls the workers finished
+        (``failed``: raised, or lost with a broken pool); ``timed_out``
+        counts requests that gave up waiting.
+        """
+        with self._stats_lock:
+            pending = self._pending
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": min(pending, self.max_workers),
+                "queue_depth": max(0, pending - self.max_workers),
+                "completed": self._completed,
+                "failed": self._failed,
+                "timed_out": self._timed_out,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    # -- internals ----------------------------------------------------------
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=hash_workers.init_worker,
+                )
+            return self._executor
+
+    def _run(self, fn, *args):
+        if self.max_workers <= 0:
+            return fn(*args)  # Django is already set up in this process
+
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            logger.warning("Password hash pool saturated: %s", self.stats())
+            raise AuthenticationBusy()
+
+        with self._stats_lock:
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException as exc:
+            self._release(failed=True)
+            if isinstance(exc, BrokenProcessPool):
+                self.shutdown()
+            raise
+        # The slot is released when the worker is done, not when we stop waiting.
+        future.add_done_callback(self._on_done)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError as exc:
+            with self._stats_lock:
+                self._timed_out += 1
+            logger.warning("Password hash timed out after %ss.", self.timeout)
+            raise AuthenticationBusy() from exc
+        except BrokenProcessPool:
+            # A worker died (OOM kill etc.) — start a fresh pool next time.
+            self.shutdown()
+            raise
+
+    def _on_done(self, future) -> None:
+        self._release(failed=future.cancelled() or future.exception() is not None)
+
+    def _release(self, *, failed: bool) -> None:
+        with self._stats_lock:
+            self._pending -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+        self._slots.release()
+
+
+hash_pool = PasswordHashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+    timeout=settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,29 @@
+"""
+Purge expired JWTs from the token blacklist tables.
+
+Runs hourly as a ``run_tasks`` periodic task (``apps.authentication.tasks``);
+or run it from cron so ``OutstandingToken`` and ``BlacklistedToken`` only
+ever hold tokens that can still be presented::
+
+    python manage.py compact_token_blacklist
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.authentication import services
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding/blacklisted tokens and rebuild the blacklist filter."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Rows deleted per transaction (default: 10000).",
+        )
+
+    def handle(self, *args, **options):
+        removed = services.compact_token_blacklist(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired token(s)."))
@@ -6,6 +6,9 @@ No business logic lives here; it resides in ``services.py``.
 
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+
+from .tokens import FilteredRefreshToken
 
 User = get_user_model()
 
@@ -45,3 +48,9 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ("id", "username", "email", "date_joined")
         read_only_fields = fields
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """Token refresh/rotation backed by the in-memory blacklist filter."""
+
+    token_class = FilteredRefreshToken
@@ -6,10 +6,16 @@ functions, never the ORM directly.
 """
 
 from django.contrib.auth import authenticate, get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
 
 from core.logging import auth_logger as logger
 
+from .blacklist import blacklist_filter
+from .hashing import hash_pool
+from .tokens import FilteredRefreshToken
+
 User = get_user_model()
 
 
@@ -19,15 +25,31 @@ def register_user(*, username: str, email: str, password: str) -> User:
 
     Returns the created ``User`` instance.
     """
-    user = User.objects.create_user(
-        username=username,
-        email=email,
-        password=password,
+    user = User(
+        username=User.normalize_username(username),
+        email=User.objects.normalize_email(email),
     )
+    user.password = hash_pool.make_password(password)
+    user.save()
     logger.info("User registered: %s", email)
     return user
 
 
+def issue_tokens(*, user: User) -> dict:
+    """
+    Mint a fresh access/refresh pair for an already-verified *user*.
+
+    Used right after registration so the password is not hashed a second
+    time just to log the new user in.
+    """
+    refresh = FilteredRefreshToken.for_user(user)
+    return {
+        "access": str(refresh.access_token),
+        "refresh": str(refresh),
+        "user": user,
+    }
+
+
 def login_user(*, email: str, password: str) -> dict | None:
     """
     Authenticate and return JWT tokens.
@@ -40,13 +62,8 @@ def login_user(*, email: str, password: str) -> dict | None:
         logger.warning("Failed login attempt for email: %s", email)
         return None
 
-    refresh = RefreshToken.for_user(user)
     logger.info("User logged in: %s", email)
-    return {
-        "access": str(refresh.access_token),
-        "refresh": str(refresh),
-        "user": user,
-    }
+    return issue_tokens(user=user)
 
 
 def logout_user(*, refresh_token: str) -> bool:
@@ -56,10 +73,38 @@ def logout_user(*, refresh_token: str) -> bool:
     Returns ``True`` on success, ``False`` if the token is invalid.
     """
     try:
-        token = RefreshToken(refresh_token)
+        token = FilteredRefreshToken(refresh_token)
         token.blacklist()
         logger.info("User logged out (token blacklisted).")
         return True
     except Exception:
         logger.warning("Logout failed — invalid refresh token.")
         return False
+
+
+def compact_token_blacklist(*, batch_size: int = 10_000) -> int:
+    """
+    Purge expired outstanding tokens (and, by cascade, their blacklist rows).
+
+    Deletes in primary-key batches so a multi-million-row purge never holds
+    one long transaction, then tells every process to rebuild its blacklist
+    filter from the rows that are still live. Returns the number of
+    outstanding tokens removed.
+    """
+    now = aware_utcnow()
+    removed = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects
+            .filter(expires_at__lte=now)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        removed += len(ids)
+
+    blacklist_filter.invalidate()
+    logger.info("Token blacklist compacted: %d expired tokens removed.", removed)
+    return removed
@@ -0,0 +1,13 @@
+"""
+Authentication maintenance tasks (see ``apps.tasks``).
+"""
+
+from apps.tasks.registry import task
+
+from . import services
+
+
+@task(every=3_600, concurrency=1)
+def compact_token_blacklist() -> int:
+    """Periodic ``manage.py compact_token_blacklist``."""
+    return services.compact_token_blacklist()
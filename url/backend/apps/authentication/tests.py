@@ -2,10 +2,25 @@
 Tests for the authentication app.
 """
 
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.authentication import services
+from apps.authentication.blacklist import WATERMARK_CACHE_KEY, blacklist_filter
+from apps.authentication.hashing import PasswordHashPool, hash_pool
+from apps.authentication.tokens import FilteredRefreshToken
+from core.exceptions import AuthenticationBusy
 
 User = get_user_model()
 
@@ -28,6 +43,21 @@ class RegisterViewTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(User.objects.filter(email="test@example.com").exists())
 
+    def test_register_hashes_password_once(self):
+        data = {
+            "username": "testuser",
+            "email": "test@example.com",
+            "password": "StrongPass123!",
+            "password_confirm": "StrongPass123!",
+        }
+        with patch.object(hash_pool, "make_password", wraps=hash_pool.make_password) as make, \
+                patch.object(hash_pool, "check_password") as check:
+            response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(make.call_count, 1)
+        check.assert_not_called()
+        self.assertTrue(User.objects.get(email="test@example.com").check_password("StrongPass123!"))
+
     def test_register_password_mismatch(self):
         data = {
             "username": "testuser",
@@ -107,3 +137,143 @@ class LogoutViewTests(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
         response = self.client.post("/api/auth/logout/", {}, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TokenBlacklistFilterTests(TestCase):
+    """In-memory blacklist filter in front of the token_blacklist tables."""
+
+    def setUp(self):
+        cache.clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="StrongPass123!"
+        )
+
+    @patch("apps.authentication.blacklist.cache_is_shared", return_value=True)
+    def test_valid_token_checked_without_queries(self, _):
+        token = FilteredRefreshToken.for_user(self.user)
+        blacklist_filter.contains("warm-up")
+        with self.assertNumQueries(0):
+            FilteredRefreshToken(str(token))
+
+    def test_blacklisted_token_rejected(self):
+        token = FilteredRefreshToken.for_user(self.user)
+        token.blacklist()
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(str(token))
+
+    @patch("apps.authentication.blacklist.cache_is_shared", return_value=True)
+    def test_picks_up_rows_written_by_other_processes(self, _):
+        token = FilteredRefreshToken.for_user(self.user)
+        self.assertFalse(blacklist_filter.contains(token["jti"]))
+        # Simulate another worker blacklisting the token.
+        row = BlacklistedToken.objects.create(
+            token=OutstandingToken.objects.get(jti=token["jti"])
+        )
+        cache.set(WATERMARK_CACHE_KEY, row.pk)
+        self.assertTrue(blacklist_filter.contains(token["jti"]))
+
+    @patch("apps.authentication.blacklist.cache_is_shared", return_value=True)
+    def test_picks_up_rows_committed_below_the_watermark(self, _):
+        early, late = (FilteredRefreshToken.for_user(self.user) for _ in range(2))
+        # *early* gets the lower id but its transaction commits after *late*'s.
+        blacklist_filter.record(BlacklistedToken.objects.create(
+            id=10, token=OutstandingToken.objects.get(jti=late["jti"])
+        ))
+        self.assertFalse(blacklist_filter.contains(early["jti"]))
+        BlacklistedToken.objects.create(
+            id=9, token=OutstandingToken.objects.get(jti=early["jti"])
+        )
+        blacklist_filter._synced_at = 0.0  # due for the periodic sync
+        self.assertTrue(blacklist_filter.contains(early["jti"]))
+
+    def test_misses_are_confirmed_without_a_shared_cache(self):
+        token = FilteredRefreshToken.for_user(self.user)
+        self.assertFalse(blacklist_filter.contains(token["jti"]))
+        # Another worker blacklists it; its watermark never reaches this
+        # process's LocMem cache.
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token["jti"]))
+        self.assertTrue(blacklist_filter.contains(token["jti"]))
+
+    def test_reset_during_lookups(self):
+        blacklist_filter.contains("warm-up")
+        stop = threading.Event()
+
+        def keep_resetting():
+            while not stop.is_set():
+                blacklist_filter.reset()
+
+        resetter = threading.Thread(target=keep_resetting)
+        resetter.start()
+        try:
+            for _ in range(200):
+                self.assertFalse(blacklist_filter.contains("never-blacklisted"))
+        finally:
+            stop.set()
+            resetter.join()
+
+    def test_compaction_purges_expired_tokens(self):
+        expired = OutstandingToken.objects.create(
+            user=self.user,
+            jti="expired-jti",
+            token="x",
+            expires_at=timezone.now() - timedelta(days=1),
+        )
+        BlacklistedToken.objects.create(token=expired)
+        live = FilteredRefreshToken.for_user(self.user)
+
+        removed = services.compact_token_blacklist(batch_size=1)
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertTrue(OutstandingToken.objects.filter(jti=live["jti"]).exists())
+        self.assertFalse(blacklist_filter.contains("expired-jti"))
+
+
+class PasswordHashPoolTests(TestCase):
+    """Bounded process pool for password hashing."""
+
+    def _settled(self, pool):
+        """``pool.stats()`` once no call is pending (done callbacks run last)."""
+        deadline = time.monotonic() + 10
+        while pool.stats()["in_flight"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return pool.stats()
+
+    def test_hash_and_verify_in_pool(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=1, timeout=30)
+        self.addCleanup(pool.shutdown)
+        encoded = pool.make_password("StrongPass123!")
+        self.assertTrue(pool.check_password("StrongPass123!", encoded))
+        self.assertFalse(pool.check_password("wrong", encoded))
+        self.assertEqual(self._settled(pool)["completed"], 3)
+
+    def test_failures_are_counted_apart(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=0, timeout=30)
+        self.addCleanup(pool.shutdown)
+        with self.assertRaises(ValueError):
+            pool._run(int, "not a number")
+        stats = self._settled(pool)
+        self.assertEqual((stats["completed"], stats["failed"]), (0, 1))
+
+    def test_timed_out_calls_keep_their_slot(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=0, timeout=0.05)
+        self.addCleanup(pool.shutdown)
+        pool.start()
+        with self.assertLogs("apps.authentication", level="WARNING"):
+            with self.assertRaises(AuthenticationBusy):
+                pool._run(time.sleep, 1)
+            # Still hashing in the worker: no new call may start.
+            with self.assertRaises(AuthenticationBusy):
+                pool.make_password("StrongPass123!")
+        stats = self._settled(pool)
+        self.assertEqual((stats["timed_out"], stats["completed"]), (1, 1))
+        pool.timeout = 30
+        self.assertTrue(pool.make_password("StrongPass123!"))
+
+    def test_rejects_when_saturated(self):
+        pool = PasswordHashPool(max_workers=1, max_queue=0, timeout=30)
+        pool._slots.acquire()
+        with self.assertRaises(AuthenticationBusy):
+            pool.make_password("StrongPass123!")
+        self.assertEqual(pool.stats()["rejected"], 1)
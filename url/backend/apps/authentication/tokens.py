@@ -0,0 +1,28 @@
+"""
+JWT token classes.
+
+``FilteredRefreshToken`` answers blacklist checks from the in-memory
+``blacklist_filter`` instead of querying the token_blacklist tables on
+every refresh.
+"""
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import blacklist_filter
+
+
+class FilteredRefreshToken(RefreshToken):
+    """Refresh token whose blacklist membership is checked in memory first."""
+
+    def check_blacklist(self) -> None:
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_filter.contains(jti):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        blacklisted, created = super().blacklist()
+        blacklist_filter.record(blacklisted)
+        return blacklisted, created
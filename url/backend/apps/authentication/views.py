@@ -28,11 +28,9 @@ class RegisterView(APIView):
             password=serializer.validated_data["password"],
         )
         
-        # Auto-login after registration
-        login_result = services.login_user(
-            email=serializer.validated_data["email"],
-            password=serializer.validated_data["password"]
-        )
+        # Auto-login after registration — the user was just created, so
+        # issue tokens directly instead of re-hashing the password.
+        login_result = services.issue_tokens(user=user)
         
         response = Response(
             {
@@ -0,0 +1,86 @@
+"""
+Bloom filter — a fixed-memory, probabilistic set.
+
+Used to answer "definitely not present" membership questions in memory
+before falling back to the database. False positives are possible (at
+roughly *error_rate*), false negatives are not.
+"""
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    A classic Bloom filter backed by a ``bytearray``.
+
+    Parameters
+    ----------
+    capacity : int
+        Expected number of items. The filter keeps working past this size
+        but its false-positive rate climbs.
+    error_rate : float
+        Target false-positive probability at *capacity* items.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if capacity <= 0:
+            raise ValueError("Bloom filter capacity must be positive.")
+        if not 0 < error_rate < 1:
+            raise ValueError("Bloom filter error_rate must be between 0 and 1.")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, item: str):
+        # Kirsch–Mitzenmacher double hashing: k positions from one digest.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> bool:
+        """
+        Add *item* to the filter.
+
+        Returns ``False`` if *item* was (probably) already present, in which
+        case it is not counted again.
+        """
+        added = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self._bits[pos >> 3] & mask:
+                self._bits[pos >> 3] |= mask
+                added = True
+        if added:
+            self._count += 1
+        return added
+
+    def update(self, items) -> None:
+        """Add every item of the iterable *items*."""
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item)
+        )
+
+    def __len__(self) -> int:
+        """Approximate number of distinct items added."""
+        return self._count
+
+    def clear(self) -> None:
+        """Remove every item."""
+        self._bits = bytearray(len(self._bits))
+        self._count = 0
+
+    @property
+    def is_saturated(self) -> bool:
+        """``True`` once more than *capacity* items have been added."""
+        return self._count > self.capacity
@@ -0,0 +1,26 @@
+"""
+Deployment checks (``python manage.py check --deploy``).
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .utils import cache_is_shared
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [
+        Error(
+            f"CACHES['default'] uses {settings.CACHES['default']['BACKEND']}, which is "
+            "private to each process.",
+            hint=(
+                "Workers publish read-your-writes pins, token blacklist "
+                "watermarks and throttle counters through the cache; set "
+                "REDIS_URL (config/settings/production.py)."
+            ),
+            id="common.E001",
+        )
+    ]
@@ -11,8 +11,49 @@ place and imported anywhere.
 BASE62_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
 SHORT_KEY_LENGTH = 7
 SHORT_KEY_MAX_RETRIES = 5
+SHORT_KEY_MIN_LENGTH = 3
+SHORT_KEY_MAX_LENGTH = 20
 SHORT_KEY_REGEX = r"^[A-Za-z0-9]+$"
 
+# ---------------------------------------------------------------------------
+# Custom short domains
+# ---------------------------------------------------------------------------
+# A lowercase DNS hostname with at least two labels (no port, no trailing dot).
+SHORT_DOMAIN_REGEX = (
+    r"^(?=.{4,253}$)([a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z][a-z0-9-]{0,61}[a-z0-9]$"
+)
+
+# ---------------------------------------------------------------------------
+# Idempotency
+# ---------------------------------------------------------------------------
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# ---------------------------------------------------------------------------
+# Account analytics
+# ---------------------------------------------------------------------------
+ACCOUNT_ANALYTICS_DEFAULT_DAYS = 30
+ACCOUNT_ANALYTICS_MAX_DAYS = 365
+ACCOUNT_ANALYTICS_DEFAULT_TOP = 10
+ACCOUNT_ANALYTICS_MAX_TOP = 50
+
+# ---------------------------------------------------------------------------
+# Per-link click time series
+# ---------------------------------------------------------------------------
+TIMESERIES_DEFAULT_DAYS = 30
+TIMESERIES_MAX_BUCKETS = 10_000  # a leap year by hour is 8,784
+
+# ---------------------------------------------------------------------------
+# Top-links leaderboard
+# ---------------------------------------------------------------------------
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+# ---------------------------------------------------------------------------
+# Destination health checks
+# ---------------------------------------------------------------------------
+LINK_HEALTH_MAX_REDIRECTS = 5
+LINK_HEALTH_USER_AGENT = "url-shortener-link-checker/1.0"
+
 # ---------------------------------------------------------------------------
 # Pagination
 # ---------------------------------------------------------------------------
@@ -30,6 +71,7 @@ THROTTLE_ANON_BURST = "anon_burst"
 THROTTLE_ANON_SUSTAINED = "anon_sustained"
 THROTTLE_USER_BURST = "user_burst"
 THROTTLE_USER_SUSTAINED = "user_sustained"
+THROTTLE_REDIRECT_NOT_FOUND = "redirect_not_found"
 
 # ---------------------------------------------------------------------------
 # QR code
@@ -0,0 +1,57 @@
+"""
+Incremental ``id > n`` syncs that do not skip late commits.
+
+Ids are handed out at insert but rows only become visible at commit, so a
+row can appear *below* an id that a sync has already read past — a plain
+``id > watermark`` query would never return it. ``IdGaps`` remembers the
+ids each read skipped over and keeps re-reading them until they show up
+or are older than ``ttl`` (by then the insert was rolled back, or its
+transaction ran far longer than any request).
+"""
+
+import time
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+
+class IdGaps:
+    """Watermark plus the not-yet-seen id ranges below it."""
+
+    def __init__(self, *, ttl: float):
+        self.ttl = ttl
+        self.watermark = 0
+        self._gaps = []  # [first, last, noticed_at] id ranges not read yet
+
+    def reset(self) -> None:
+        self.watermark = 0
+        self._gaps.clear()
+
+    def lookup(self) -> Q:
+        """Rows for the next read: past the watermark, or in a gap still awaited."""
+        now = time.monotonic()
+        self._gaps = [gap for gap in self._gaps if now - gap[2] < self.ttl]
+        return reduce(
+            or_,
+            (Q(id__range=(first, last)) for first, last, _ in self._gaps),
+            Q(id__gt=self.watermark),
+        )
+
+    def seen(self, ids) -> None:
+        """Record the ids returned by a ``lookup()`` read."""
+        now = time.monotonic()
+        for pk in sorted(ids):
+            if pk > self.watermark:
+                if pk > self.watermark + 1:
+                    self._gaps.append([self.watermark + 1, pk - 1, now])
+                self.watermark = pk
+            else:
+                self._fill(pk)
+
+    def _fill(self, pk: int) -> None:
+        for index, (first, last, noticed_at) in enumerate(self._gaps):
+            if first <= pk <= last:
+                rest = [[first, pk - 1, noticed_at], [pk + 1, last, noticed_at]]
+                self._gaps[index:index + 1] = [gap for gap in rest if gap[0] <= gap[1]]
+                return
@@ -0,0 +1,77 @@
+"""
+Benchmark DRF's timestamp-history throttle against the sliding-window
+counter throttle on each counter store::
+
+    python manage.py bench_throttles --requests 20000 --clients 10
+"""
+
+import os
+import tempfile
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import AnonRateThrottle
+
+from core.counters import CacheCounterStore, SharedMemoryCounterStore
+from core.throttling import SlidingWindowThrottleMixin
+
+
+class Command(BaseCommand):
+    help = "Compare throttle implementations (requests/sec per check)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20_000)
+        parser.add_argument("--clients", type=int, default=10)
+        parser.add_argument(
+            "--rate",
+            default="5000/hour",
+            help="Throttle rate; high limits make DRF's history lists long.",
+        )
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        requests = [
+            factory.get("/", REMOTE_ADDR=f"10.0.0.{i % options['clients']}")
+            for i in range(options["requests"])
+        ]
+        for request in requests:
+            request.user = AnonymousUser()
+        rate = options["rate"]
+        shm_path = os.path.join(tempfile.mkdtemp(), "bench-throttle.bin")
+
+        class StockThrottle(AnonRateThrottle):
+            pass
+
+        class CacheThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
+            store = CacheCounterStore("default")
+
+            def get_store(self):
+                return self.store
+
+        class SharedMemoryThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
+            store = SharedMemoryCounterStore(shm_path)
+
+            def get_store(self):
+                return self.store
+
+        for name, throttle_class in (
+            ("drf history list", StockThrottle),
+            ("sliding window / cache", CacheThrottle),
+            ("sliding window / shared memory", SharedMemoryThrottle),
+        ):
+            caches["default"].clear()
+            throttle_class.rate = rate
+            throttle = throttle_class()
+            allowed = 0
+            started = time.perf_counter()
+            for request in requests:
+                allowed += throttle.allow_request(request, None)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name:32} {len(requests) / elapsed:>12,.0f} req/s  "
+                f"({elapsed * 1e6 / len(requests):.1f} µs/check, {allowed} allowed)"
+            )
+        os.remove(shm_path)
@@ -2,12 +2,22 @@
 Tests for the common app — Base62 encoding and key generation.
 """
 
-from unittest.mock import patch
+import threading
+from unittest.mock import MagicMock, patch
 
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
 from django.test import TestCase
 
+from apps.common.bloom import BloomFilter
 from apps.common.constants import BASE62_ALPHABET, SHORT_KEY_LENGTH
-from apps.common.utils import base62_decode, base62_encode, generate_short_key, get_client_ip
+from apps.common.utils import (
+    base62_decode,
+    base62_encode,
+    cache_set_max,
+    generate_short_key,
+    get_client_ip,
+)
 
 
 class Base62Tests(TestCase):
@@ -79,3 +89,62 @@ class GetClientIPTests(TestCase):
             }
 
         self.assertEqual(get_client_ip(FakeRequest()), "203.0.113.1")
+
+
+class BloomFilterTests(TestCase):
+    """Test the fixed-memory membership filter."""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f"key-{i}" for i in range(1000)]
+        bloom.update(keys)
+        self.assertTrue(all(key in bloom for key in keys))
+        self.assertGreater(len(bloom), 980)
+
+    def test_re_adding_is_not_counted(self):
+        bloom = BloomFilter(10)
+        self.assertTrue(bloom.add("abc"))
+        self.assertFalse(bloom.add("abc"))
+        self.assertEqual(len(bloom), 1)
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(1000, 0.01)
+        bloom.update(f"key-{i}" for i in range(1000))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_clear(self):
+        bloom = BloomFilter(10)
+        bloom.add("abc")
+        bloom.clear()
+        self.assertNotIn("abc", bloom)
+
+
+class CacheSetMaxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_writers_keep_the_largest(self):
+        threads = [
+            threading.Thread(target=cache_set_max, args=("max-key", value))
+            for value in (5, 50, 3, 40, 7, 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.get("max-key"), 50)
+        cache_set_max("max-key", 10)
+        self.assertEqual(cache.get("max-key"), 50)
+
+    def test_redis_compares_and_sets_in_one_script(self):
+        redis_cache = MagicMock(spec=RedisCache)
+        redis_cache.add.return_value = False
+        redis_cache.make_and_validate_key.return_value = ":1:max-key"
+        with patch("apps.common.utils.caches", {"default": redis_cache}):
+            cache_set_max("max-key", 7)
+        client = redis_cache._cache.get_client.return_value
+        script, numkeys, key, value = client.eval.call_args.args
+        self.assertIn("redis.call('SET'", script)
+        self.assertEqual((numkeys, key, value), (1, ":1:max-key", 7))
+        redis_cache.set.assert_not_called()
@@ -5,13 +5,17 @@ Utility functions shared across apps.
 • Collision-safe short key generation
 • IP address extraction from request
 • QR code generation
+• Shared-cache detection and an atomic cached maximum
 """
 
 import io
 import random
+import threading
 
 import qrcode
 from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
 
 from .constants import (
     BASE62_ALPHABET,
@@ -65,6 +69,7 @@ def generate_short_key(
     exists_fn: callable,
     length: int = SHORT_KEY_LENGTH,
     max_retries: int = SHORT_KEY_MAX_RETRIES,
+    accept_fn: callable = None,
 ) -> str:
     """
     Generate a collision-safe short key.
@@ -79,6 +84,10 @@ def generate_short_key(
         Desired character length of the generated key.
     max_retries : int
         Number of retries before raising an error.
+    accept_fn : callable, optional
+        Restricts candidates to keys for which it returns ``True`` (e.g.
+        keys that hash to a given shard). Rejected candidates are redrawn
+        locally and do not count as retries.
 
     Returns
     -------
@@ -90,10 +99,10 @@ def generate_short_key(
     RuntimeError
         If a unique key cannot be generated within *max_retries* attempts.
     """
-    upper_bound = len(BASE62_ALPHABET) ** length
     for _ in range(max_retries):
-        number = random.randint(0, upper_bound - 1)
-        key = base62_encode(number).ljust(length, BASE62_ALPHABET[0])[:length]
+        key = random_short_key(length)
+        while accept_fn is not None and not accept_fn(key):
+            key = random_short_key(length)
         if not exists_fn(key):
             return key
     raise RuntimeError(
@@ -101,6 +110,12 @@ def generate_short_key(
     )
 
 
+def random_short_key(length: int = SHORT_KEY_LENGTH) -> str:
+    """Return a random Base62 key of *length* characters (not checked for uniqueness)."""
+    number = random.randint(0, len(BASE62_ALPHABET) ** length - 1)
+    return base62_encode(number).ljust(length, BASE62_ALPHABET[0])[:length]
+
+
 # ---------------------------------------------------------------------------
 # IP extraction
 # ---------------------------------------------------------------------------
@@ -138,7 +153,41 @@ def generate_qr_code(url: str) -> bytes:
     return buffer.getvalue()
 
 
-def build_short_url(short_key: str) -> str:
-    """Build the full short URL from the short key using the configured base."""
-    base = settings.SHORT_URL_BASE.rstrip("/")
-    return f"{base}/{short_key}"
+# Cache backends whose entries are private to one process.
+PROCESS_LOCAL_CACHE_BACKENDS = frozenset({
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+})
+
+
+def cache_is_shared(alias: str = "default") -> bool:
+    """Whether cache *alias* is visible to every process (Redis, Memcached, …)."""
+    return settings.CACHES[alias]["BACKEND"] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+# Raises KEYS[1] to ARGV[1] unless it already holds a larger integer.
+_CACHE_MAX_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]))
+if not current or current < tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+"""
+_cache_max_lock = threading.Lock()
+
+
+def cache_set_max(key: str, value: int, alias: str = "default") -> None:
+    """
+    Raise the integer at cache *key* to *value* unless it is already
+    higher, without losing a concurrent larger write: one Lua script on
+    Redis, a lock around get/set for process-local caches.
+    """
+    backend = caches[alias]
+    if backend.add(key, value, None):
+        return
+    if isinstance(backend, RedisCache):
+        client = backend._cache.get_client(key, write=True)
+        client.eval(_CACHE_MAX_SCRIPT, 1, backend.make_and_validate_key(key), value)
+        return
+    with _cache_max_lock:
+        if backend.get(key, 0) < value:
+            backend.set(key, value, None)
@@ -1,16 +1,181 @@
+"""
+Admin for the shortener tables.
+
+``click_events`` (and, to a lesser degree, ``short_urls``) can hold hundreds
+of millions of rows, so every changelist here avoids work proportional to
+table size: related objects are joined rather than fetched per row, counts
+are capped (``EstimatedCountPaginator``), filters and searches only use
+indexed columns, and a link's clicks are shown a page at a time.
+
+With several ``SHORT_URL_SHARDS``, the changelists of the sharded tables
+(links, clicks, leaderboard entries, destinations) read one shard at a
+time, picked with the *shard* filter (the first shard by default). Merging
+pages across databases would defeat the capped counts and keyset-friendly
+ordering above. Change, delete and history pages look the object up on
+every shard, so links from the API and ``all_clicks`` keep working.
+"""
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from django.utils.html import format_html
+
+from core.db.estimates import EstimatedCountPaginator
+
+from .models import ClickEvent, Destination, LeaderboardEntry, ShortDomain, ShortURL
+
+CLICKS_PAGE_PARAM = "clicks_page"
+SHARD_PARAM = "shard"
+
+
+def selected_shard(request) -> str:
+    """The shard a sharded changelist reads (``?shard=``, else the first)."""
+    shard = request.GET.get(SHARD_PARAM)
+    return shard if shard in settings.SHORT_URL_SHARDS else settings.SHORT_URL_SHARDS[0]
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Which ``SHORT_URL_SHARDS`` database the changelist reads — exactly one."""
+
+    title = "shard"
+    parameter_name = SHARD_PARAM
+
+    def __init__(self, request, params, model, model_admin):
+        self.selected = selected_shard(request)
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return [(shard, shard) for shard in settings.SHORT_URL_SHARDS]
+
+    def choices(self, changelist):
+        # No "All" entry: one shard is always selected.
+        for shard, title in self.lookup_choices:
+            yield {
+                "selected": shard == self.selected,
+                "query_string": changelist.get_query_string({self.parameter_name: shard}),
+                "display": title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset  # already routed by ShardedAdminMixin.get_queryset
+
+
+class ShardedAdminMixin:
+    """Read the selected shard in changelists and find objects on any shard."""
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if len(settings.SHORT_URL_SHARDS) > 1:
+            return (ShardFilter, *list_filter)
+        return list_filter
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).using(selected_shard(request))
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        if obj is not None:
+            # The object's link and destination live on its shard.
+            for field in form.base_fields.values():
+                queryset = getattr(field, "queryset", None)
+                if queryset is not None and queryset.model in (ShortURL, Destination):
+                    field.queryset = queryset.using(obj._state.db)
+                    field.widget.db = obj._state.db
+        return form
+
+    def get_object(self, request, object_id, from_field=None):
+        queryset = self.get_queryset(request)
+        model = queryset.model
+        field = model._meta.pk if from_field is None else model._meta.get_field(from_field)
+        try:
+            object_id = field.to_python(object_id)
+        except ValidationError:
+            return None
+        for shard in settings.SHORT_URL_SHARDS:
+            obj = queryset.using(shard).filter(**{field.name: object_id}).first()
+            if obj is not None:
+                return obj
+        return None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist without an exact ``COUNT(*)`` over the whole table."""
 
-from .models import ClickEvent, ShortURL
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class ClickEventInline(admin.TabularInline):
+    """
+    One page of a link's most recent clicks (``ADMIN_INLINE_CLICKS`` rows,
+    ``?clicks_page=N`` for older ones); the full history is on the click
+    changelist, filtered by link.
+    """
+
     model = ClickEvent
     extra = 0
-    readonly_fields = ("ip_address", "user_agent", "created_at")
+    max_num = 0
+    can_delete = False
+    fields = readonly_fields = (
+        "ip_address", "user_agent", "referrer_host", "device", "browser", "os", "country",
+        "created_at",
+    )
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        object_id = request.resolver_match.kwargs.get("object_id")
+        if object_id is None:
+            return queryset.none()
+        try:
+            page = max(int(request.GET.get(CLICKS_PAGE_PARAM, 1)), 1)
+        except ValueError:
+            page = 1
+        size = settings.ADMIN_INLINE_CLICKS
+        # Clicks live on their link's shard.
+        queryset = queryset.using(next(
+            (
+                shard for shard in settings.SHORT_URL_SHARDS
+                if ShortURL.objects.using(shard).filter(pk=object_id).exists()
+            ),
+            settings.SHORT_URL_SHARDS[0],
+        ))
+        # The formset filters by link itself and cannot take a sliced
+        # queryset, so the page is resolved to ids first (idx_click_url_created).
+        ids = list(
+            queryset.filter(short_url_id=object_id)
+            .order_by("-created_at")
+            .values_list("pk", flat=True)[(page - 1) * size : page * size]
+        )
+        return queryset.filter(pk__in=ids).order_by("-created_at")
+
+
+class LeaderboardFilter(admin.SimpleListFilter):
+    """Show only the most-clicked links, found through the leaderboard index."""
+
+    title = "leaderboard"
+    parameter_name = "top"
+
+    def lookups(self, request, model_admin):
+        return [("100", "Top 100"), ("1000", "Top 1000")]
+
+    def queryset(self, request, queryset):
+        if self.value() not in ("100", "1000"):
+            return queryset
+        top = (
+            LeaderboardEntry.objects.using(queryset.db)
+            .order_by("-clicks")
+            .values_list("short_url_id", flat=True)
+        )
+        return queryset.filter(pk__in=list(top[: int(self.value())]))
 
 
 @admin.register(ShortURL)
-class ShortURLAdmin(admin.ModelAdmin):
+class ShortURLAdmin(ShardedAdminMixin, LargeTableAdmin):
     list_display = (
         "short_key",
         "original_url",
@@ -19,15 +184,84 @@ class ShortURLAdmin(admin.ModelAdmin):
         "expires_at",
         "created_at",
     )
-    list_filter = ("created_at", "expires_at")
-    search_fields = ("short_key", "original_url", "user__email")
-    readonly_fields = ("id", "short_key", "click_count", "created_at", "updated_at")
+    list_filter = (LeaderboardFilter, "created_at", "expires_at")
+    list_select_related = ("destination",)
+    # Exact matches only: each is a unique-index lookup. A full URL is
+    # matched through ``destinations.url_hash``, an email through the
+    # owner's id (users live on the primary; see get_search_results).
+    search_fields = ("=short_key",)
+    raw_id_fields = ("user", "destination")
+    readonly_fields = (
+        "id", "short_key", "click_count", "all_clicks", "created_at", "updated_at"
+    )
     inlines = [ClickEventInline]
 
+    def get_ordering(self, request):
+        if LeaderboardFilter.parameter_name in request.GET:
+            return ("-click_count",)
+        return super().get_ordering(request)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related("user")
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if "://" in term:
+            return queryset.filter(destination__url_hash=Destination.hash_url(term)), False
+        if "@" in term:
+            owners = get_user_model().objects.filter(email=term).values_list("pk", flat=True)
+            return queryset.filter(user_id__in=list(owners)), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.display(description="clicks")
+    def all_clicks(self, obj):
+        if obj.pk is None:
+            return "-"
+        url = f"{reverse('admin:shortener_clickevent_changelist')}?short_url__id__exact={obj.pk}"
+        if len(settings.SHORT_URL_SHARDS) > 1:
+            url += f"&{SHARD_PARAM}={obj._state.db}"
+        return format_html('<a href="{}">All {} clicks</a>', url, obj.click_count)
+
 
 @admin.register(ClickEvent)
-class ClickEventAdmin(admin.ModelAdmin):
-    list_display = ("short_url", "ip_address", "created_at")
+class ClickEventAdmin(ShardedAdminMixin, LargeTableAdmin):
+    list_display = ("short_url", "ip_address", "device", "country", "created_at")
+    # ``ShortURL.__str__`` reads the destination too.
+    list_select_related = ("short_url__destination",)
+    # Only indexed columns; device/browser/os breakdowns are on the
+    # analytics endpoints rather than unindexed scans here.
     list_filter = ("created_at",)
-    search_fields = ("short_url__short_key", "ip_address")
+    search_fields = ("=short_url__short_key",)
+    raw_id_fields = ("short_url",)
     readonly_fields = ("created_at",)
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(ShardedAdminMixin, LargeTableAdmin):
+    list_display = ("short_url", "user", "clicks")
+    list_select_related = ("short_url__destination",)
+    ordering = ("-clicks",)
+    search_fields = ("=short_url__short_key",)
+    raw_id_fields = ("short_url", "user")
+    readonly_fields = ("clicks",)
+
+    def get_queryset(self, request):
+        # Users live on the primary, not beside the entries.
+        return super().get_queryset(request).prefetch_related("user")
+
+
+@admin.register(Destination)
+class DestinationAdmin(ShardedAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "url", "health_status", "health_checked_at")
+    search_fields = ("url",)
+    readonly_fields = (
+        "url_hash", "health_status", "health_http_status", "health_error", "health_checked_at",
+    )
+
+
+@admin.register(ShortDomain)
+class ShortDomainAdmin(admin.ModelAdmin):
+    list_display = ("host", "user", "created_at")
+    list_select_related = ("user",)
+    search_fields = ("=host", "=user__email")
+    raw_id_fields = ("user",)
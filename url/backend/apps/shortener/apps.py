@@ -5,3 +5,6 @@ class ShortenerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.shortener"
     verbose_name = "URL Shortener"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,149 @@
+"""
+Columnar exports of click history for offline processing.
+
+Clicks (``clicks``) or per-link hourly/daily rollups (``rollups``) are
+written as Apache Parquet or Arrow IPC stream files, zstd-compressed.
+Rows are read in keyset-paginated chunks, transposed into Arrow record
+batches of ``BATCH_ROWS`` and written one batch at a time; the encoded
+bytes are handed on after every batch, so memory use is bounded by one
+batch whatever the size of the export.
+
+Needs the optional ``pyarrow`` package; ``available()`` tells callers
+whether to offer these formats.
+"""
+
+from . import selectors
+from .models import ClickEvent, LinkClickRollup
+
+COLUMNAR_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+FILE_EXTENSIONS = {"parquet": "parquet", "arrow": "arrows"}
+
+# Rows per Arrow record batch (and Parquet row group).
+BATCH_ROWS = 65_536
+
+# ``(column, queried field, kind)``; a kind is an Arrow type name or the
+# ``choices`` of an integer field, exported as a dictionary of labels.
+CLICK_COLUMNS = (
+    ("id", "id", "int64"),
+    ("short_url_id", "short_url_id", "uuid"),
+    ("short_key", "short_url__short_key", "string"),
+    ("user_id", "short_url__user_id", "int64"),
+    ("created_at", "created_at", "timestamp"),
+    ("ip_address", "ip_address", "string"),
+    ("user_agent", "user_agent", "string"),
+    ("referrer_host", "referrer_host", "string"),
+    ("device", "device", ClickEvent.Device.choices),
+    ("browser", "browser", ClickEvent.Browser.choices),
+    ("os", "os", ClickEvent.OperatingSystem.choices),
+    ("country", "country", "string"),
+)
+ROLLUP_COLUMNS = (
+    ("short_url_id", "short_url_id", "uuid"),
+    ("short_key", "short_url__short_key", "string"),
+    ("user_id", "short_url__user_id", "int64"),
+    ("resolution", "resolution", LinkClickRollup.Resolution.choices),
+    ("start", "start", "timestamp"),
+    ("clicks", "clicks", "int64"),
+)
+DATASETS = {
+    "clicks": (CLICK_COLUMNS, selectors.iter_click_history),
+    "rollups": (ROLLUP_COLUMNS, selectors.iter_link_rollup_history),
+}
+
+
+def available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_dataset(dataset: str, *, start=None, end=None, user=None, chunk_size: int = 2000):
+    """Row tuples of *dataset* in ``[start, end)``, in its column order."""
+    columns, source = DATASETS[dataset]
+    fields = [field for _, field, _ in columns]
+    return source(fields=fields, start=start, end=end, user=user, chunk_size=chunk_size)
+
+
+class _Sink:
+    """Write-only file object the Arrow writers encode into; drained per batch."""
+
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def encode(export_format: str, dataset: str, rows, *, batch_rows: int = BATCH_ROWS):
+    """Return the byte stream of *rows* of *dataset* in *export_format*."""
+    import pyarrow as pa
+
+    columns = DATASETS[dataset][0]
+    schema = pa.schema([(name, _arrow_type(pa, kind)) for name, _, kind in columns])
+    sink = _Sink()
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        writer = pa.ipc.new_stream(sink, schema, options=options)
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            writer.write_batch(_record_batch(pa, schema, columns, batch))
+            batch.clear()
+            yield sink.drain()
+    if batch:
+        writer.write_batch(_record_batch(pa, schema, columns, batch))
+    writer.close()
+    yield sink.drain()
+
+
+def _arrow_type(pa, kind):
+    if not isinstance(kind, str):
+        return pa.dictionary(pa.int8(), pa.string())
+    if kind == "timestamp":
+        return pa.timestamp("us", tz="UTC")
+    return pa.string() if kind == "uuid" else getattr(pa, kind)()
+
+
+def _record_batch(pa, schema, columns, rows):
+    arrays = []
+    for (_, _, kind), field, values in zip(columns, schema, zip(*rows)):
+        if kind == "uuid":
+            arrays.append(pa.array([str(value) for value in values], pa.string()))
+        elif isinstance(kind, str):
+            arrays.append(pa.array(values, field.type))
+        else:
+            codes = {value: index for index, (value, _) in enumerate(kind)}
+            indices = pa.array([codes[value] for value in values], pa.int8())
+            labels = pa.array([label for _, label in kind], pa.string())
+            arrays.append(pa.DictionaryArray.from_arrays(indices, labels))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
@@ -0,0 +1,15 @@
+"""Path converters for shortener routes."""
+
+from apps.common.constants import SHORT_KEY_MAX_LENGTH, SHORT_KEY_MIN_LENGTH
+
+
+class ShortKeyConverter:
+    """Matches only Base62 strings of a valid short key length."""
+
+    regex = f"[A-Za-z0-9]{{{SHORT_KEY_MIN_LENGTH},{SHORT_KEY_MAX_LENGTH}}}"
+
+    def to_python(self, value: str) -> str:
+        return value
+
+    def to_url(self, value: str) -> str:
+        return value
@@ -0,0 +1,101 @@
+"""
+Short link rendering and custom short domains.
+
+API responses, exports and QR codes all need a link's full short URL. The
+``short_domains`` registry computes the prefixes once per process — the
+``SHORT_URL_BASE`` prefix (path prefix included) and ``<scheme>://<host>/``
+for each user with a ``ShortDomain`` — so rendering a link is one dict
+lookup and one concatenation::
+
+    prefixes = short_domains.snapshot()      # once per response
+    prefixes.short_url(short_key, user_id)   # per link
+
+The same table maps request hosts to tenants: on a custom domain only the
+owner's links resolve (``tenant_for_host``). Custom domains use the scheme
+of ``SHORT_URL_BASE``.
+
+The table is reloaded at most every ``SHORT_DOMAINS_SYNC_SECONDS``, and at
+once in the process that changes it (signals); other workers converge
+within that interval.
+"""
+
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from core.db_router import PRIMARY
+from core.logging import shortener_logger as logger
+
+
+def default_prefix() -> str:
+    return settings.SHORT_URL_BASE.rstrip("/") + "/"
+
+
+def default_host() -> str:
+    return (urlsplit(settings.SHORT_URL_BASE).hostname or "").lower()
+
+
+class LinkPrefixes(NamedTuple):
+    """An immutable view of the prefixes, safe to hold for a whole response."""
+
+    default: str
+    by_user: dict
+
+    def for_user(self, user_id) -> str:
+        return self.by_user.get(user_id, self.default)
+
+    def short_url(self, short_key: str, user_id=None) -> str:
+        return self.by_user.get(user_id, self.default) + short_key
+
+
+class ShortDomainRegistry:
+    """Per-process prefixes and host → tenant map over ``short_domains``."""
+
+    def __init__(self, *, sync_seconds: float):
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        # (prefixes, tenants, loaded_at), swapped as a whole; None = reload.
+        self._state = None
+
+    def snapshot(self) -> LinkPrefixes:
+        return self._current()[0]
+
+    def short_url(self, short_key: str, user_id=None) -> str:
+        """One link's short URL; use ``snapshot()`` when rendering many."""
+        return self._current()[0].short_url(short_key, user_id)
+
+    def tenant_for_host(self, host: str):
+        """The user owning custom domain *host* (lowercase, no port), or ``None``."""
+        return self._current()[1].get(host)
+
+    def invalidate(self) -> None:
+        """Reload on next use (domains or ``SHORT_URL_BASE`` changed)."""
+        self._state = None
+
+    def _current(self) -> tuple:
+        state = self._state
+        if state is not None and time.monotonic() - state[2] < self.sync_seconds:
+            return state
+        with self._lock:
+            state = self._state
+            if state is None or time.monotonic() - state[2] >= self.sync_seconds:
+                state = self._state = self._load()
+        return state
+
+    def _load(self) -> tuple:
+        from .models import ShortDomain
+
+        rows = list(ShortDomain.objects.using(PRIMARY).values_list("user_id", "host"))
+        scheme = urlsplit(settings.SHORT_URL_BASE).scheme or "https"
+        prefixes = LinkPrefixes(
+            default=default_prefix(),
+            by_user={user_id: f"{scheme}://{host}/" for user_id, host in rows},
+        )
+        logger.debug("Short domains loaded: %d custom domain(s)", len(rows))
+        return prefixes, {host: user_id for user_id, host in rows}, time.monotonic()
+
+
+short_domains = ShortDomainRegistry(sync_seconds=settings.SHORT_DOMAINS_SYNC_SECONDS)
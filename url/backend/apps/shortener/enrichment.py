@@ -0,0 +1,153 @@
+"""
+Click enrichment at ingest.
+
+Each redirect records device, browser, OS, referrer host and country on
+its ``ClickEvent`` so analytics never parse user agents at read time.
+
+• User agents are classified with a few ordered substring/regex rules;
+  results are memoised per UA string (``USER_AGENT_CACHE_SIZE`` entries),
+  and real traffic repeats a small set of strings, so most clicks cost a
+  dictionary lookup.
+• Countries come from an offline MaxMind/DB-IP country database when
+  ``GEOIP_COUNTRY_DB`` points at one and ``geoip2`` is installed;
+  otherwise ``country`` is left blank.
+"""
+
+import ipaddress
+import re
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from core.logging import shortener_logger as logger
+
+from .models import ClickEvent
+
+Device = ClickEvent.Device
+Browser = ClickEvent.Browser
+OperatingSystem = ClickEvent.OperatingSystem
+
+_BOT = re.compile(
+    r"bot|crawl|spider|slurp|preview|headless|curl|wget|python-|httpclient|java/", re.I
+)
+
+# First match wins, so more specific tokens come first (Edge and Opera
+# also announce Chrome and Safari; iOS announces "like Mac OS X").
+_OS_RULES = (
+    ("iPhone", OperatingSystem.IOS),
+    ("iPad", OperatingSystem.IOS),
+    ("iPod", OperatingSystem.IOS),
+    ("Android", OperatingSystem.ANDROID),
+    ("CrOS", OperatingSystem.CHROME_OS),
+    ("Windows", OperatingSystem.WINDOWS),
+    ("Mac OS X", OperatingSystem.MACOS),
+    ("Macintosh", OperatingSystem.MACOS),
+    ("Linux", OperatingSystem.LINUX),
+)
+_BROWSER_RULES = (
+    ("Edg", Browser.EDGE),
+    ("OPR/", Browser.OPERA),
+    ("Opera", Browser.OPERA),
+    ("SamsungBrowser", Browser.SAMSUNG),
+    ("Firefox", Browser.FIREFOX),
+    ("FxiOS", Browser.FIREFOX),
+    ("Chrome", Browser.CHROME),
+    ("CriOS", Browser.CHROME),
+    ("Safari", Browser.SAFARI),
+)
+
+
+@lru_cache(maxsize=settings.USER_AGENT_CACHE_SIZE)
+def parse_user_agent(user_agent: str) -> tuple[int, int, int]:
+    """Return ``(device, browser, os)`` for *user_agent*."""
+    os_ = next((value for token, value in _OS_RULES if token in user_agent), OperatingSystem.OTHER)
+    browser = next((value for token, value in _BROWSER_RULES if token in user_agent), Browser.OTHER)
+    if not user_agent:
+        device = Device.UNKNOWN
+    elif _BOT.search(user_agent):
+        device = Device.BOT
+    elif "iPad" in user_agent or "Tablet" in user_agent or (
+        os_ == OperatingSystem.ANDROID and "Mobile" not in user_agent
+    ):
+        device = Device.TABLET
+    elif "Mobi" in user_agent or os_ in (OperatingSystem.IOS, OperatingSystem.ANDROID):
+        device = Device.MOBILE
+    elif os_ != OperatingSystem.OTHER:
+        device = Device.DESKTOP
+    else:
+        device = Device.UNKNOWN
+    return int(device), int(browser), int(os_)
+
+
+def referrer_host(referer: str) -> str:
+    """Lower-cased host of a ``Referer`` header, without ``www.``."""
+    try:
+        host = urlsplit(referer).hostname or ""
+    except ValueError:
+        return ""
+    return host.removeprefix("www.")[:255]
+
+
+class CountryLookup:
+    """Lazily opened offline IP → country database."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reader = None
+        self._loaded = False
+
+    def country(self, ip_address: str) -> str:
+        reader = self._get_reader()
+        if reader is None:
+            return ""
+        try:
+            if not ipaddress.ip_address(ip_address).is_global:
+                return ""
+            return reader.country(ip_address).country.iso_code or ""
+        except Exception:
+            # Unknown address (AddressNotFoundError) or malformed input.
+            return ""
+
+    def _get_reader(self):
+        if self._loaded:
+            return self._reader
+        with self._lock:
+            if not self._loaded:
+                self._reader = self._open()
+                self._loaded = True
+        return self._reader
+
+    def _open(self):
+        if not self.path:
+            return None
+        try:
+            import geoip2.database
+        except ImportError:
+            logger.warning("GEOIP_COUNTRY_DB is set but geoip2 is not installed.")
+            return None
+        try:
+            return geoip2.database.Reader(self.path)
+        except (OSError, ValueError):
+            logger.warning("Could not open GeoIP database %s.", self.path, exc_info=True)
+            return None
+
+
+country_lookup = CountryLookup(settings.GEOIP_COUNTRY_DB)
+
+
+def click_attributes(request, ip_address: str) -> dict:
+    """``ClickEvent`` field values derived from *request*."""
+    user_agent = request.META.get("HTTP_USER_AGENT", "")[:512]
+    device, browser, os_ = parse_user_agent(user_agent)
+    return {
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "referrer_host": referrer_host(request.META.get("HTTP_REFERER", "")),
+        "device": device,
+        "browser": browser,
+        "os": os_,
+        "country": country_lookup.country(ip_address),
+    }
@@ -0,0 +1,82 @@
+"""
+Streaming export encoders.
+
+Turn an iterator of row tuples into an iterator of ``bytes`` chunks —
+CSV or NDJSON, optionally gzip-compressed — for ``StreamingHttpResponse``.
+Nothing is buffered beyond one chunk, so memory use does not depend on
+the number of rows.
+"""
+
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows encoded per chunk, and the minimum size of a compressed chunk.
+ROWS_PER_CHUNK = 256
+GZIP_CHUNK_BYTES = 64 * 1024
+
+
+class _Buffer:
+    """Minimal file-like target for ``csv.writer``."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value: str) -> None:
+        self.parts.append(value)
+
+    def drain(self) -> str:
+        data = "".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def iter_csv(header, rows):
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.drain().encode()
+    yield buffer.drain().encode()
+
+
+def iter_ndjson(header, rows):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(header, row))))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield ("\n".join(lines) + "\n").encode()
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def gzip_chunks(chunks):
+    """Gzip-compress a stream of ``bytes`` chunks."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        pending.append(compressor.compress(chunk))
+        pending_size += len(pending[-1])
+        if pending_size >= GZIP_CHUNK_BYTES:
+            yield b"".join(pending)
+            pending.clear()
+            pending_size = 0
+    pending.append(compressor.flush())
+    yield b"".join(pending)
+
+
+def encode(export_format: str, header, rows, *, gzip: bool = False):
+    """Return the byte stream for *rows* in *export_format*."""
+    chunks = iter_csv(header, rows) if export_format == "csv" else iter_ndjson(header, rows)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,267 @@
+"""
+Destination health checks: does the page behind a link still answer?
+
+``check_stale_destinations`` (run by the periodic ``check_link_health``
+task) probes destinations whose last check is older than
+``LINK_HEALTH_TTL_SECONDS`` and stores the outcome on the ``Destination``
+row every link to that URL shares. Link lists read it from there — no
+request ever waits on the network.
+
+Probes run on one asyncio event loop with a small stdlib HTTP/1.1 client:
+
+• at most ``LINK_HEALTH_CONCURRENCY`` requests in flight;
+• requests to one host start at least ``LINK_HEALTH_HOST_INTERVAL_SECONDS``
+  apart, so a thousand links to one site never hammer it;
+• ``HEAD`` first, then ``GET`` (headers only) when the server answers HEAD
+  with an error — plenty of servers reject or mishandle HEAD;
+• redirects are followed up to ``LINK_HEALTH_MAX_REDIRECTS`` hops;
+• hosts resolving only to private, loopback or link-local addresses are
+  not contacted unless ``LINK_HEALTH_ALLOW_PRIVATE`` (users choose these
+  URLs; the checker must not become a way to probe the internal network).
+  Connections go to the address that was checked.
+
+A run stops starting probes after ``LINK_HEALTH_RUN_SECONDS``; unchecked
+destinations stay stale and are picked up by the next run.
+"""
+
+import asyncio
+import ipaddress
+import socket
+import ssl
+from collections import Counter
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import timedelta
+from urllib.parse import quote, urljoin, urlsplit
+
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from apps.common.constants import LINK_HEALTH_MAX_REDIRECTS, LINK_HEALTH_USER_AGENT
+
+from .models import Destination, ShortURL
+from .versions import bump_links_versions
+
+Health = Destination.Health
+
+# Characters left as-is when quoting a request target.
+_TARGET_SAFE = "/%?=&;:@!$'()*+,~-._"
+_ERROR_MAX_LENGTH = 255
+
+
+class ProbeError(Exception):
+    """A destination that cannot (or may not) be requested."""
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    status: str
+    http_status: int | None = None
+    error: str = ""
+
+
+class HostRateLimiter:
+    """Spaces request starts per host by *interval* seconds (one event loop)."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_start = {}
+
+    async def wait(self, host: str) -> None:
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class HealthChecker:
+    """Probes URLs concurrently; see the module docstring for the limits."""
+
+    def __init__(
+        self,
+        *,
+        concurrency: int,
+        host_interval: float,
+        timeout: float,
+        allow_private: bool = False,
+        run_seconds: float | None = None,
+    ):
+        self.concurrency = max(concurrency, 1)
+        self.host_interval = host_interval
+        self.timeout = timeout
+        self.allow_private = allow_private
+        self.run_seconds = run_seconds
+
+    @classmethod
+    def from_settings(cls) -> "HealthChecker":
+        return cls(
+            concurrency=settings.LINK_HEALTH_CONCURRENCY,
+            host_interval=settings.LINK_HEALTH_HOST_INTERVAL_SECONDS,
+            timeout=settings.LINK_HEALTH_TIMEOUT_SECONDS,
+            allow_private=settings.LINK_HEALTH_ALLOW_PRIVATE,
+            run_seconds=settings.LINK_HEALTH_RUN_SECONDS,
+        )
+
+    def check_many(self, urls) -> dict[str, ProbeResult]:
+        """
+        Probe *urls* on a fresh event loop; returns ``{url: result}``,
+        without the URLs the run's time budget left unprobed.
+        """
+        return asyncio.run(self._check_many(list(dict.fromkeys(urls))))
+
+    async def _check_many(self, urls: list[str]) -> dict[str, ProbeResult]:
+        loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._hosts = HostRateLimiter(self.host_interval)
+        self._deadline = loop.time() + self.run_seconds if self.run_seconds is not None else None
+        results = await asyncio.gather(*(self.check(url) for url in urls))
+        return {url: result for url, result in zip(urls, results) if result is not None}
+
+    async def check(self, url: str) -> ProbeResult | None:
+        status = None
+        for _ in range(LINK_HEALTH_MAX_REDIRECTS + 1):
+            try:
+                status, location = await self._request("HEAD", url)
+                if status is not None and status >= 400:
+                    status, location = await self._request("GET", url)
+            except asyncio.TimeoutError:
+                return ProbeResult(
+                    Health.UNREACHABLE, error=f"No response within {self.timeout:g}s."
+                )
+            except (ProbeError, OSError, ValueError) as exc:
+                return ProbeResult(Health.UNREACHABLE, error=_describe(exc))
+            if status is None:
+                return None  # out of time; left for the next run
+            if 300 <= status < 400 and location:
+                url = urljoin(url, location)
+                continue
+            return ProbeResult(Health.OK if status < 400 else Health.BROKEN, status)
+        return ProbeResult(Health.BROKEN, status, "Too many redirects.")
+
+    async def _request(self, method: str, url: str) -> tuple[int | None, str]:
+        """``(status, location)`` for one request, or ``(None, "")`` past the deadline."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ProbeError(f"Unsupported URL: {url[:100]}")
+        await self._hosts.wait(parts.hostname)
+        async with self._slots:
+            if self._deadline is not None and asyncio.get_running_loop().time() > self._deadline:
+                return None, ""
+            return await asyncio.wait_for(self._exchange(method, parts), self.timeout)
+
+    async def _exchange(self, method: str, parts) -> tuple[int, str]:
+        host = parts.hostname.encode("idna").decode("ascii")
+        tls = parts.scheme == "https"
+        port = parts.port or (443 if tls else 80)
+        address = await self._resolve(host, port)
+        reader, writer = await asyncio.open_connection(
+            address,
+            port,
+            ssl=ssl.create_default_context() if tls else None,
+            server_hostname=host if tls else None,
+        )
+        try:
+            target = quote(parts.path or "/", safe=_TARGET_SAFE)
+            if parts.query:
+                target += "?" + quote(parts.query, safe=_TARGET_SAFE)
+            authority = f"[{host}]" if ":" in host else host
+            if parts.port:
+                authority += f":{parts.port}"
+            request = (
+                f"{method} {target} HTTP/1.1\r\n"
+                f"Host: {authority}\r\n"
+                f"User-Agent: {LINK_HEALTH_USER_AGENT}\r\n"
+                "Accept: */*\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(request.encode("ascii"))
+            await writer.drain()
+            return await _read_head(reader)
+        finally:
+            writer.close()
+            with suppress(OSError, ssl.SSLError):
+                await writer.wait_closed()
+
+    async def _resolve(self, host: str, port: int) -> str:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = [info[4][0] for info in infos]
+        if not self.allow_private:
+            addresses = [
+                address for address in addresses
+                if ipaddress.ip_address(address.split("%")[0]).is_global
+            ]
+            if not addresses:
+                raise ProbeError(f"{host} does not resolve to a public address.")
+        return addresses[0]
+
+
+async def _read_head(reader) -> tuple[int, str]:
+    """Parse the status line and ``Location`` header; the body is never read."""
+    status_line = await reader.readline()
+    try:
+        _, code, *_ = status_line.split(None, 2)
+        status = int(code)
+    except ValueError:
+        raise ProbeError("Malformed HTTP response.") from None
+    location = ""
+    while line := await reader.readline():
+        if line in (b"\r\n", b"\n"):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "location":
+            location = value.strip()
+    return status, location
+
+
+def _describe(exc: Exception) -> str:
+    return (str(exc) or exc.__class__.__name__)[:_ERROR_MAX_LENGTH]
+
+
+def check_stale_destinations(shard: str, *, limit: int, checker=None) -> Counter:
+    """
+    Probe up to *limit* destinations on *shard* that are linked to and were
+    not checked within ``LINK_HEALTH_TTL_SECONDS`` (never-checked first),
+    store the results, and return a count per health status.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.LINK_HEALTH_TTL_SECONDS)
+    stale = list(
+        Destination.objects.using(shard)
+        .filter(Q(health_checked_at__isnull=True) | Q(health_checked_at__lt=cutoff))
+        .filter(Exists(ShortURL.objects.filter(destination=OuterRef("pk"))))
+        .order_by(F("health_checked_at").asc(nulls_first=True), "pk")
+        .values_list("pk", "url")[:limit]
+    )
+    if not stale:
+        return Counter()
+
+    results = (checker or HealthChecker.from_settings()).check_many(url for _, url in stale)
+    checked_at = timezone.now()
+    checked = [
+        Destination(
+            pk=pk,
+            health_status=result.status,
+            health_http_status=result.http_status,
+            health_error=result.error,
+            health_checked_at=checked_at,
+        )
+        for pk, url in stale
+        if (result := results.get(url)) is not None
+    ]
+    Destination.objects.using(shard).bulk_update(
+        checked,
+        ["health_status", "health_http_status", "health_error", "health_checked_at"],
+        batch_size=500,
+    )
+    # Link lists carry the health fields; their ETags must move with them.
+    # The versions live on the primary, so this worker's bump is the one
+    # the web workers validate against.
+    bump_links_versions(
+        ShortURL.objects.using(shard)
+        .filter(destination_id__in=[destination.pk for destination in checked])
+        .order_by()
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    return Counter(destination.health_status for destination in checked)
@@ -0,0 +1,78 @@
+"""
+Bulk import helpers used by the ``import_links`` command.
+
+Rows are streamed from a CSV or NDJSON file as ``(line, dict)`` pairs and
+validated in chunks with the same ``ShortURLCreateSerializer`` rules as the
+API. ``validate_chunk`` is a module-level function so it can run in worker
+processes; ``init_worker`` sets Django up in processes started with the
+``spawn`` method — which is also why this module imports nothing from
+Django at import time.
+"""
+
+import csv
+import json
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_FIELDS = ("original_url", "custom_key", "expires_at", "redirect_type", "analytics_mode")
+
+
+def infer_format(path: str) -> str:
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def iter_rows(stream, import_format: str):
+    """
+    Yield ``(line, row)`` for each record in *stream*. *line* is the
+    1-based record number (header excluded) used for checkpoints and
+    reject reports. Blank values are dropped so serializer defaults apply.
+    """
+    if import_format == "csv":
+        records = csv.DictReader(stream)
+    else:
+        records = (_parse_json_line(text) for text in stream if text.strip())
+    for line, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            yield line, {"_error": "Row is not an object."}
+            continue
+        yield line, {
+            field: value.strip() if isinstance(value, str) else value
+            for field, value in record.items()
+            if field in IMPORT_FIELDS and value not in ("", None)
+        }
+
+
+def _parse_json_line(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def validate_chunk(chunk):
+    """
+    Validate ``(line, row)`` pairs.
+
+    Returns ``(valid, rejected)``: ``valid`` holds ``(line, validated_data)``
+    and ``rejected`` holds ``(line, reason)``.
+    """
+    from .serializers import ShortURLCreateSerializer
+
+    valid, rejected = [], []
+    for line, row in chunk:
+        if "_error" in row:
+            rejected.append((line, row["_error"]))
+            continue
+        serializer = ShortURLCreateSerializer(data=row)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            data.pop("reuse_existing", None)
+            valid.append((line, dict(data)))
+        else:
+            rejected.append((line, json.dumps(serializer.errors)))
+    return valid, rejected
+
+
+def init_worker() -> None:
+    import django
+
+    django.setup()
@@ -0,0 +1,171 @@
+"""
+In-memory pre-filter for redirect lookups.
+
+Every request to ``/{short_key}/`` used to cost a transaction and an
+indexed lookup even for keys that never existed — which is exactly what a
+key-scanning bot sends. Each process keeps a Bloom filter of every
+``short_key``; a negative answer is definitive, so random guesses are
+rejected without touching the database.
+
+Keeping the filter complete:
+
+• keys saved in this process are added by a ``post_save`` signal;
+• once their transaction commits, the keys are published to the shared
+  cache under the next free version number and the version is raised.
+  Other processes pull the keys of every version they have not seen, so
+  a link is picked up however long its transaction ran — no database
+  query, and nothing depends on when the row became visible;
+• on a filter miss, when the last sync is older than
+  ``SHORT_KEY_FILTER_SYNC_SECONDS``, keys are also pulled from the
+  database by ``created_at`` — the only path with a per-process cache,
+  and a backstop for published keys evicted before they were read.
+
+Deleted keys stay in the filter until the next rebuild; they just fall
+through to the database and 404 as before.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from apps.common.bloom import BloomFilter
+from apps.common.utils import cache_set_max
+from core.logging import shortener_logger as logger
+
+VERSION_CACHE_KEY = "short_key_filter:version"
+# Keys published at one version; long enough for any active process to read.
+KEYS_CACHE_KEY = "short_key_filter:keys:{}"
+PUBLISHED_KEYS_TTL = 60 * 60
+# A process further behind than this rebuilds instead of pulling.
+MAX_PULL_VERSIONS = 1000
+
+# Rows commit after their ``created_at`` timestamp; the database backstop
+# re-reads a small overlap (longer transactions arrive as published keys).
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class ShortKeyFilter:
+    """Per-process Bloom filter over ``ShortURL.short_key``."""
+
+    def __init__(self, *, capacity: int, error_rate: float, sync_seconds: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._high_water = None
+        self._version = None
+        self._synced_at = 0.0
+
+    # -- public API ---------------------------------------------------------
+
+    def might_exist(self, short_key: str) -> bool:
+        """``False`` means *short_key* definitely does not exist."""
+        version = cache.get(VERSION_CACHE_KEY, 0)
+        with self._lock:
+            if self._bloom is None:
+                self._rebuild()
+            elif version != self._version:
+                self._pull(version)
+            if short_key in self._bloom:
+                return True
+            if time.monotonic() - self._synced_at >= self.sync_seconds:
+                self._sync()
+                return short_key in self._bloom
+        return False
+
+    def add(self, short_key: str, *, using: str = DEFAULT_DB_ALIAS) -> None:
+        """Record a key saved on *using*; other processes get it on commit."""
+        self.add_many([short_key], using=using)
+
+    def add_many(self, short_keys, *, using: str = DEFAULT_DB_ALIAS) -> None:
+        """``add`` for keys inserted in bulk (``bulk_create`` sends no signals)."""
+        short_keys = list(short_keys)
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.update(short_keys)
+        transaction.on_commit(lambda: self._publish(short_keys), using=using)
+
+    def warm(self) -> None:
+        """Build the filter now instead of on the first redirect."""
+        with self._lock:
+            self._rebuild()
+
+    def reset(self) -> None:
+        """Drop local state; the next lookup rebuilds from the database."""
+        with self._lock:
+            self._bloom = None
+            self._high_water = None
+            self._version = None
+            self._synced_at = 0.0
+
+    # -- internals ----------------------------------------------------------
+
+    def _publish(self, short_keys) -> None:
+        # Claim the next free version with add() before raising the
+        # version, so every version a reader sees already has its keys.
+        version = cache.get(VERSION_CACHE_KEY, 0) + 1
+        while not cache.add(KEYS_CACHE_KEY.format(version), short_keys, PUBLISHED_KEYS_TTL):
+            version += 1
+        cache_set_max(VERSION_CACHE_KEY, version)
+
+    def _rebuild(self) -> None:
+        from .models import ShortURL
+
+        started = time.monotonic()
+        self._version = cache.get(VERSION_CACHE_KEY, 0)
+        self._high_water = timezone.now()
+        shards = settings.SHORT_URL_SHARDS
+        total = sum(ShortURL.objects.using(shard).count() for shard in shards)
+        self._bloom = BloomFilter(max(self.capacity, total * 2), self.error_rate)
+        for shard in shards:
+            keys = ShortURL.objects.using(shard).values_list("short_key", flat=True)
+            self._bloom.update(keys.iterator(chunk_size=10_000))
+        self._synced_at = time.monotonic()
+        logger.info(
+            "Short key filter rebuilt: %d keys in %.1fms",
+            len(self._bloom),
+            (time.monotonic() - started) * 1000,
+        )
+
+    def _pull(self, version: int) -> None:
+        """Add the keys published after ``self._version`` up to *version*."""
+        versions = range(self._version + 1, version + 1)
+        if version < self._version or len(versions) > MAX_PULL_VERSIONS:
+            published = None  # the cache was flushed, or this process fell far behind
+        else:
+            published = cache.get_many([KEYS_CACHE_KEY.format(v) for v in versions])
+        if published is None or len(published) < len(versions):
+            self._rebuild()
+            return
+        for short_keys in published.values():
+            self._bloom.update(short_keys)
+        self._version = version
+        if self._bloom.is_saturated:
+            self._rebuild()
+
+    def _sync(self) -> None:
+        from .models import ShortURL
+
+        now = timezone.now()
+        for shard in settings.SHORT_URL_SHARDS:
+            new_keys = ShortURL.objects.using(shard).filter(
+                created_at__gte=self._high_water - SYNC_OVERLAP
+            ).values_list("short_key", flat=True)
+            self._bloom.update(new_keys)
+        self._high_water = now
+        self._synced_at = time.monotonic()
+        if self._bloom.is_saturated:
+            self._rebuild()
+
+
+short_key_filter = ShortKeyFilter(
+    capacity=settings.SHORT_KEY_FILTER_CAPACITY,
+    error_rate=settings.SHORT_KEY_FILTER_ERROR_RATE,
+    sync_seconds=settings.SHORT_KEY_FILTER_SYNC_SECONDS,
+)
@@ -0,0 +1,171 @@
+"""
+Counter flush for the top-links leaderboard.
+
+Redirects only note which links were clicked. Every
+``LEADERBOARD_FLUSH_SECONDS`` a daemon thread (started per gunicorn worker,
+see ``config/gunicorn.py``) copies those links' current ``click_count``
+into ``link_leaderboard`` with one read and one upsert per shard, and so
+does worker exit; no request ever waits on a flush. The table's indexes on
+``clicks`` then answer "top K" — per user or globally — by reading K index
+entries instead of scanning and sorting ``short_urls``.
+
+Absolute counts are copied rather than deltas, so a lost or repeated flush
+only delays the board, it never skews it. Rankings lag clicks by up to the
+flush interval per worker; ``reconcile`` (a periodic task) repairs entries
+left behind by a worker killed before it flushed — and is the only writer
+in a process without the thread (``runserver``). It only looks at links
+clicked or edited since its previous run. Both stamp the owners'
+leaderboard watermark, which the account analytics ETag includes.
+"""
+
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.logging import shortener_logger as logger
+
+RECONCILED_AT_CACHE_KEY = "leaderboard:reconciled_at:{}"
+# Clicks and edits commit a little after the timestamps they set.
+RECONCILE_OVERLAP = timedelta(minutes=1)
+
+
+class LeaderboardBuffer:
+    """Links clicked in this process since the last flush, per shard."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(set)
+        self._flusher = None
+        self._stopping = threading.Event()
+
+    def note_click(self, shard: str, short_url_pk) -> None:
+        with self._lock:
+            self._pending[shard].add(short_url_pk)
+
+    def start(self) -> None:
+        """Flush every ``LEADERBOARD_FLUSH_SECONDS`` from a daemon thread."""
+        with self._lock:
+            if self._flusher is not None or settings.LEADERBOARD_FLUSH_SECONDS <= 0:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="leaderboard-flush", daemon=True
+            )
+            self._flusher.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread, letting a flush in progress finish."""
+        with self._lock:
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            self._stopping.set()
+            flusher.join()
+            self._stopping.clear()
+
+    def flush(self) -> int:
+        """Copy pending links' counts into the leaderboard; returns rows written."""
+        from .models import LeaderboardEntry, ShortURL
+
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(set)
+        written = 0
+        owners = set()
+        for shard, pks in pending.items():
+            try:
+                rows = (
+                    ShortURL.objects.using(shard)
+                    .filter(pk__in=pks)
+                    .values_list("pk", "user_id", "click_count")
+                )
+                entries = [
+                    LeaderboardEntry(short_url_id=pk, user_id=user_id, clicks=clicks)
+                    for pk, user_id, clicks in rows
+                ]
+                LeaderboardEntry.objects.using(shard).bulk_create(
+                    entries,
+                    update_conflicts=True,
+                    unique_fields=["short_url"],
+                    update_fields=["clicks"],
+                )
+                written += len(entries)
+                owners.update(entry.user_id for entry in entries)
+            except Exception:
+                logger.warning("Leaderboard flush failed on %s.", shard, exc_info=True)
+                with self._lock:
+                    self._pending[shard] |= pks
+        _mark_flushed(owners)
+        return written
+
+    def _flush_loop(self) -> None:
+        while not self._stopping.wait(settings.LEADERBOARD_FLUSH_SECONDS):
+            try:
+                self.flush()
+            except Exception:
+                logger.warning("Leaderboard flush failed.", exc_info=True)
+            finally:
+                # Connections are per thread; don't hold one between flushes.
+                connections.close_all()
+
+
+leaderboard = LeaderboardBuffer()
+
+
+def reconcile(shard: str, *, batch_size: int = 2000) -> int:
+    """
+    Upsert the entries on *shard* whose ``clicks`` differ from their link's
+    ``click_count`` (or are missing), among links clicked or edited since
+    the previous run (all links on the first); returns rows written.
+    """
+    from .models import LeaderboardEntry, ShortURL
+
+    cursor_key = RECONCILED_AT_CACHE_KEY.format(shard)
+    started = timezone.now()
+    links = ShortURL.objects.using(shard).filter(click_count__gt=0)
+    since = cache.get(cursor_key)
+    if since is not None:
+        since -= RECONCILE_OVERLAP
+        links = links.filter(Q(last_clicked_at__gte=since) | Q(updated_at__gte=since))
+    stale = (
+        links
+        .exclude(leaderboard_entry__clicks=F("click_count"))
+        .values_list("pk", "user_id", "click_count")
+    )
+    written = 0
+    batch = []
+    for row in stale.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            written += _upsert(LeaderboardEntry, shard, batch)
+            batch.clear()
+    if batch:
+        written += _upsert(LeaderboardEntry, shard, batch)
+    cache.set(cursor_key, started, None)
+    return written
+
+
+def _mark_flushed(owners) -> None:
+    """Move the account analytics validators of *owners* (see ``versions``)."""
+    from .versions import mark_leaderboard_flushed
+
+    if not owners:
+        return
+    try:
+        mark_leaderboard_flushed(owners)
+    except Exception:
+        logger.warning("Leaderboard watermark update failed.", exc_info=True)
+
+
+def _upsert(model, shard: str, rows) -> int:
+    model.objects.using(shard).bulk_create(
+        [model(short_url_id=pk, user_id=user_id, clicks=clicks) for pk, user_id, clicks in rows],
+        update_conflicts=True,
+        unique_fields=["short_url"],
+        update_fields=["clicks"],
+    )
+    _mark_flushed({user_id for _, user_id, _ in rows})
+    return len(rows)
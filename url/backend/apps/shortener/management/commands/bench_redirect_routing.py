@@ -0,0 +1,51 @@
+"""
+Benchmark redirect routing: Django's URL resolver vs the front-controller
+classifier used by ``ShortKeyDispatchMiddleware``::
+
+    python manage.py bench_redirect_routing --paths 50000
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.urls import Resolver404, resolve
+
+from apps.common.constants import BASE62_ALPHABET, SHORT_KEY_LENGTH
+from apps.shortener.middleware import classify_short_key_path, reserved_segments
+
+
+class Command(BaseCommand):
+    help = "Compare URL resolver and short-key classifier throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--paths", type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        valid = [
+            "/" + "".join(rng.choices(BASE62_ALPHABET, k=SHORT_KEY_LENGTH)) + "/"
+            for _ in range(options["paths"])
+        ]
+        invalid = [f"/bad-key-{i}!/" for i in range(options["paths"] // 10)]
+        reserved = reserved_segments()
+
+        def django_resolver(path):
+            try:
+                return resolve(path)
+            except Resolver404:
+                return None
+
+        def classifier(path):
+            return classify_short_key_path(path, reserved)
+
+        for label, paths in (("valid keys", valid), ("malformed paths", invalid)):
+            for name, route in (("django resolver", django_resolver), ("classifier", classifier)):
+                started = time.perf_counter()
+                for path in paths:
+                    route(path)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{label:16} {name:16} {len(paths) / elapsed:>12,.0f} paths/s  "
+                    f"({elapsed * 1e6 / len(paths):.2f} µs/path)"
+                )
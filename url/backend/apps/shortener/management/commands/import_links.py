@@ -0,0 +1,147 @@
+"""
+Bulk-import links from a CSV or NDJSON file::
+
+    python manage.py import_links links.csv --user owner@example.com --workers 4
+
+Columns: ``original_url`` (required), ``custom_key``, ``expires_at``,
+``redirect_type``, ``analytics_mode``. Rows are validated in worker
+processes and inserted with ``bulk_create``, one batch at a time. After
+each batch the last processed line is written to a checkpoint file, so
+re-running the same command after an interruption resumes where it
+stopped. Each batch's transaction also records its last line in the
+database (``ImportCheckpoint``), so rows committed just before a crash
+that the checkpoint file missed are not inserted twice on resume.
+Rejected rows are appended to ``--rejects`` with the reason.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.shortener.imports import (
+    IMPORT_FORMATS,
+    infer_format,
+    init_worker,
+    iter_rows,
+    validate_chunk,
+)
+from apps.shortener.services import bulk_import_short_urls, clear_import_checkpoints
+
+
+class Command(BaseCommand):
+    help = "Import links from a CSV or NDJSON file, resumably."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", required=True, help="Email of the owning user.")
+        parser.add_argument("--format", choices=IMPORT_FORMATS)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Validation processes; 0 validates in this process.",
+        )
+        parser.add_argument("--checkpoint", help="Defaults to <path>.checkpoint.")
+        parser.add_argument("--rejects", help="Defaults to <path>.rejects.")
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore an existing checkpoint."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        try:
+            user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}.")
+
+        self.checkpoint_path = options["checkpoint"] or f"{path}.checkpoint"
+        self.source = os.path.abspath(path)
+        state = self._load_checkpoint(options["restart"])
+        if options["restart"]:
+            clear_import_checkpoints(user=user, source=self.source)
+        if state["line"]:
+            self.stdout.write(f"Resuming after line {state['line']}.")
+
+        import_format = options["format"] or infer_format(path)
+        workers = options["workers"]
+        batch_size = options["batch_size"]
+        started = time.monotonic()
+        imported = 0
+
+        with open(path, newline="", encoding="utf-8") as stream, open(
+            options["rejects"] or f"{path}.rejects", "a", encoding="utf-8"
+        ) as rejects:
+            rows = (
+                item for item in iter_rows(stream, import_format) if item[0] > state["line"]
+            )
+            chunks = iter(lambda: list(islice(rows, batch_size)), [])
+            for valid, rejected in self._validate(chunks, workers):
+                entries = [data for _, data in valid]
+                created, skipped = bulk_import_short_urls(
+                    user=user,
+                    entries=entries,
+                    source=self.source,
+                    lines=[line for line, _ in valid],
+                )
+                for index in skipped:
+                    rejected.append((valid[index][0], "Custom key is already taken."))
+                for line, reason in sorted(rejected):
+                    rejects.write(f"{line}\t{reason}\n")
+                rejects.flush()
+
+                last_line = max(line for line, _ in valid + rejected)
+                state.update(
+                    line=last_line,
+                    created=state["created"] + created,
+                    rejected=state["rejected"] + len(rejected),
+                )
+                self._save_checkpoint(state)
+                imported += len(valid) + len(rejected)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"line {last_line}: {state['created']} created, "
+                    f"{state['rejected']} rejected ({imported / elapsed:,.0f} rows/s)"
+                )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {state['created']} links, rejected {state['rejected']} rows "
+            f"({imported} rows in {elapsed:.1f}s, {imported / (elapsed or 1):,.0f} rows/s)."
+        ))
+
+    def _validate(self, chunks, workers):
+        """Yield ``validate_chunk`` results in input order."""
+        if workers <= 0:
+            yield from map(validate_chunk, chunks)
+            return
+        # ``spawn`` keeps workers clear of this process's DB connections.
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers, initializer=init_worker) as pool:
+            # Bounded windows keep at most ``workers * 2`` chunks in memory.
+            while window := list(islice(chunks, workers * 2)):
+                yield from pool.map(validate_chunk, window)
+
+    def _load_checkpoint(self, restart: bool) -> dict:
+        fresh = {"source": self.source, "line": 0, "created": 0, "rejected": 0}
+        if restart or not os.path.exists(self.checkpoint_path):
+            return fresh
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("source") != self.source:
+            raise CommandError(
+                f"{self.checkpoint_path} belongs to {state.get('source')}; "
+                "pass --restart or a different --checkpoint."
+            )
+        return state
+
+    def _save_checkpoint(self, state: dict) -> None:
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.checkpoint_path)
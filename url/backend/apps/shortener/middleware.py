@@ -0,0 +1,76 @@
+"""
+Front-controller dispatch for public redirects.
+
+``/{short_key}/`` is by far the most frequent request, yet in the root
+URLconf it is the catch-all that only matches after the admin and API
+patterns have been tried. ``ShortKeyDispatchMiddleware`` recognises the
+redirect shape with a few constant-time string checks and calls
+``RedirectView`` directly, skipping URL resolution and the rest of the
+middleware stack below it.
+
+Anything that does not look like a short key (wrong length, non-Base62
+characters, a reserved first segment such as ``admin`` or ``api``) falls
+through to normal Django handling unchanged.
+"""
+
+from django.conf import settings
+from django.urls import get_resolver
+
+from apps.common.constants import SHORT_KEY_MAX_LENGTH, SHORT_KEY_MIN_LENGTH
+
+from .views import RedirectView
+
+_MIN_PATH = SHORT_KEY_MIN_LENGTH + 2  # "/" + key + "/"
+_MAX_PATH = SHORT_KEY_MAX_LENGTH + 2
+
+
+def reserved_segments() -> frozenset[str]:
+    """First path segments owned by other routes (``admin``, ``api``, …)."""
+    segments = set()
+    for pattern in get_resolver().url_patterns:
+        route = str(pattern.pattern).lstrip("^/")
+        head = route.split("/", 1)[0]
+        if head and "<" not in head:
+            segments.add(head)
+    for url in (settings.STATIC_URL, getattr(settings, "MEDIA_URL", "")):
+        head = (url or "").strip("/").split("/", 1)[0]
+        if head:
+            segments.add(head)
+    return frozenset(segments)
+
+
+def classify_short_key_path(path: str, reserved: frozenset[str]) -> str | None:
+    """
+    Return the short key if *path* is exactly ``/<Base62 key>/``.
+
+    Bounded by ``SHORT_KEY_MAX_LENGTH``, so this is O(1) per request.
+    """
+    if not _MIN_PATH <= len(path) <= _MAX_PATH:
+        return None
+    if path[0] != "/" or path[-1] != "/":
+        return None
+    key = path[1:-1]
+    if not (key.isascii() and key.isalnum()):
+        return None
+    if key in reserved:
+        return None
+    return key
+
+
+class ShortKeyDispatchMiddleware:
+    """Route ``GET /{short_key}/`` straight to ``RedirectView``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.redirect_view = RedirectView.as_view()
+        self._reserved = None
+
+    def __call__(self, request):
+        if request.method in ("GET", "HEAD"):
+            if self._reserved is None:
+                self._reserved = reserved_segments()
+            short_key = classify_short_key_path(request.path_info, self._reserved)
+            if short_key is not None:
+                response = self.redirect_view(request, short_key=short_key)
+                return response.render()
+        return self.get_response(request)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shorturl',
+            index=models.Index(fields=['created_at'], name='idx_shorturl_created'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0002_shorturl_created_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clickevent',
+            index=models.Index(fields=['created_at'], name='idx_click_created'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0003_clickevent_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shorturl',
+            name='analytics_mode',
+            field=models.CharField(choices=[('exact', 'Exact'), ('edge', 'Edge-cached')], default='exact', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='shorturl',
+            name='redirect_type',
+            field=models.CharField(choices=[('temporary', 'Temporary (302)'), ('permanent', 'Permanent (301)')], default='temporary', max_length=10),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shortener', '0004_shorturl_redirect_policy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shorturl',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='short_urls', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('shard', models.CharField(max_length=64)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='link_shards', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'user_shards',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usershard',
+            constraint=models.UniqueConstraint(fields=('user', 'shard'), name='uniq_user_shard'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+import hashlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def intern_destinations(apps, schema_editor):
+    """Move each link's URL into ``destinations`` and flag custom keys."""
+    ShortURL = apps.get_model("shortener", "ShortURL")
+    Destination = apps.get_model("shortener", "Destination")
+    db = schema_editor.connection.alias
+
+    ids = {}
+    links = ShortURL.objects.using(db).only("pk", "original_url", "custom_key")
+    for link in links.iterator(chunk_size=2000):
+        url_hash = hashlib.blake2b(link.original_url.encode(), digest_size=16).digest()
+        if url_hash not in ids:
+            ids[url_hash] = Destination.objects.using(db).get_or_create(
+                url_hash=url_hash, defaults={"url": link.original_url}
+            )[0].pk
+        ShortURL.objects.using(db).filter(pk=link.pk).update(
+            destination_id=ids[url_hash],
+            is_custom=link.custom_key is not None,
+        )
+
+
+def restore_urls(apps, schema_editor):
+    ShortURL = apps.get_model("shortener", "ShortURL")
+    db = schema_editor.connection.alias
+    links = ShortURL.objects.using(db).select_related("destination")
+    for link in links.iterator(chunk_size=2000):
+        ShortURL.objects.using(db).filter(pk=link.pk).update(
+            original_url=link.destination.url,
+            custom_key=link.short_key if link.is_custom else None,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("shortener", "0005_user_shards"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Destination",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("url_hash", models.BinaryField(max_length=16, unique=True)),
+                ("url", models.URLField(max_length=2048)),
+            ],
+            options={
+                "db_table": "destinations",
+            },
+        ),
+        migrations.AddField(
+            model_name="shorturl",
+            name="destination",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="short_urls",
+                to="shortener.destination",
+            ),
+        ),
+        migrations.AddField(
+            model_name="shorturl",
+            name="is_custom",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name="shorturl",
+            name="original_url",
+            field=models.URLField(max_length=2048, null=True),
+        ),
+        migrations.RunPython(intern_destinations, restore_urls),
+        migrations.RemoveField(
+            model_name="shorturl",
+            name="original_url",
+        ),
+        migrations.RemoveField(
+            model_name="shorturl",
+            name="custom_key",
+        ),
+        migrations.AlterField(
+            model_name="shorturl",
+            name="destination",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="short_urls",
+                to="shortener.destination",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shorturl",
+            index=models.Index(fields=["user", "destination"], name="idx_user_destination"),
+        ),
+    ]
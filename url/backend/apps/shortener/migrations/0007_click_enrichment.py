@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0006_destinations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clickevent',
+            name='browser',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Other'), (1, 'Chrome'), (2, 'Safari'), (3, 'Firefox'), (4, 'Edge'), (5, 'Opera'), (6, 'Samsung Internet')], default=0),
+        ),
+        migrations.AddField(
+            model_name='clickevent',
+            name='country',
+            field=models.CharField(blank=True, default='', max_length=2),
+        ),
+        migrations.AddField(
+            model_name='clickevent',
+            name='device',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Unknown'), (1, 'Desktop'), (2, 'Mobile'), (3, 'Tablet'), (4, 'Bot')], default=0),
+        ),
+        migrations.AddField(
+            model_name='clickevent',
+            name='os',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Other'), (1, 'Windows'), (2, 'macOS'), (3, 'iOS'), (4, 'Android'), (5, 'Linux'), (6, 'ChromeOS')], default=0),
+        ),
+        migrations.AddField(
+            model_name='clickevent',
+            name='referrer_host',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
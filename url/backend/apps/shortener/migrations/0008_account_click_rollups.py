@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    """Seed the rollups from existing click events on this database."""
+    ClickEvent = apps.get_model("shortener", "ClickEvent")
+    AccountClickTotal = apps.get_model("shortener", "AccountClickTotal")
+    DailyClickRollup = apps.get_model("shortener", "DailyClickRollup")
+    db = schema_editor.connection.alias
+
+    rows = (
+        ClickEvent.objects.using(db)
+        .annotate(day=TruncDate("created_at"))
+        .values_list("short_url__user_id", "day")
+        .annotate(clicks=Count("id"))
+        .order_by()
+    )
+    totals = {}
+    daily = []
+    for user_id, day, clicks in rows.iterator(chunk_size=2000):
+        totals[user_id] = totals.get(user_id, 0) + clicks
+        daily.append(DailyClickRollup(user_id=user_id, day=day, clicks=clicks))
+    DailyClickRollup.objects.using(db).bulk_create(daily, batch_size=2000)
+    AccountClickTotal.objects.using(db).bulk_create(
+        [AccountClickTotal(user_id=user_id, clicks=clicks) for user_id, clicks in totals.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shortener', '0007_click_enrichment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClickRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('clicks', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'daily_click_rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='AccountClickTotal',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('clicks', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'account_click_totals',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyclickrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='uniq_daily_click_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountclicktotal',
+            constraint=models.UniqueConstraint(fields=('user',), name='uniq_account_click_total'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
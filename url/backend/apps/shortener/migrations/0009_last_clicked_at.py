@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0008_account_click_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountclicktotal',
+            name='last_clicked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shorturl',
+            name='last_clicked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
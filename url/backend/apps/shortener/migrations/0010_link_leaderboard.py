@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_leaderboard(apps, schema_editor):
+    """Seed the leaderboard with every link clicked so far on this database."""
+    ShortURL = apps.get_model("shortener", "ShortURL")
+    LeaderboardEntry = apps.get_model("shortener", "LeaderboardEntry")
+    db = schema_editor.connection.alias
+
+    rows = (
+        ShortURL.objects.using(db)
+        .filter(click_count__gt=0)
+        .values_list("pk", "user_id", "click_count")
+    )
+    batch = []
+    for pk, user_id, clicks in rows.iterator(chunk_size=2000):
+        batch.append(LeaderboardEntry(short_url_id=pk, user_id=user_id, clicks=clicks))
+        if len(batch) >= 2000:
+            LeaderboardEntry.objects.using(db).bulk_create(batch)
+            batch.clear()
+    LeaderboardEntry.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shortener', '0009_last_clicked_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('short_url', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard_entry', serialize=False, to='shortener.shorturl')),
+                ('clicks', models.BigIntegerField()),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'link_leaderboard',
+                'indexes': [models.Index(fields=['-clicks'], name='idx_leaderboard_clicks'), models.Index(fields=['user', '-clicks'], name='idx_leaderboard_user_clicks')],
+            },
+        ),
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    """
+    ``CREATE INDEX CONCURRENTLY`` on PostgreSQL, so ``click_events`` stays
+    writable while the index builds; a plain ``AddIndex`` elsewhere.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('shortener', '0010_link_leaderboard'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='clickevent',
+            index=models.Index(fields=['short_url', 'created_at'], name='idx_click_url_created'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='shorturl',
+            index=models.Index(fields=['expires_at'], name='idx_shorturl_expires'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:03
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour
+import django.db.models.deletion
+
+HOUR, DAY = 3600, 86400
+
+
+def backfill_link_rollups(apps, schema_editor):
+    """Seed hourly and daily rollups from existing click events on this database."""
+    ClickEvent = apps.get_model("shortener", "ClickEvent")
+    LinkClickRollup = apps.get_model("shortener", "LinkClickRollup")
+    db = schema_editor.connection.alias
+
+    for resolution, trunc in ((HOUR, TruncHour), (DAY, TruncDay)):
+        rows = (
+            ClickEvent.objects.using(db)
+            .annotate(start=trunc("created_at"))
+            .values_list("short_url_id", "start")
+            .annotate(clicks=Count("id"))
+            .order_by()
+        )
+        LinkClickRollup.objects.using(db).bulk_create(
+            (
+                LinkClickRollup(
+                    short_url_id=short_url_id, resolution=resolution, start=start, clicks=clicks
+                )
+                for short_url_id, start, clicks in rows.iterator(chunk_size=2000)
+            ),
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0011_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkClickRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('resolution', models.PositiveIntegerField(choices=[(3600, 'Hour'), (86400, 'Day')])),
+                ('start', models.DateTimeField()),
+                ('clicks', models.BigIntegerField(default=0)),
+                ('short_url', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='click_rollups', to='shortener.shorturl')),
+            ],
+            options={
+                'db_table': 'link_click_rollups',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='linkclickrollup',
+            constraint=models.UniqueConstraint(fields=('short_url', 'resolution', 'start'), name='uniq_link_click_rollup'),
+        ),
+        migrations.RunPython(backfill_link_rollups, migrations.RunPython.noop),
+    ]
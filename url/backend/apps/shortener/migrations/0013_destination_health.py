@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0012_link_click_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='destination',
+            name='health_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='health_error',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='health_http_status',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='health_status',
+            field=models.CharField(choices=[('unchecked', 'Not checked yet'), ('ok', 'OK'), ('broken', 'Broken'), ('unreachable', 'Unreachable')], default='unchecked', max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['health_checked_at'], name='idx_destination_checked'),
+        ),
+    ]
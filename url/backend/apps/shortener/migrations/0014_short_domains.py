@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:27
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('shortener', '0013_destination_health'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortDomain',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('host', models.CharField(max_length=253, unique=True, validators=[django.core.validators.RegexValidator('^(?=.{4,253}$)([a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?\\.)+[a-z][a-z0-9-]{0,61}[a-z0-9]$', 'Enter a valid host name.')])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='short_domain', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'short_domains',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_username'),
+        ('shortener', '0014_short_domains'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkListVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('token', models.CharField(max_length=32)),
+                ('modified_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'link_list_versions',
+            },
+        ),
+    ]
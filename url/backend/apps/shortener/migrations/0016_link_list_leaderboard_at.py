@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0015_link_list_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='linklistversion',
+            name='leaderboard_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
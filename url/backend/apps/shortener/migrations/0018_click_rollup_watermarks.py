@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:32
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def start_after_existing_clicks(apps, schema_editor):
+    # Clicks so far were rolled up as they happened.
+    alias = schema_editor.connection.alias
+    ClickEvent = apps.get_model("shortener", "ClickEvent")
+    ClickRollupWatermark = apps.get_model("shortener", "ClickRollupWatermark")
+    last = ClickEvent.objects.using(alias).aggregate(last=Max("id"))["last"]
+    ClickRollupWatermark.objects.using(alias).create(last_event_id=last or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shortener', '0017_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClickRollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'click_rollup_watermarks',
+            },
+        ),
+        migrations.RunPython(start_after_existing_clicks, migrations.RunPython.noop),
+    ]
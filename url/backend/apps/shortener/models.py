@@ -1,43 +1,250 @@
 """
-Shortener domain models — ShortURL and ClickEvent.
+Shortener domain models — ShortURL, its interned Destination, ClickEvent
+and the UserShard index.
 """
 
+import hashlib
 import uuid
 
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.validators import RegexValidator
+from django.db import models, router
+
+from apps.common.constants import SHORT_DOMAIN_REGEX
+
+from .sharding import shard_for_key
+
+
+class Destination(models.Model):
+    """
+    A destination URL, stored once however many links point at it.
+
+    Keeps the 2 KB URL out of ``short_urls`` so the redirect table stays
+    small enough to live in the buffer cache. Lives on the same database
+    (shard) as the links that use it.
+
+    The ``health_*`` columns hold the last background probe of the URL
+    (``apps/shortener/health.py``), shared by every link to it.
+    """
+
+    class Health(models.TextChoices):
+        UNCHECKED = "unchecked", "Not checked yet"
+        OK = "ok", "OK"
+        # The server answered with a 4xx/5xx status (or redirected in a loop).
+        BROKEN = "broken", "Broken"
+        # No HTTP answer: DNS failure, refused connection, TLS error, timeout.
+        UNREACHABLE = "unreachable", "Unreachable"
+
+    id = models.BigAutoField(primary_key=True)
+    url_hash = models.BinaryField(max_length=16, unique=True)
+    url = models.URLField(max_length=2048)
+    health_status = models.CharField(
+        max_length=12, choices=Health.choices, default=Health.UNCHECKED
+    )
+    health_http_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    health_error = models.CharField(max_length=255, blank=True, default="")
+    health_checked_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "destinations"
+        indexes = [
+            models.Index(fields=["health_checked_at"], name="idx_destination_checked"),
+        ]
+
+    def __str__(self) -> str:
+        return self.url[:80]
+
+    @staticmethod
+    def hash_url(url: str) -> bytes:
+        return hashlib.blake2b(url.encode(), digest_size=16).digest()
+
+    @classmethod
+    def intern(cls, url: str, *, using: str = "default") -> "Destination":
+        """Return the row for *url* on database *using*, creating it if needed."""
+        destination, _ = cls.objects.using(using).get_or_create(
+            url_hash=cls.hash_url(url), defaults={"url": url}
+        )
+        return destination
+
+    @classmethod
+    def intern_many(cls, urls, *, using: str = "default") -> dict[str, int]:
+        """Bulk ``intern``: return ``{url: destination id}`` for every URL in *urls*."""
+        by_hash = {cls.hash_url(url): url for url in urls}
+
+        def lookup(hashes):
+            rows = cls.objects.using(using).filter(url_hash__in=hashes)
+            return {bytes(url_hash): pk for url_hash, pk in rows.values_list("url_hash", "pk")}
+
+        ids = lookup(list(by_hash))
+        missing = [url_hash for url_hash in by_hash if url_hash not in ids]
+        if missing:
+            cls.objects.using(using).bulk_create(
+                [cls(url_hash=url_hash, url=by_hash[url_hash]) for url_hash in missing],
+                ignore_conflicts=True,
+            )
+            ids.update(lookup(missing))
+        return {by_hash[url_hash]: pk for url_hash, pk in ids.items()}
+
+
+class ShardedQuerySet(models.QuerySet):
+    """
+    ``create()`` without ``using()`` lets the router place the new row by
+    its ``initial_shard`` instead of pinning it to the manager's default
+    database.
+    """
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
 
 
 class ShortURL(models.Model):
-    """A shortened URL owned by a user."""
+    """
+    A shortened URL owned by a user.
+
+    ``original_url`` and ``custom_key`` are properties over the compact
+    columns (``destination`` and ``is_custom``); both can still be passed
+    to the constructor and assigned, and the destination is interned on
+    ``save()``.
+    """
+
+    class RedirectType(models.TextChoices):
+        TEMPORARY = "temporary", "Temporary (302)"
+        PERMANENT = "permanent", "Permanent (301)"
+
+    class AnalyticsMode(models.TextChoices):
+        # Every click reaches the origin and is counted; redirects are
+        # marked uncacheable.
+        EXACT = "exact", "Exact"
+        # Redirects are cacheable by browsers and CDNs; clicks served from
+        # a cache never reach the origin and are not counted.
+        EDGE = "edge", "Edge-cached"
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # No database-level constraint: with sharding, users live on the
+    # primary while links may live on another database. The cascade is
+    # enforced by Django either way.
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="short_urls",
+        db_constraint=False,
+    )
+    destination = models.ForeignKey(
+        Destination,
+        on_delete=models.PROTECT,
+        related_name="short_urls",
     )
-    original_url = models.URLField(max_length=2048)
     short_key = models.CharField(max_length=20, unique=True, db_index=True)
-    custom_key = models.CharField(max_length=20, blank=True, null=True)
+    is_custom = models.BooleanField(default=False)
     click_count = models.PositiveIntegerField(default=0)
+    # Set with each click alongside click_count; a cheap freshness validator.
+    last_clicked_at = models.DateTimeField(blank=True, null=True)
     expires_at = models.DateTimeField(blank=True, null=True)
+    redirect_type = models.CharField(
+        max_length=10, choices=RedirectType.choices, default=RedirectType.TEMPORARY
+    )
+    analytics_mode = models.CharField(
+        max_length=10, choices=AnalyticsMode.choices, default=AnalyticsMode.EXACT
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         db_table = "short_urls"
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["user", "created_at"], name="idx_user_created"),
+            models.Index(fields=["created_at"], name="idx_shorturl_created"),
+            models.Index(fields=["user", "destination"], name="idx_user_destination"),
+            models.Index(fields=["expires_at"], name="idx_shorturl_expires"),
         ]
 
+    _pending_url = None
+
     def __str__(self) -> str:
         return f"{self.short_key} → {self.original_url[:60]}"
 
+    @property
+    def initial_shard(self) -> str | None:
+        """Where a new link is saved without ``using()`` (see ``core.db_router``)."""
+        return shard_for_key(self.short_key) if self.short_key else None
+
+    @property
+    def original_url(self) -> str:
+        if self._pending_url is not None:
+            return self._pending_url
+        return self.destination.url
+
+    @original_url.setter
+    def original_url(self, url: str) -> None:
+        self._pending_url = url
+
+    @property
+    def custom_key(self) -> str | None:
+        return self.short_key if self.is_custom else None
 
-class ClickEvent(models.Model):
-    """Records a single redirect / click on a ShortURL."""
+    @custom_key.setter
+    def custom_key(self, value) -> None:
+        self.is_custom = bool(value)
+
+    def save(self, *args, **kwargs):
+        if self._pending_url is not None:
+            using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+            self.destination = Destination.intern(self._pending_url, using=using)
+            self._pending_url = None
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "destination"}
+        super().save(*args, **kwargs)
+
+
+class LinkShardMixin:
+    """Rows of a link saved without ``using()`` go to the link's shard."""
+
+    @property
+    def initial_shard(self) -> str | None:
+        link = self._state.fields_cache.get("short_url")
+        return link._state.db if link is not None else None
+
+
+class ClickEvent(LinkShardMixin, models.Model):
+    """
+    Records a single redirect / click on a ShortURL.
+
+    Device, browser, OS, referrer host and country are derived once at
+    ingest (see ``apps.shortener.enrichment``) so breakdowns are plain
+    ``GROUP BY`` queries over small columns.
+    """
+
+    class Device(models.IntegerChoices):
+        UNKNOWN = 0, "Unknown"
+        DESKTOP = 1, "Desktop"
+        MOBILE = 2, "Mobile"
+        TABLET = 3, "Tablet"
+        BOT = 4, "Bot"
+
+    class Browser(models.IntegerChoices):
+        OTHER = 0, "Other"
+        CHROME = 1, "Chrome"
+        SAFARI = 2, "Safari"
+        FIREFOX = 3, "Firefox"
+        EDGE = 4, "Edge"
+        OPERA = 5, "Opera"
+        SAMSUNG = 6, "Samsung Internet"
+
+    class OperatingSystem(models.IntegerChoices):
+        OTHER = 0, "Other"
+        WINDOWS = 1, "Windows"
+        MACOS = 2, "macOS"
+        IOS = 3, "iOS"
+        ANDROID = 4, "Android"
+        LINUX = 5, "Linux"
+        CHROME_OS = 6, "ChromeOS"
 
     id = models.BigAutoField(primary_key=True)
     short_url = models.ForeignKey(
@@ -47,11 +254,325 @@ class ClickEvent(models.Model):
     )
     ip_address = models.GenericIPAddressField()
     user_agent = models.TextField(blank=True, default="")
+    referrer_host = models.CharField(max_length=255, blank=True, default="")
+    device = models.PositiveSmallIntegerField(choices=Device.choices, default=Device.UNKNOWN)
+    browser = models.PositiveSmallIntegerField(choices=Browser.choices, default=Browser.OTHER)
+    os = models.PositiveSmallIntegerField(
+        choices=OperatingSystem.choices, default=OperatingSystem.OTHER
+    )
+    # ISO 3166-1 alpha-2; blank when unknown.
+    country = models.CharField(max_length=2, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         db_table = "click_events"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"], name="idx_click_created"),
+            # A link's latest clicks without sorting all of them.
+            models.Index(fields=["short_url", "created_at"], name="idx_click_url_created"),
+        ]
 
     def __str__(self) -> str:
         return f"Click on {self.short_url.short_key} from {self.ip_address}"
+
+
+class ShortDomain(models.Model):
+    """
+    A user's own short-link host (``go.example.com``).
+
+    The owner's links render as ``<scheme>://<host>/<key>``, and requests to
+    the host only resolve the owner's links (see ``apps.shortener.domains``).
+    Always stored on the primary. Pointing DNS at the service, TLS and
+    ``ALLOWED_HOSTS`` are deployment steps.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="short_domain",
+    )
+    host = models.CharField(
+        max_length=253,
+        unique=True,
+        validators=[RegexValidator(SHORT_DOMAIN_REGEX, "Enter a valid host name.")],
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "short_domains"
+
+    def __str__(self) -> str:
+        return self.host
+
+    def clean_fields(self, exclude=None) -> None:
+        self.host = self.host.strip().lower().rstrip(".")
+        super().clean_fields(exclude)
+
+    def clean(self) -> None:
+        from .domains import default_host
+
+        if self.host == default_host():
+            raise ValidationError({"host": "This is the service's own short domain."})
+
+
+class LinkListVersion(models.Model):
+    """
+    A random token replaced whenever a user's link list changes; the list
+    ETag is built from it (see ``apps.shortener.versions``).
+
+    Always stored on the primary, so every worker sees the same version.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="+",
+    )
+    token = models.CharField(max_length=32)
+    modified_at = models.DateTimeField()
+    # Last time a leaderboard flush or repair wrote one of the user's
+    # entries; top links change then, not with each click.
+    leaderboard_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "link_list_versions"
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.token}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    An ``Idempotency-Key`` seen on ``POST /api/urls/`` and the link it
+    created (``url_id`` is empty while the first request runs).
+
+    Always stored on the primary: the unique ``(user, key)`` constraint is
+    what makes concurrent retries on different workers collapse into one
+    create. Rows past ``expires_at`` may be claimed again, and are purged
+    by the ``purge_idempotency_keys`` task.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    # SHA-256 of the client's key, so any header value fits the column.
+    key = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=64)
+    url_id = models.UUIDField(blank=True, null=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "idempotency_keys"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="uniq_idempotency_key"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.key[:12]}"
+
+
+class UserShard(models.Model):
+    """
+    Which short_urls shards hold links for a user.
+
+    Always stored on the primary database; only maintained when more than
+    one shard is configured (see ``apps.shortener.sharding``).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="link_shards",
+    )
+    shard = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = "user_shards"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "shard"], name="uniq_user_shard"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id} → {self.shard}"
+
+
+class AccountClickTotal(models.Model):
+    """
+    Running click total for a user's links, rolled up from ``ClickEvent``
+    by a periodic task (see ``apps.shortener.rollups``).
+
+    One row per user on each shard holding their links (sharded like
+    ``ClickEvent``), so account totals never sum ``click_count`` over rows.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="+",
+    )
+    clicks = models.BigIntegerField(default=0)
+    last_clicked_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "account_click_totals"
+        constraints = [
+            models.UniqueConstraint(fields=["user"], name="uniq_account_click_total"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.clicks}"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    The last line of an ``import_links`` source file whose links this shard
+    has committed, written in the same transaction as those links.
+
+    Sharded like the links themselves: a resumed import skips rows at or
+    below the checkpoint of the shard they would be written to, however the
+    interrupted run ended (see ``services.bulk_import_short_urls``).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="+",
+    )
+    source = models.CharField(max_length=1024)
+    line = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "import_checkpoints"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "source"], name="uniq_import_checkpoint"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.source}: line {self.line}"
+
+
+class ClickRollupWatermark(models.Model):
+    """
+    The last ``ClickEvent`` id on this shard already added to the click
+    rollups. One row per shard, locked while a rollup batch is applied.
+    """
+
+    last_event_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "click_rollup_watermarks"
+
+    def __str__(self) -> str:
+        return f"rolled up to {self.last_event_id}"
+
+
+class DailyClickRollup(models.Model):
+    """Clicks per user per (UTC) day, rolled up from ``click_events``."""
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="+",
+    )
+    day = models.DateField()
+    clicks = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "daily_click_rollups"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="uniq_daily_click_rollup"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id} {self.day}: {self.clicks}"
+
+
+class LinkClickRollup(LinkShardMixin, models.Model):
+    """
+    Clicks on one link per UTC hour and per UTC day, rolled up from
+    ``click_events`` by a periodic task. Sharded with its link.
+
+    The time-series endpoint reads the coarsest resolution that still fits
+    the requested buckets — a year by day is 365 rows, by hour 8,760 —
+    instead of scanning ``click_events``.
+    """
+
+    class Resolution(models.IntegerChoices):
+        # Values are bucket widths in seconds.
+        HOUR = 3_600, "Hour"
+        DAY = 86_400, "Day"
+
+    id = models.BigAutoField(primary_key=True)
+    short_url = models.ForeignKey(
+        ShortURL,
+        on_delete=models.CASCADE,
+        related_name="click_rollups",
+    )
+    resolution = models.PositiveIntegerField(choices=Resolution.choices)
+    start = models.DateTimeField()
+    clicks = models.BigIntegerField(default=0)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        db_table = "link_click_rollups"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["short_url", "resolution", "start"], name="uniq_link_click_rollup"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.short_url_id} {self.start:%Y-%m-%d %H:%M}: {self.clicks}"
+
+
+class LeaderboardEntry(LinkShardMixin, models.Model):
+    """
+    A clicked link's ``click_count``, copied by the leaderboard flush.
+
+    Kept apart from ``short_urls`` so top-K queries can walk an index on
+    ``clicks`` without every click having to update an index on the hot
+    ``short_urls`` row. Sharded with its link.
+    """
+
+    short_url = models.OneToOneField(
+        ShortURL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="leaderboard_entry",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="+",
+    )
+    clicks = models.BigIntegerField()
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        db_table = "link_leaderboard"
+        indexes = [
+            models.Index(fields=["-clicks"], name="idx_leaderboard_clicks"),
+            models.Index(fields=["user", "-clicks"], name="idx_leaderboard_user_clicks"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.short_url_id}: {self.clicks}"
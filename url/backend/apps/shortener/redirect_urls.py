@@ -1,11 +1,14 @@
 """Public redirect URL routing (mounted at / in root URLconf)."""
 
-from django.urls import path
+from django.urls import path, register_converter
 
 from . import views
+from .converters import ShortKeyConverter
+
+register_converter(ShortKeyConverter, "short_key")
 
 app_name = "redirect"
 
 urlpatterns = [
-    path("<str:short_key>/", views.RedirectView.as_view(), name="redirect"),
+    path("<short_key:short_key>/", views.RedirectView.as_view(), name="redirect"),
 ]
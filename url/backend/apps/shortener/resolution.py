@@ -0,0 +1,190 @@
+"""
+Per-process resolution cache for the redirect hot path.
+
+Maps ``short_key`` → the few columns a redirect needs, so repeat clicks on
+the same link skip the lookup query. Entries are dropped on update/delete
+in this process (signals) and expire after ``RESOLUTION_CACHE_TTL_SECONDS``
+everywhere else, which bounds how long another worker can serve a stale
+destination.
+
+``warm_up`` preloads the links with the most recent clicks, so a fresh
+worker does not send every redirect to the database at once.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.logging import shortener_logger as logger
+
+# Hit ratio is reported once, this long after warm-up.
+REPORT_AFTER_SECONDS = 60
+
+
+# Columns a redirect needs, in ``ResolvedLink`` order.
+REDIRECT_COLUMNS = (
+    "pk", "destination__url", "expires_at", "redirect_type", "analytics_mode", "user_id",
+)
+
+
+class ResolvedLink(NamedTuple):
+    pk: object
+    original_url: str
+    expires_at: object
+    redirect_type: str
+    analytics_mode: str
+    user_id: object
+    loaded_at: float
+
+
+class ResolutionCache:
+    """Thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, *, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._warmed_at = None
+        self._reported = False
+
+    def get(self, short_key: str) -> ResolvedLink | None:
+        with self._lock:
+            link = self._entries.get(short_key)
+            if link is not None and time.monotonic() - link.loaded_at < self.ttl_seconds:
+                self._entries.move_to_end(short_key)
+                self.hits += 1
+            else:
+                if link is not None:
+                    del self._entries[short_key]
+                link = None
+                self.misses += 1
+            self._maybe_report()
+        return link
+
+    def put(
+        self,
+        short_key: str,
+        pk,
+        original_url: str,
+        expires_at,
+        redirect_type: str = "temporary",
+        analytics_mode: str = "exact",
+        user_id=None,
+    ) -> ResolvedLink:
+        link = ResolvedLink(
+            pk, original_url, expires_at, redirect_type, analytics_mode, user_id,
+            time.monotonic(),
+        )
+        with self._lock:
+            self._entries[short_key] = link
+            self._entries.move_to_end(short_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return link
+
+    def discard(self, short_key: str) -> None:
+        with self._lock:
+            self._entries.pop(short_key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self._warmed_at = None
+            self._reported = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _maybe_report(self) -> None:
+        if self._reported or self._warmed_at is None:
+            return
+        if time.monotonic() - self._warmed_at < REPORT_AFTER_SECONDS:
+            return
+        self._reported = True
+        total = self.hits + self.misses
+        logger.info(
+            "Resolution cache first-minute hit ratio: %.1f%% (%d hits / %d lookups)",
+            100 * self.hits / total if total else 0.0,
+            self.hits,
+            total,
+        )
+
+    def warm_up(self, *, limit: int, budget_seconds: float, window_hours: int) -> int:
+        """
+        Load the *limit* links with the most clicks in the last
+        *window_hours* hours, giving up once *budget_seconds* is spent.
+        With several shards, each contributes an equal share of *limit*.
+
+        Returns the number of links loaded.
+        """
+        started = time.monotonic()
+        deadline = started + budget_seconds
+        since = timezone.now() - timedelta(hours=window_hours)
+        shards = settings.SHORT_URL_SHARDS
+        loaded = 0
+        for shard in shards:
+            if time.monotonic() >= deadline:
+                break
+            try:
+                loaded += self._warm_shard(shard, since, limit // len(shards) or 1, deadline)
+            except Exception:
+                logger.warning("Resolution cache warm-up aborted on %s.", shard, exc_info=True)
+
+        with self._lock:
+            self.hits = self.misses = 0
+            self._warmed_at = time.monotonic()
+            self._reported = False
+        logger.info(
+            "Resolution cache warmed: %d links in %.1fms",
+            loaded,
+            (time.monotonic() - started) * 1000,
+        )
+        return loaded
+
+    def _warm_shard(self, shard: str, since, limit: int, deadline: float) -> int:
+        from .models import ClickEvent, ShortURL
+
+        loaded = 0
+        with transaction.atomic(using=shard):
+            if connections[shard].vendor == "postgresql":
+                with connections[shard].cursor() as cursor:
+                    cursor.execute(
+                        "SET LOCAL statement_timeout = %s",
+                        [max(1, int((deadline - time.monotonic()) * 1000))],
+                    )
+            hottest = list(
+                ClickEvent.objects.using(shard)
+                .filter(created_at__gte=since)
+                .values("short_url_id")
+                .annotate(clicks=Count("id"))
+                .order_by("-clicks")
+                .values_list("short_url_id", flat=True)[:limit]
+            )
+            rows = (
+                ShortURL.objects.using(shard)
+                .filter(pk__in=hottest)
+                .values_list("short_key", *REDIRECT_COLUMNS)
+            )
+            for short_key, *columns in rows.iterator(chunk_size=1000):
+                self.put(short_key, *columns)
+                loaded += 1
+                if time.monotonic() > deadline:
+                    break
+        return loaded
+
+
+resolution_cache = ResolutionCache(
+    max_size=settings.RESOLUTION_CACHE_SIZE,
+    ttl_seconds=settings.RESOLUTION_CACHE_TTL_SECONDS,
+)
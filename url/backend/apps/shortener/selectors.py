@@ -5,33 +5,370 @@ These functions return optimised QuerySets for listing and analytics.
 Views call selectors for reads and services for writes.
 """
 
-from .models import ClickEvent, ShortURL
+import heapq
+from datetime import timedelta
+from functools import reduce
+from itertools import chain
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from . import timeseries
+from .models import (
+    AccountClickTotal,
+    ClickEvent,
+    DailyClickRollup,
+    Destination,
+    LeaderboardEntry,
+    LinkClickRollup,
+    ShortURL,
+)
+from .sharding import read_alias, user_shards
+from .versions import links_version
 
 
 def get_user_short_urls(*, user):
-    """Return all ShortURLs for *user*, newest first."""
-    return ShortURL.objects.filter(user=user).order_by("-created_at")
+    """
+    Return all ShortURLs for *user*, newest first (replica read).
+
+    A QuerySet when the user's links live on one shard; otherwise the
+    per-shard results merged into a list.
+    """
+    querysets = [
+        ShortURL.objects
+        .using(read_alias(shard, f"user:{user.pk}"))
+        .filter(user=user)
+        .select_related("destination")
+        .order_by("-created_at")
+        for shard in user_shards(user)
+    ]
+    if not querysets:
+        return ShortURL.objects.none()
+    if len(querysets) == 1:
+        return querysets[0]
+    return list(
+        heapq.merge(*querysets, key=lambda short_url: short_url.created_at, reverse=True)
+    )
+
+
+def get_links_freshness(*, user) -> tuple[tuple, object]:
+    """
+    Cheap validators for *user*'s link list: ``(parts, last_modified)``.
+
+    ``parts`` changes whenever the list payload can: the stored links
+    version (create/edit/delete) plus the account click rollup, read from
+    the same database as the list itself. Click counts move the rollup
+    when ``roll_up_clicks`` next runs, so they may lag by that much.
+    """
+    token, modified, _, clicks, last_clicked = _account_versions(user)
+    last_modified = max(filter(None, (modified, last_clicked)))
+    return (token, clicks, last_clicked), last_modified
+
+
+def get_account_analytics_freshness(*, user) -> tuple[tuple, object]:
+    """
+    ``get_links_freshness`` plus the leaderboard watermark: top links are
+    read from ``link_leaderboard``, which catches up with clicks only when
+    a worker flushes.
+    """
+    token, modified, leaderboard_at, clicks, last_clicked = _account_versions(user)
+    last_modified = max(filter(None, (modified, last_clicked, leaderboard_at)))
+    return (token, clicks, last_clicked, leaderboard_at), last_modified
+
+
+def _account_versions(user) -> tuple:
+    token, modified, leaderboard_at = links_version(user.pk)
+    clicks, last_clicked = 0, None
+    for shard in user_shards(user):
+        row = (
+            AccountClickTotal.objects
+            .using(read_alias(shard, f"user:{user.pk}"))
+            .filter(user=user)
+            .values_list("clicks", "last_clicked_at")
+            .first()
+        )
+        if row is not None:
+            clicks += row[0]
+            if row[1] and (last_clicked is None or row[1] > last_clicked):
+                last_clicked = row[1]
+    return token, modified, leaderboard_at, clicks, last_clicked
 
 
 def get_short_url_by_id(*, url_id, user):
     """Return a single ShortURL owned by *user*, or ``None``."""
-    return ShortURL.objects.filter(pk=url_id, user=user).first()
+    for shard in user_shards(user):
+        short_url = (
+            ShortURL.objects.using(shard)
+            .filter(pk=url_id, user=user)
+            .select_related("destination")
+            .first()
+        )
+        if short_url is not None:
+            return short_url
+    return None
+
+
+def get_existing_short_url(*, user, original_url: str):
+    """
+    Return *user*'s most recent link to *original_url*, or ``None``.
+
+    An indexed lookup on ``(user, destination)`` via the URL hash — the
+    URL itself is never compared in a query.
+    """
+    url_hash = Destination.hash_url(original_url)
+    for shard in user_shards(user):
+        short_url = (
+            ShortURL.objects.using(shard)
+            .filter(user=user, destination__url_hash=url_hash)
+            .select_related("destination")
+            .order_by("-created_at")
+            .first()
+        )
+        if short_url is not None:
+            return short_url
+    return None
+
+
+LINK_EXPORT_COLUMNS = (
+    "short_key",
+    "destination__url",
+    "click_count",
+    "redirect_type",
+    "analytics_mode",
+    "expires_at",
+    "created_at",
+)
+CLICK_EXPORT_COLUMNS = (
+    "id", "created_at", "ip_address", "user_agent", "referrer_host", "country",
+)
+
+
+def iter_keyset(queryset, *, keys, fields, chunk_size: int):
+    """
+    Yield *fields* tuples of *queryset* in ascending order of *keys* (which
+    must identify a row), *chunk_size* rows per query.
+
+    Each query resumes after the last row of the previous one instead of
+    holding a server-side cursor open, so memory stays bounded even where
+    such cursors are disabled (``DISABLE_SERVER_SIDE_CURSORS`` behind
+    PgBouncer in transaction mode).
+    """
+    queryset = queryset.order_by(*keys)
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(_after(keys, last))
+        rows = list(page.values_list(*keys, *fields)[:chunk_size])
+        for row in rows:
+            yield row[len(keys):]
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][: len(keys)]
+
+
+def _after(keys, values) -> Q:
+    """Rows that sort after *values* on *keys* (ascending)."""
+    return reduce(or_, (
+        Q(**dict(zip(keys[:i], values[:i])), **{f"{keys[i]}__gt": values[i]})
+        for i in range(len(keys))
+    ))
+
+
+def iter_user_links_for_export(*, user, chunk_size: int = 2000):
+    """
+    Yield ``LINK_EXPORT_COLUMNS`` tuples for all of *user*'s links, oldest
+    first per shard, in keyset-paginated chunks.
+    """
+    for shard in user_shards(user):
+        rows = (
+            ShortURL.objects
+            .using(read_alias(shard, f"user:{user.pk}"))
+            .filter(user=user)
+        )
+        yield from iter_keyset(
+            rows, keys=("created_at", "id"), fields=LINK_EXPORT_COLUMNS, chunk_size=chunk_size
+        )
+
+
+def iter_click_events_for_export(*, short_url: ShortURL, chunk_size: int = 2000):
+    """Yield ``CLICK_EXPORT_COLUMNS`` tuples for every click on *short_url*."""
+    rows = (
+        ClickEvent.objects
+        .using(read_alias(short_url._state.db, f"user:{short_url.user_id}"))
+        .filter(short_url=short_url)
+    )
+    return iter_keyset(rows, keys=("id",), fields=CLICK_EXPORT_COLUMNS, chunk_size=chunk_size)
+
+
+def _history_sources(user) -> list[tuple[str, dict]]:
+    """``(alias, filters)`` per shard for *user*'s rows, or everyone's."""
+    if user is None:
+        return [(read_alias(shard), {}) for shard in settings.SHORT_URL_SHARDS]
+    return [
+        (read_alias(shard, f"user:{user.pk}"), {"short_url__user": user})
+        for shard in user_shards(user)
+    ]
 
 
-def get_analytics(*, short_url: ShortURL, limit: int = 50) -> dict:
+def iter_click_history(*, fields, start=None, end=None, user=None, chunk_size: int = 2000):
+    """
+    Yield *fields* tuples for clicks in ``[start, end)`` — *user*'s, or
+    everyone's — oldest first per shard (``idx_click_created``), in
+    keyset-paginated chunks.
+    """
+    for alias, filters in _history_sources(user):
+        rows = ClickEvent.objects.using(alias).filter(**filters)
+        if start is not None:
+            rows = rows.filter(created_at__gte=start)
+        if end is not None:
+            rows = rows.filter(created_at__lt=end)
+        yield from iter_keyset(
+            rows, keys=("created_at", "id"), fields=fields, chunk_size=chunk_size
+        )
+
+
+def iter_link_rollup_history(*, fields, start=None, end=None, user=None, chunk_size: int = 2000):
+    """``iter_click_history`` for the hourly and daily ``LinkClickRollup`` rows."""
+    for alias, filters in _history_sources(user):
+        rows = LinkClickRollup.objects.using(alias).filter(**filters)
+        if start is not None:
+            rows = rows.filter(start__gte=start)
+        if end is not None:
+            rows = rows.filter(start__lt=end)
+        yield from iter_keyset(
+            rows,
+            keys=("short_url_id", "resolution", "start"),
+            fields=fields,
+            chunk_size=chunk_size,
+        )
+
+
+# Enriched ClickEvent columns broken down by ``get_analytics``.
+BREAKDOWN_FIELDS = ("device", "browser", "os", "country", "referrer_host")
+
+
+def get_analytics(*, short_url: ShortURL, limit: int = 50, top: int = 10) -> dict:
     """
     Return analytics for a ShortURL:
     – the ShortURL itself
     – total click_count
-    – most recent *limit* click events (select_related to avoid N+1)
+    – most recent *limit* click events,
+    – the *top* values of each ``BREAKDOWN_FIELDS`` column with counts,
+    all read from the link's shard (a replica for the primary shard)
     """
-    recent_clicks = (
+    clicks = (
         ClickEvent.objects
+        .using(read_alias(short_url._state.db, f"user:{short_url.user_id}"))
         .filter(short_url=short_url)
-        .order_by("-created_at")[:limit]
     )
     return {
         "short_url": short_url,
         "click_count": short_url.click_count,
-        "recent_clicks": recent_clicks,
+        "recent_clicks": clicks.order_by("-created_at")[:limit],
+        "breakdowns": {
+            field: _breakdown(clicks, field, top) for field in BREAKDOWN_FIELDS
+        },
     }
+
+
+def _breakdown(clicks, field: str, top: int) -> list[dict]:
+    """``[{"value": label, "count": n}, …]`` for the *top* values of *field*."""
+    labels = dict(ClickEvent._meta.get_field(field).choices or ())
+    rows = (
+        clicks.order_by()
+        .values_list(field)
+        .annotate(count=Count("id"))
+        .order_by("-count", field)[:top]
+    )
+    return [{"value": labels.get(value, value), "count": count} for value, count in rows]
+
+
+def get_click_timeseries(*, short_url: ShortURL, start, end, granularity: str) -> dict:
+    """
+    Return *short_url*'s clicks from *start* to *end* in *granularity*
+    buckets (UTC-aligned, zero-filled, oldest first), read from the
+    coarsest ``LinkClickRollup`` resolution that fits — one indexed range
+    read on the link's shard.
+    """
+    first = timeseries.floor(start, granularity)
+    count = timeseries.bucket_count(first, end, granularity)
+    *starts, stop = timeseries.bucket_starts(first, count + 1, granularity)
+    rows = (
+        LinkClickRollup.objects
+        .using(read_alias(short_url._state.db, f"user:{short_url.user_id}"))
+        .filter(
+            short_url=short_url,
+            resolution=timeseries.stored_resolution(granularity),
+            start__gte=first,
+            start__lt=stop,
+        )
+        .values_list("start", "clicks")
+    )
+    counts = timeseries.assemble(rows, first, count, granularity)
+    return {
+        "granularity": granularity,
+        "start": first,
+        "end": stop,
+        "total": sum(counts),
+        "buckets": [{"start": s, "clicks": c} for s, c in zip(starts, counts)],
+    }
+
+
+def get_account_analytics(*, user, days: int = 30, top: int = 10) -> dict:
+    """
+    Return account-wide analytics for *user*:
+    – total clicks and number of links
+    – the *top* links by clicks (from the leaderboard)
+    – clicks per day for the last *days* days (zero-filled, oldest first)
+
+    Totals and the time series come from the incrementally maintained
+    ``AccountClickTotal`` / ``DailyClickRollup`` rows — a few rows per
+    shard — rather than aggregating links or click events.
+    """
+    aliases = [read_alias(shard, f"user:{user.pk}") for shard in user_shards(user)]
+    since = timezone.localdate() - timedelta(days=days - 1)
+
+    total_clicks = link_count = 0
+    per_day = dict.fromkeys((since + timedelta(days=i) for i in range(days)), 0)
+    for alias in aliases:
+        total_clicks += (
+            AccountClickTotal.objects.using(alias).filter(user=user)
+            .aggregate(total=Sum("clicks"))["total"] or 0
+        )
+        link_count += ShortURL.objects.using(alias).filter(user=user).count()
+        rollups = DailyClickRollup.objects.using(alias).filter(user=user, day__gte=since)
+        for day, clicks in rollups.values_list("day", "clicks"):
+            per_day[day] = per_day.get(day, 0) + clicks
+
+    return {
+        "total_clicks": total_clicks,
+        "link_count": link_count,
+        "top_links": get_top_links(user=user, limit=top),
+        "clicks_over_time": [
+            {"date": day, "clicks": clicks} for day, clicks in sorted(per_day.items())
+        ],
+    }
+
+
+def get_top_links(*, user=None, limit: int = 10) -> list[ShortURL]:
+    """
+    The *limit* most-clicked links — *user*'s, or everyone's — read from
+    the ``link_leaderboard`` indexes: *limit* entries per shard, merged.
+    """
+    if user is None:
+        sources = [(read_alias(shard), {}) for shard in settings.SHORT_URL_SHARDS]
+    else:
+        sources = [
+            (read_alias(shard, f"user:{user.pk}"), {"user": user})
+            for shard in user_shards(user)
+        ]
+    entries = chain.from_iterable(
+        LeaderboardEntry.objects.using(alias)
+        .filter(**filters)
+        .select_related("short_url__destination")
+        .order_by("-clicks")[:limit]
+        for alias, filters in sources
+    )
+    top = heapq.nlargest(limit, entries, key=lambda entry: entry.clicks)
+    return [entry.short_url for entry in top]
@@ -3,31 +3,56 @@ Shortener serializers — validation and transformation only.
 """
 
 import re
+from datetime import timedelta
 
 from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework import serializers
 
-from apps.common.constants import SHORT_KEY_REGEX
-from apps.common.utils import build_short_url
+from apps.common.constants import (
+    ACCOUNT_ANALYTICS_DEFAULT_DAYS,
+    ACCOUNT_ANALYTICS_DEFAULT_TOP,
+    ACCOUNT_ANALYTICS_MAX_DAYS,
+    ACCOUNT_ANALYTICS_MAX_TOP,
+    LEADERBOARD_DEFAULT_LIMIT,
+    LEADERBOARD_MAX_LIMIT,
+    SHORT_KEY_MAX_LENGTH,
+    SHORT_KEY_MIN_LENGTH,
+    SHORT_KEY_REGEX,
+    TIMESERIES_DEFAULT_DAYS,
+    TIMESERIES_MAX_BUCKETS,
+)
 
-from .models import ClickEvent, ShortURL
+from . import columnar, timeseries
+from .domains import short_domains
+from .models import ClickEvent, Destination, ShortURL
 
 
 class ShortURLCreateSerializer(serializers.Serializer):
     """Validate input for creating a shortened URL."""
 
     original_url = serializers.URLField(max_length=2048)
-    custom_key = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    custom_key = serializers.CharField(
+        max_length=SHORT_KEY_MAX_LENGTH, required=False, allow_blank=True
+    )
     expires_at = serializers.DateTimeField(required=False, allow_null=True)
+    redirect_type = serializers.ChoiceField(
+        choices=ShortURL.RedirectType.choices, default=ShortURL.RedirectType.TEMPORARY
+    )
+    analytics_mode = serializers.ChoiceField(
+        choices=ShortURL.AnalyticsMode.choices, default=ShortURL.AnalyticsMode.EXACT
+    )
+    # Return the user's existing link to the same URL instead of a new one.
+    reuse_existing = serializers.BooleanField(default=False)
 
     def validate_custom_key(self, value):
         if value and not re.match(SHORT_KEY_REGEX, value):
             raise serializers.ValidationError(
                 "Custom key must contain only alphanumeric characters."
             )
-        if value and len(value) < 3:
+        if value and len(value) < SHORT_KEY_MIN_LENGTH:
             raise serializers.ValidationError(
-                "Custom key must be at least 3 characters long."
+                f"Custom key must be at least {SHORT_KEY_MIN_LENGTH} characters long."
             )
         return value or None
 
@@ -44,6 +69,12 @@ class ShortURLUpdateSerializer(serializers.Serializer):
 
     original_url = serializers.URLField(max_length=2048, required=False)
     expires_at = serializers.DateTimeField(required=False, allow_null=True)
+    redirect_type = serializers.ChoiceField(
+        choices=ShortURL.RedirectType.choices, required=False
+    )
+    analytics_mode = serializers.ChoiceField(
+        choices=ShortURL.AnalyticsMode.choices, required=False
+    )
 
     def validate_expires_at(self, value):
         if value and value <= timezone.now():
@@ -53,10 +84,25 @@ class ShortURLUpdateSerializer(serializers.Serializer):
         return value
 
 
+class DestinationHealthSerializer(serializers.ModelSerializer):
+    """Last background check of a link's destination (see ``health.py``)."""
+
+    status = serializers.CharField(source="health_status")
+    http_status = serializers.IntegerField(source="health_http_status")
+    error = serializers.CharField(source="health_error")
+    checked_at = serializers.DateTimeField(source="health_checked_at")
+
+    class Meta:
+        model = Destination
+        fields = ("status", "http_status", "error", "checked_at")
+        read_only_fields = fields
+
+
 class ShortURLResponseSerializer(serializers.ModelSerializer):
     """Read-only representation of a ShortURL."""
 
     short_url = serializers.SerializerMethodField()
+    health = DestinationHealthSerializer(source="destination", read_only=True)
 
     class Meta:
         model = ShortURL
@@ -68,13 +114,22 @@ class ShortURLResponseSerializer(serializers.ModelSerializer):
             "custom_key",
             "click_count",
             "expires_at",
+            "redirect_type",
+            "analytics_mode",
+            "health",
             "created_at",
             "updated_at",
         )
         read_only_fields = fields
 
     def get_short_url(self, obj) -> str:
-        return build_short_url(obj.short_key)
+        return self.link_prefixes.short_url(obj.short_key, obj.user_id)
+
+    @cached_property
+    def link_prefixes(self):
+        # One snapshot per response: with ``many=True`` this serializer is
+        # the shared child of every row.
+        return short_domains.snapshot()
 
 
 class ClickEventSerializer(serializers.ModelSerializer):
@@ -82,9 +137,26 @@ class ClickEventSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ClickEvent
-        fields = ("id", "ip_address", "user_agent", "created_at")
+        fields = (
+            "id",
+            "ip_address",
+            "user_agent",
+            "referrer_host",
+            "device",
+            "browser",
+            "os",
+            "country",
+            "created_at",
+        )
         read_only_fields = fields
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["device"] = instance.get_device_display()
+        data["browser"] = instance.get_browser_display()
+        data["os"] = instance.get_os_display()
+        return data
+
 
 class AnalyticsSerializer(serializers.Serializer):
     """Analytics response for a ShortURL."""
@@ -92,3 +164,119 @@ class AnalyticsSerializer(serializers.Serializer):
     short_url = ShortURLResponseSerializer()
     click_count = serializers.IntegerField()
     recent_clicks = ClickEventSerializer(many=True)
+    breakdowns = serializers.DictField(
+        child=serializers.ListField(child=serializers.DictField())
+    )
+
+
+class AccountAnalyticsQuerySerializer(serializers.Serializer):
+    """Validate query parameters for account analytics."""
+
+    days = serializers.IntegerField(
+        min_value=1, max_value=ACCOUNT_ANALYTICS_MAX_DAYS, default=ACCOUNT_ANALYTICS_DEFAULT_DAYS
+    )
+    top = serializers.IntegerField(
+        min_value=1, max_value=ACCOUNT_ANALYTICS_MAX_TOP, default=ACCOUNT_ANALYTICS_DEFAULT_TOP
+    )
+
+
+class DailyClicksSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    clicks = serializers.IntegerField()
+
+
+class AccountAnalyticsSerializer(serializers.Serializer):
+    """Account-wide analytics response."""
+
+    total_clicks = serializers.IntegerField()
+    link_count = serializers.IntegerField()
+    top_links = ShortURLResponseSerializer(many=True)
+    clicks_over_time = DailyClicksSerializer(many=True)
+
+
+class DateRangeQuerySerializer(serializers.Serializer):
+    """Optional ``?from=&to=`` bounds."""
+
+    # ``from`` is a keyword; renamed in get_fields().
+    from_ = serializers.DateTimeField(required=False)
+    to = serializers.DateTimeField(required=False)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = fields.pop("from_")
+        return fields
+
+
+class TimeseriesQuerySerializer(DateRangeQuerySerializer):
+    """
+    Validate ``?from=&to=&granularity=`` for a link's time series.
+
+    ``to`` defaults to now and ``from`` to ``TIMESERIES_DEFAULT_DAYS``
+    before it; the range may span at most ``TIMESERIES_MAX_BUCKETS``.
+    """
+
+    granularity = serializers.ChoiceField(choices=timeseries.GRANULARITIES, default="day")
+
+    def validate(self, attrs):
+        end = attrs.get("to") or timezone.now()
+        start = attrs.get("from") or end - timedelta(days=TIMESERIES_DEFAULT_DAYS)
+        if start >= end:
+            raise serializers.ValidationError({"from": ["Must be earlier than 'to'."]})
+        granularity = attrs["granularity"]
+        first = timeseries.floor(start, granularity)
+        if timeseries.bucket_count(first, end, granularity) > TIMESERIES_MAX_BUCKETS:
+            raise serializers.ValidationError(
+                {"granularity": [
+                    f"Range spans more than {TIMESERIES_MAX_BUCKETS} buckets; "
+                    "use a coarser granularity."
+                ]}
+            )
+        return {"start": start, "end": end, "granularity": granularity}
+
+
+class ColumnarExportQuerySerializer(DateRangeQuerySerializer):
+    """Validate ``?dataset=&fmt=&from=&to=`` for a columnar export (unbounded by default)."""
+
+    dataset = serializers.ChoiceField(choices=tuple(columnar.DATASETS), default="clicks")
+    fmt = serializers.ChoiceField(choices=tuple(columnar.COLUMNAR_FORMATS), default="parquet")
+
+    def validate(self, attrs):
+        start, end = attrs.pop("from", None), attrs.pop("to", None)
+        if start and end and start >= end:
+            raise serializers.ValidationError({"from": ["Must be earlier than 'to'."]})
+        return {**attrs, "start": start, "end": end}
+
+
+class TimeseriesBucketsField(serializers.Field):
+    """
+    ``[{"start": ISO 8601, "clicks": n}, …]``. Bucket starts are whole UTC
+    hours, so they are formatted directly rather than through a nested
+    serializer — a year by hour is 8,760 items.
+    """
+
+    def to_representation(self, buckets):
+        return [
+            {
+                "start": bucket["start"].isoformat().replace("+00:00", "Z"),
+                "clicks": bucket["clicks"],
+            }
+            for bucket in buckets
+        ]
+
+
+class TimeseriesSerializer(serializers.Serializer):
+    """Bucketed clicks for a ShortURL, zero-filled, oldest first."""
+
+    granularity = serializers.CharField()
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    total = serializers.IntegerField()
+    buckets = TimeseriesBucketsField(read_only=True)
+
+
+class TopLinksQuerySerializer(serializers.Serializer):
+    """Validate query parameters for the top-links leaderboard."""
+
+    limit = serializers.IntegerField(
+        min_value=1, max_value=LEADERBOARD_MAX_LIMIT, default=LEADERBOARD_DEFAULT_LIMIT
+    )
@@ -4,15 +4,54 @@ Shortener service layer — all write operations and business logic.
 Views call these functions; they never touch the ORM directly.
 """
 
-from django.db import transaction
-from django.db.models import F
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 
-from apps.common.utils import generate_short_key, get_client_ip
-from core.exceptions import CustomKeyTaken, ShortKeyCollision, URLExpired
+from apps.common.utils import (
+    cache_is_shared,
+    generate_qr_code,
+    generate_short_key,
+    get_client_ip,
+    random_short_key,
+)
+from core.db_router import PRIMARY, pin_to_primary
+from core.exceptions import (
+    CustomKeyTaken,
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+    ShortKeyCollision,
+    URLExpired,
+)
 from core.logging import shortener_logger as logger
 
-from .models import ClickEvent, ShortURL
+from . import selectors
+from .domains import short_domains
+from .enrichment import click_attributes
+from .keyfilter import short_key_filter
+from .leaderboard import leaderboard
+from .models import (
+    AccountClickTotal,
+    ClickEvent,
+    DailyClickRollup,
+    Destination,
+    IdempotencyKey,
+    ImportCheckpoint,
+    ShortURL,
+)
+from .resolution import REDIRECT_COLUMNS, resolution_cache
+from .rollups import add_clicks, lock_watermark
+from .sharding import home_shard, read_alias, register_user_shard, shard_for_key
+from .stream import click_stream
+from .versions import bump_links_version
 
 
 # ---------------------------------------------------------------------------
@@ -25,37 +64,314 @@ def create_short_url(
     original_url: str,
     custom_key: str | None = None,
     expires_at=None,
+    redirect_type: str = ShortURL.RedirectType.TEMPORARY,
+    analytics_mode: str = ShortURL.AnalyticsMode.EXACT,
 ) -> ShortURL:
     """
     Create a new shortened URL.
 
     If *custom_key* is provided it is used directly (after uniqueness check).
-    Otherwise a collision-safe random key is generated.
+    Otherwise a collision-safe random key is generated within the user's
+    home shard. Either way the row is written to the shard its key maps to.
     """
     if custom_key:
-        if ShortURL.objects.filter(short_key=custom_key).exists():
+        shard = shard_for_key(custom_key)
+        if ShortURL.objects.using(shard).filter(short_key=custom_key).exists():
             raise CustomKeyTaken()
         short_key = custom_key
     else:
+        shard = home_shard(user)
         try:
             short_key = generate_short_key(
-                exists_fn=lambda k: ShortURL.objects.filter(short_key=k).exists()
+                exists_fn=lambda k: ShortURL.objects.using(shard).filter(short_key=k).exists(),
+                accept_fn=lambda k: shard_for_key(k) == shard,
             )
         except RuntimeError as exc:
             logger.error("Short key generation failed: %s", exc)
             raise ShortKeyCollision() from exc
 
-    short_url = ShortURL.objects.create(
+    register_user_shard(user, shard)
+    short_url = ShortURL.objects.using(shard).create(
         user=user,
         original_url=original_url,
         short_key=short_key,
         custom_key=custom_key,
         expires_at=expires_at,
+        redirect_type=redirect_type,
+        analytics_mode=analytics_mode,
     )
+    pin_to_primary(f"user:{user.pk}", f"short_key:{short_key}")
     logger.info("Short URL created: %s → %s (user=%s)", short_key, original_url, user.id)
+
+    if cache_is_shared():
+        # Rendered by whichever process runs the task; only worth it when
+        # the web workers read the same cache.
+        from .tasks import prerender_qr_code  # the tasks module imports this one
+
+        prerender_qr_code.delay(short_key=short_key, user_id=user.pk)
     return short_url
 
 
+# Rounds of batched collision checks before bulk key allocation gives up.
+SHORT_KEY_BATCH_ROUNDS = 5
+
+# How long a first request holds its Idempotency-Key before retries may run.
+IDEMPOTENCY_LOCK_SECONDS = 30
+
+
+def create_or_get_short_url(
+    *,
+    user,
+    idempotency_key: str | None = None,
+    reuse_existing: bool = False,
+    **fields,
+) -> tuple[ShortURL, bool]:
+    """
+    ``create_short_url`` that collapses retries and duplicates.
+
+    • With *idempotency_key*, a retry carrying the same key and fields
+      returns the link the first request created. The same key with
+      different fields raises ``IdempotencyKeyReused``; a retry arriving
+      while the first request is still running raises
+      ``IdempotencyKeyInProgress``. Keys are ``IdempotencyKey`` rows on the
+      primary, so retries landing on different workers agree.
+    • With *reuse_existing* (and no custom key), the user's existing link
+      to the same URL is returned via an indexed hash lookup instead of
+      creating another one.
+
+    Returns ``(short_url, created)``.
+    """
+    if idempotency_key is None:
+        return _create_or_reuse(user=user, reuse_existing=reuse_existing, **fields)
+
+    key = hashlib.sha256(idempotency_key.encode()).hexdigest()
+    fingerprint = hashlib.sha256(
+        repr(sorted({**fields, "reuse_existing": reuse_existing}.items())).encode()
+    ).hexdigest()
+    keys = IdempotencyKey.objects.using(PRIMARY)
+
+    claimed, entry = _claim_idempotency_key(user=user, key=key, fingerprint=fingerprint)
+    if claimed is None:
+        if entry.url_id is None:
+            raise IdempotencyKeyInProgress()
+        if entry.fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+        short_url = selectors.get_short_url_by_id(url_id=entry.url_id, user=user)
+        if short_url is not None:
+            return short_url, False
+        # The link was deleted since — create it again under the same key.
+        lock_until = timezone.now() + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+        if not keys.filter(pk=entry.pk, url_id=entry.url_id).update(
+            url_id=None, expires_at=lock_until
+        ):
+            raise IdempotencyKeyInProgress()
+        claimed = entry.pk
+
+    try:
+        short_url, created = _create_or_reuse(
+            user=user, reuse_existing=reuse_existing, **fields
+        )
+    except Exception:
+        keys.filter(pk=claimed, url_id__isnull=True).delete()
+        raise
+    keys.filter(pk=claimed).update(
+        url_id=short_url.pk,
+        expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+    )
+    return short_url, created
+
+
+def _claim_idempotency_key(*, user, key: str, fingerprint: str):
+    """
+    ``(pk, None)`` when this request now holds *key*, else ``(None, entry)``
+    for the live row of an earlier request.
+
+    Rows past ``expires_at`` — a lock left by a crashed request, or a result
+    older than ``IDEMPOTENCY_KEY_TTL_SECONDS`` — are taken over with a
+    conditional ``UPDATE``, so only one retry wins them.
+    """
+    now = timezone.now()
+    lock_until = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+    keys = IdempotencyKey.objects.using(PRIMARY)
+    try:
+        with transaction.atomic(using=PRIMARY):
+            claimed = keys.create(
+                user=user, key=key, fingerprint=fingerprint, expires_at=lock_until
+            )
+        return claimed.pk, None
+    except IntegrityError:
+        pass
+    entry = keys.filter(user=user, key=key).first()
+    if entry is None:  # the first request just failed and released it
+        raise IdempotencyKeyInProgress()
+    if entry.expires_at > now:
+        return None, entry
+    if keys.filter(pk=entry.pk, expires_at=entry.expires_at).update(
+        fingerprint=fingerprint, url_id=None, expires_at=lock_until
+    ):
+        return entry.pk, None
+    raise IdempotencyKeyInProgress()
+
+
+def purge_expired_idempotency_keys() -> int:
+    """Delete ``IdempotencyKey`` rows past ``expires_at``; returns rows deleted."""
+    deleted, _ = (
+        IdempotencyKey.objects.using(PRIMARY).filter(expires_at__lte=timezone.now()).delete()
+    )
+    return deleted
+
+
+def _create_or_reuse(*, user, reuse_existing: bool, **fields) -> tuple[ShortURL, bool]:
+    if reuse_existing and not fields.get("custom_key"):
+        existing = selectors.get_existing_short_url(
+            user=user, original_url=fields["original_url"]
+        )
+        if existing is not None and not (
+            existing.expires_at and existing.expires_at <= timezone.now()
+        ):
+            return existing, False
+    return create_short_url(user=user, **fields), True
+
+
+# ---------------------------------------------------------------------------
+# Bulk import
+# ---------------------------------------------------------------------------
+
+def bulk_import_short_urls(
+    *, user, entries: list[dict], source: str | None = None, lines: list[int] | None = None
+) -> tuple[int, list[int]]:
+    """
+    Insert already-validated *entries* (``ShortURLCreateSerializer``
+    ``validated_data`` dicts) for *user* with a handful of queries.
+
+    Custom keys are checked with one ``IN`` query per shard; keys that are
+    taken, or repeated within *entries*, are skipped. Other entries get
+    random keys in the user's home shard, checked the same way. Rows are
+    written with ``bulk_create`` in one transaction per shard.
+
+    With a *source* file and each entry's line in it (*lines*), every
+    shard's transaction also records the last line it committed in an
+    ``ImportCheckpoint``. Entries at or below their shard's checkpoint were
+    written by an earlier, interrupted run: they count as created but are
+    not inserted again.
+
+    Returns ``(created, indexes of skipped entries)``.
+    """
+    skipped = []
+    placed = defaultdict(list)  # shard → [(entry, short_key)]
+
+    done = set()
+    if source is not None:
+        committed = _import_checkpoints(user, source)
+        for index, entry in enumerate(entries):
+            key = entry.get("custom_key")
+            if lines[index] <= committed.get(shard_for_key(key) if key else home_shard(user), 0):
+                done.add(index)
+
+    requested = defaultdict(list)
+    seen = set()
+    for index, entry in enumerate(entries):
+        key = entry.get("custom_key")
+        if not key or index in done:
+            continue
+        if key in seen:
+            skipped.append(index)
+            continue
+        seen.add(key)
+        requested[shard_for_key(key)].append((index, entry, key))
+    for shard, items in requested.items():
+        taken = _existing_keys(shard, [key for _, _, key in items])
+        for index, entry, key in items:
+            if key in taken:
+                skipped.append(index)
+            else:
+                placed[shard].append((entry, key))
+
+    generated = [
+        entry for index, entry in enumerate(entries)
+        if not entry.get("custom_key") and index not in done
+    ]
+    if generated:
+        shard = home_shard(user)
+        keys = _allocate_keys(shard, len(generated), exclude=seen)
+        placed[shard].extend(zip(generated, keys))
+
+    created = 0
+    for shard, items in placed.items():
+        register_user_shard(user, shard)
+        with transaction.atomic(using=shard):
+            destinations = Destination.intern_many(
+                {entry["original_url"] for entry, _ in items}, using=shard
+            )
+            ShortURL.objects.using(shard).bulk_create(
+                [
+                    ShortURL(
+                        user=user,
+                        destination_id=destinations[entry["original_url"]],
+                        short_key=key,
+                        is_custom=bool(entry.get("custom_key")),
+                        expires_at=entry.get("expires_at"),
+                        redirect_type=entry.get("redirect_type", ShortURL.RedirectType.TEMPORARY),
+                        analytics_mode=entry.get("analytics_mode", ShortURL.AnalyticsMode.EXACT),
+                    )
+                    for entry, key in items
+                ]
+            )
+            if source is not None:
+                ImportCheckpoint.objects.using(shard).update_or_create(
+                    user=user, source=source, defaults={"line": max(lines)}
+                )
+        short_key_filter.add_many([key for _, key in items], using=shard)
+        created += len(items)
+
+    if created:
+        # bulk_create sends no post_save signals.
+        bump_links_version(user.pk)
+        pin_to_primary(f"user:{user.pk}")
+    return created + len(done), sorted(skipped)
+
+
+def _import_checkpoints(user, source: str) -> dict[str, int]:
+    """Shard → last committed line of *source* for *user*."""
+    return {
+        shard: line
+        for shard in settings.SHORT_URL_SHARDS
+        for line in ImportCheckpoint.objects.using(shard)
+        .filter(user=user, source=source)
+        .values_list("line", flat=True)
+    }
+
+
+def clear_import_checkpoints(*, user, source: str) -> None:
+    """Forget what earlier runs of *source* committed (``import_links --restart``)."""
+    for shard in settings.SHORT_URL_SHARDS:
+        ImportCheckpoint.objects.using(shard).filter(user=user, source=source).delete()
+
+
+def _existing_keys(shard: str, keys) -> set[str]:
+    return set(
+        ShortURL.objects.using(shard)
+        .filter(short_key__in=keys)
+        .values_list("short_key", flat=True)
+    )
+
+
+def _allocate_keys(shard: str, count: int, *, exclude=()) -> list[str]:
+    """*count* unused random keys that hash to *shard*."""
+    keys = set()
+    for _ in range(SHORT_KEY_BATCH_ROUNDS):
+        candidates = set()
+        while len(candidates) < count - len(keys):
+            key = random_short_key()
+            if shard_for_key(key) == shard and key not in exclude and key not in keys:
+                candidates.add(key)
+        keys |= candidates - _existing_keys(shard, list(candidates))
+        if len(keys) == count:
+            return list(keys)
+    logger.error("Bulk key allocation failed on %s after %d rounds", shard, SHORT_KEY_BATCH_ROUNDS)
+    raise ShortKeyCollision()
+
+
 # ---------------------------------------------------------------------------
 # Update
 # ---------------------------------------------------------------------------
@@ -66,6 +382,8 @@ def update_short_url(
     original_url: str | None = None,
     expires_at=None,
     clear_expiry: bool = False,
+    redirect_type: str | None = None,
+    analytics_mode: str | None = None,
 ) -> ShortURL:
     """
     Update mutable fields on an existing ShortURL.
@@ -78,8 +396,21 @@ def update_short_url(
         short_url.expires_at = None
     elif expires_at is not None:
         short_url.expires_at = expires_at
+    if redirect_type is not None:
+        short_url.redirect_type = redirect_type
+    if analytics_mode is not None:
+        short_url.analytics_mode = analytics_mode
 
-    short_url.save(update_fields=["original_url", "expires_at", "updated_at"])
+    short_url.save(
+        update_fields=[
+            "destination",
+            "expires_at",
+            "redirect_type",
+            "analytics_mode",
+            "updated_at",
+        ]
+    )
+    pin_to_primary(f"user:{short_url.user_id}", f"short_key:{short_url.short_key}")
     logger.info("Short URL updated: %s", short_url.short_key)
     return short_url
 
@@ -89,44 +420,178 @@ def update_short_url(
 # ---------------------------------------------------------------------------
 
 def delete_short_url(*, short_url: ShortURL) -> None:
-    """Delete a ShortURL and its related click events (cascade)."""
+    """
+    Delete a ShortURL and its related click events (cascade), taking its
+    clicks back out of the owner's account rollups (those already rolled
+    up; the rest go with the events).
+    """
     key = short_url.short_key
-    short_url.delete()
+    shard = short_url._state.db
+    with transaction.atomic(using=shard):
+        per_day = (
+            ClickEvent.objects.using(shard)
+            .filter(short_url=short_url, pk__lte=lock_watermark(shard).last_event_id)
+            .annotate(day=TruncDate("created_at"))
+            .values_list("day")
+            .annotate(clicks=Count("id"))
+            .order_by()
+        )
+        removed = 0
+        for day, clicks in per_day:
+            add_clicks(DailyClickRollup, -clicks, using=shard, user_id=short_url.user_id, day=day)
+            removed += clicks
+        if removed:
+            add_clicks(AccountClickTotal, -removed, using=shard, user_id=short_url.user_id)
+        short_url.delete()
+    pin_to_primary(f"user:{short_url.user_id}", f"short_key:{key}")
     logger.info("Short URL deleted: %s", key)
 
 
+def delete_expired_short_urls(*, expired_before, batch_size: int = 500) -> int:
+    """
+    Delete links that expired before *expired_before*, on every shard,
+    *batch_size* at a time; returns how many were deleted.
+    """
+    deleted = 0
+    for shard in settings.SHORT_URL_SHARDS:
+        expired = ShortURL.objects.using(shard).filter(expires_at__lt=expired_before)
+        while batch := list(expired.order_by("expires_at")[:batch_size]):
+            for short_url in batch:
+                delete_short_url(short_url=short_url)
+            deleted += len(batch)
+    return deleted
+
+
+# ---------------------------------------------------------------------------
+# QR codes
+# ---------------------------------------------------------------------------
+
+QR_CODE_CACHE_PREFIX = "qr_code:"
+
+
+def get_qr_code(short_key: str, *, user_id=None) -> bytes:
+    """
+    PNG QR code for the short URL of *short_key* (owned by *user_id*),
+    rendered once per ``QR_CODE_CACHE_SECONDS`` (pre-rendered in the
+    background on create). Re-rendered if the owner's domain changed.
+    """
+    key = f"{QR_CODE_CACHE_PREFIX}{short_key}"
+    url = short_domains.short_url(short_key, user_id)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == url:
+        return cached[1]
+    image = generate_qr_code(url)
+    cache.set(key, (url, image), settings.QR_CODE_CACHE_SECONDS)
+    return image
+
+
 # ---------------------------------------------------------------------------
 # Redirect (the hot path)
 # ---------------------------------------------------------------------------
 
-@transaction.atomic
-def resolve_and_track(*, short_key: str, request) -> str:
+def resolve_and_track(*, short_key: str, request, tenant=None):
     """
-    Resolve a short key to the original URL.
+    Resolve a short key to its redirect target.
 
-    1. Fetch the ShortURL (404 if not found — handled by the view).
+    1. Look the key up in the per-process resolution cache; on a miss,
+       load it (404 if not found — handled by the view). On a custom short
+       domain (*tenant* is its owner) other users' keys are not found.
     2. Check expiration (raise ``URLExpired`` → 410).
     3. Atomically increment ``click_count`` using an F expression.
     4. Record a ``ClickEvent``.
-    5. Return the original URL.
+    5. Return the ``ResolvedLink`` (destination plus redirect policy).
     """
-    try:
-        short_url = ShortURL.objects.select_for_update().get(short_key=short_key)
-    except ShortURL.DoesNotExist:
-        return None  # View will return 404
+    for attempt in range(2):
+        link = resolution_cache.get(short_key) if attempt == 0 else None
+        if link is None:
+            link = _load_link(short_key)
+            if link is None:
+                return None  # View will return 404
+        if tenant is not None and link.user_id != tenant:
+            return None
 
-    if short_url.expires_at and short_url.expires_at <= timezone.now():
-        raise URLExpired()
+        if link.expires_at and link.expires_at <= timezone.now():
+            raise URLExpired()
 
-    # Atomic increment
-    ShortURL.objects.filter(pk=short_url.pk).update(click_count=F("click_count") + 1)
+        if _record_click(link, request, using=shard_for_key(short_key)):
+            logger.info("Redirect: %s → %s", short_key, link.original_url)
+            return link
 
-    # Record click event
-    ClickEvent.objects.create(
-        short_url=short_url,
-        ip_address=get_client_ip(request),
-        user_agent=request.META.get("HTTP_USER_AGENT", "")[:512],
+        # The cached row was deleted or replaced — retry from the database.
+        resolution_cache.discard(short_key)
+    return None
+
+
+def _load_link(short_key: str):
+    """Fetch the redirect columns for *short_key* from its shard and cache them."""
+    if not short_key_filter.might_exist(short_key):
+        return None  # Definitely unknown — no DB access
+    row = (
+        ShortURL.objects
+        .using(read_alias(shard_for_key(short_key), f"short_key:{short_key}"))
+        .filter(short_key=short_key)
+        .values_list(*REDIRECT_COLUMNS)
+        .first()
     )
+    if row is None:
+        return None
+    return resolution_cache.put(short_key, *row)
+
+
+def _record_click(link, request, *, using: str) -> bool:
+    """Count the click on shard *using*; ``False`` if the ShortURL no longer exists."""
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        # Atomic increment; last_clicked_at doubles as a freshness validator
+        updated = (
+            ShortURL.objects.using(using)
+            .filter(pk=link.pk)
+            .update(click_count=F("click_count") + 1, last_clicked_at=now)
+        )
+        if not updated:
+            return False
+
+        # Record click event
+        event = ClickEvent.objects.using(using).create(
+            short_url_id=link.pk,
+            **click_attributes(request, get_client_ip(request)),
+        )
+        if click_stream.has_subscribers(link.pk, link.user_id):
+            transaction.on_commit(partial(click_stream.publish, event, link.user_id), using=using)
+        # Account and per-link rollups are built from the event (rollups.py).
+    leaderboard.note_click(using, link.pk)
+    return True
 
-    logger.info("Redirect: %s → %s", short_key, short_url.original_url)
-    return short_url.original_url
+
+def redirect_cache_seconds(link, *, now=None) -> int:
+    """
+    How long browsers and edge caches may reuse the redirect for *link*.
+
+    ``0`` means it must not be cached (``analytics_mode="exact"``, or the
+    link is about to expire). Otherwise the configured max-age for the
+    redirect type, clamped so no cache outlives ``expires_at``.
+    """
+    if link.analytics_mode != ShortURL.AnalyticsMode.EDGE:
+        return 0
+    if link.redirect_type == ShortURL.RedirectType.PERMANENT:
+        max_age = settings.REDIRECT_PERMANENT_MAX_AGE
+    else:
+        max_age = settings.REDIRECT_CACHE_MAX_AGE
+    if link.expires_at:
+        remaining = (link.expires_at - (now or timezone.now())).total_seconds()
+        max_age = min(max_age, int(remaining))
+    return max(0, max_age)
+
+
+def warm_caches() -> None:
+    """
+    Prime this process's redirect caches before it takes traffic.
+
+    Called from the gunicorn ``post_worker_init`` hook (config/gunicorn.py).
+    """
+    short_key_filter.warm()
+    resolution_cache.warm_up(
+        limit=settings.WARMUP_LINKS,
+        budget_seconds=settings.WARMUP_BUDGET_SECONDS,
+        window_hours=settings.WARMUP_WINDOW_HOURS,
+    )
@@ -0,0 +1,74 @@
+"""
+Sharding of the ``short_urls`` keyspace across databases.
+
+``SHORT_URL_SHARDS`` lists the database aliases that hold ``ShortURL`` and
+``ClickEvent`` rows. A link lives on the shard chosen by a hash of its
+``short_key``, so a redirect reads exactly one database — no fan-out.
+
+• Generated keys are drawn so they hash to the owner's *home shard*
+  (itself a hash of the user id), keeping a user's links together.
+• Custom keys go wherever their hash points.
+• ``UserShard`` rows on the primary record every shard a user has links
+  on, so listings query only those shards.
+
+With a single shard (the default, ``["default"]``) every helper returns
+``"default"`` and the index is not maintained. The hash is modulo the
+number of shards: the list cannot be resized without rebalancing.
+"""
+
+import hashlib
+
+from django.conf import settings
+
+from core.db_router import PRIMARY, read_replica
+
+
+def _pick(shards, value: str) -> str:
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return shards[int.from_bytes(digest, "little") % len(shards)]
+
+
+def shard_for_key(short_key: str) -> str:
+    """Database alias holding *short_key*."""
+    shards = settings.SHORT_URL_SHARDS
+    if len(shards) == 1:
+        return shards[0]
+    return _pick(shards, short_key)
+
+
+def home_shard(user) -> str:
+    """Shard that new generated keys for *user* are allocated in."""
+    shards = settings.SHORT_URL_SHARDS
+    if len(shards) == 1:
+        return shards[0]
+    return _pick(shards, f"user:{user.pk}")
+
+
+def read_alias(shard: str, *sticky_keys: str) -> str:
+    """Alias for a lag-tolerant read from *shard* (replicas serve the primary only)."""
+    if shard == PRIMARY:
+        return read_replica(*sticky_keys)
+    return shard
+
+
+def user_shards(user) -> list[str]:
+    """Shards holding links owned by *user*."""
+    shards = settings.SHORT_URL_SHARDS
+    if len(shards) == 1:
+        return list(shards)
+    from .models import UserShard
+
+    return list(
+        UserShard.objects.using(PRIMARY)
+        .filter(user_id=user.pk)
+        .values_list("shard", flat=True)
+    )
+
+
+def register_user_shard(user, shard: str) -> None:
+    """Record that *user* owns links on *shard*."""
+    if len(settings.SHORT_URL_SHARDS) == 1:
+        return
+    from .models import UserShard
+
+    UserShard.objects.using(PRIMARY).get_or_create(user_id=user.pk, shard=shard)
@@ -0,0 +1,67 @@
+"""
+Shortener signal handlers — keep in-memory structures in step with writes
+made anywhere (services, admin, shell).
+"""
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.db_router import PRIMARY
+
+from .domains import short_domains
+from .keyfilter import short_key_filter
+from .models import AccountClickTotal, DailyClickRollup, ShortDomain, ShortURL
+from .resolution import resolution_cache
+from .sharding import register_user_shard, user_shards
+from .versions import bump_links_version
+
+
+@receiver(post_save, sender=ShortURL, dispatch_uid="shorturl_key_filter")
+def add_to_key_filter(sender, instance, created, **kwargs):
+    if created:
+        short_key_filter.add(instance.short_key, using=instance._state.db)
+
+
+@receiver(post_save, sender=ShortURL, dispatch_uid="shorturl_user_shard")
+def record_user_shard(sender, instance, created, **kwargs):
+    # Services register before writing; this covers the admin and shell.
+    if created and len(settings.SHORT_URL_SHARDS) > 1:
+        register_user_shard(instance.user, instance._state.db)
+
+
+@receiver(post_save, sender=ShortURL, dispatch_uid="shorturl_resolution_cache_save")
+@receiver(post_delete, sender=ShortURL, dispatch_uid="shorturl_resolution_cache_delete")
+def invalidate_resolution_cache(sender, instance, **kwargs):
+    resolution_cache.discard(instance.short_key)
+
+
+@receiver(post_save, sender=ShortURL, dispatch_uid="shorturl_links_version_save")
+@receiver(post_delete, sender=ShortURL, dispatch_uid="shorturl_links_version_delete")
+def bump_user_links_version(sender, instance, **kwargs):
+    bump_links_version(instance.user_id)
+
+
+@receiver(post_save, sender=ShortDomain, dispatch_uid="short_domain_save")
+@receiver(post_delete, sender=ShortDomain, dispatch_uid="short_domain_delete")
+def reload_short_domains(sender, instance, **kwargs):
+    short_domains.invalidate()
+    # The owner's links now render with another prefix.
+    bump_links_version(instance.user_id)
+
+
+@receiver(setting_changed, dispatch_uid="short_url_base_changed")
+def reload_short_url_base(setting, **kwargs):
+    if setting == "SHORT_URL_BASE":
+        short_domains.invalidate()
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL, dispatch_uid="user_sharded_links")
+def delete_sharded_links(sender, instance, **kwargs):
+    # Django's cascade only covers the primary; links and click rollups on
+    # other shards are removed here.
+    for shard in user_shards(instance):
+        if shard != PRIMARY:
+            for model in (ShortURL, AccountClickTotal, DailyClickRollup):
+                model.objects.using(shard).filter(user_id=instance.pk).delete()
@@ -0,0 +1,273 @@
+"""
+In-process fan-out of click events for Server-Sent Events streams.
+
+Each open stream is one ``Subscription`` on the process-wide
+``click_stream`` hub, keyed by topic — ``("link", short_url_pk)`` or
+``("user", user_pk)``. A click is serialised once into an SSE frame and
+handed to every matching subscription, however many dashboards are open;
+nothing is queried per stream.
+
+Clicks reach the hub two ways:
+
+• clicks recorded in this process are published when their transaction
+  commits (``services._record_click``);
+• while anything is subscribed, one relay thread per process reads the
+  clicks other processes recorded for the subscribed topics, every
+  ``CLICK_STREAM_RELAY_SECONDS``, re-reading a short overlap (as the
+  short-key filter does) and skipping events already delivered.
+
+Slow consumers lose their oldest pending frames beyond
+``CLICK_STREAM_MAX_PENDING`` rather than growing without bound.
+
+Streams served by an ASGI server wait on the event loop and are capped by
+``CLICK_STREAM_MAX_SUBSCRIBERS``. A synchronous (WSGI) stream occupies a
+request thread for its whole lifetime, so those have their own, much
+smaller cap — ``CLICK_STREAM_WSGI_MAX_SUBSCRIBERS``, 0 by default.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.logging import shortener_logger as logger
+
+# Clicks can commit slightly after their ``created_at``; the relay re-reads
+# this much on every poll and drops the duplicates.
+RELAY_OVERLAP = timedelta(seconds=5)
+# Events remembered for de-duplication.
+SEEN_EVENTS = 10_000
+# Reconnect delay suggested to ``EventSource`` clients (milliseconds).
+RETRY_MS = 3_000
+
+
+class Subscription:
+    """Pending SSE frames for one open stream."""
+
+    def __init__(self, topics: tuple, max_pending: int, *, sync: bool = False):
+        self.topics = topics
+        self.sync = sync
+        self.closed = False
+        self._pending = deque(maxlen=max_pending)
+        self._condition = threading.Condition()
+        self._loop = None
+        self._wakeup = None
+
+    def deliver(self, frame: bytes) -> None:
+        with self._condition:
+            self._pending.append(frame)
+            self._condition.notify()
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def wait(self, timeout: float) -> list[bytes]:
+        """Block up to *timeout* seconds for frames; return those pending."""
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(timeout)
+            return self._drain()
+
+    async def wait_async(self, timeout: float) -> list[bytes]:
+        """``wait`` for streams served under ASGI."""
+        if self._wakeup is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+        self._wakeup.clear()
+        with self._condition:
+            frames = self._drain()
+        if frames:
+            return frames
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._condition:
+            return self._drain()
+
+    def _drain(self) -> list[bytes]:
+        frames = list(self._pending)
+        self._pending.clear()
+        return frames
+
+
+class ClickStream:
+    """Thread-safe topic → subscriptions registry."""
+
+    def __init__(self, *, max_subscribers: int, max_sync_subscribers: int, max_pending: int):
+        self.max_subscribers = max_subscribers
+        self.max_sync_subscribers = max_sync_subscribers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._topics = {}
+        self._count = 0
+        self._sync_count = 0
+        self._relay = None
+        self._seen = deque(maxlen=SEEN_EVENTS)
+        self._seen_ids = set()
+
+    # -- subscribers --------------------------------------------------------
+
+    def subscribe(self, *topics, sync: bool = False) -> Subscription | None:
+        """
+        Open a subscription, or return ``None`` if the process is full.
+        *sync* subscriptions (served from a WSGI thread) count against
+        ``max_sync_subscribers`` as well.
+        """
+        subscription = Subscription(topics, self.max_pending, sync=sync)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            if sync:
+                if self._sync_count >= self.max_sync_subscribers:
+                    return None
+                self._sync_count += 1
+            self._count += 1
+            for topic in topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+            if self._relay is None and settings.CLICK_STREAM_RELAY_SECONDS > 0:
+                self._relay = threading.Thread(
+                    target=self._relay_loop, name="click-stream-relay", daemon=True
+                )
+                self._relay.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._count -= 1
+            if subscription.sync:
+                self._sync_count -= 1
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def has_subscribers(self, link_pk, user_pk) -> bool:
+        """Cheap check for the redirect path: is anyone listening?"""
+        return bool(self._topics) and (
+            ("link", link_pk) in self._topics or ("user", user_pk) in self._topics
+        )
+
+    def reset(self) -> None:
+        """Forget delivered events (ids restart when a database is rebuilt)."""
+        with self._lock:
+            self._seen.clear()
+            self._seen_ids.clear()
+
+    # -- publishing ---------------------------------------------------------
+
+    def publish(self, event, user_pk) -> None:
+        """Fan a committed ``ClickEvent`` out to its link's and owner's streams."""
+        key = (event._state.db, event.pk)  # ids are per shard
+        with self._lock:
+            if key in self._seen_ids:
+                return
+            if len(self._seen) == self._seen.maxlen:
+                self._seen_ids.discard(self._seen[0])
+            self._seen.append(key)
+            self._seen_ids.add(key)
+            subscribers = set().union(
+                self._topics.get(("link", event.short_url_id), ()),
+                self._topics.get(("user", user_pk), ()),
+            )
+        if not subscribers:
+            return
+        frame = click_frame(event)
+        for subscription in subscribers:
+            subscription.deliver(frame)
+
+    # -- cross-process relay ------------------------------------------------
+
+    def relay_once(self, since):
+        """
+        Publish clicks recorded since *since* (minus ``RELAY_OVERLAP``) on
+        subscribed topics. Returns the ``since`` for the next poll.
+        """
+        from .models import ClickEvent
+
+        with self._lock:
+            links = [key for kind, key in self._topics if kind == "link"]
+            users = [key for kind, key in self._topics if kind == "user"]
+        now = timezone.now()
+        for shard in settings.SHORT_URL_SHARDS:
+            events = (
+                ClickEvent.objects.using(shard)
+                .filter(created_at__gte=since - RELAY_OVERLAP)
+                .filter(Q(short_url_id__in=links) | Q(short_url__user_id__in=users))
+                .annotate(owner_id=F("short_url__user_id"))
+                .order_by("id")
+            )
+            for event in events:
+                self.publish(event, event.owner_id)
+        return now
+
+    def _relay_loop(self) -> None:
+        since = timezone.now()
+        try:
+            while True:
+                time.sleep(settings.CLICK_STREAM_RELAY_SECONDS)
+                with self._lock:
+                    if not self._topics:
+                        self._relay = None
+                        return
+                try:
+                    since = self.relay_once(since)
+                except Exception:
+                    logger.warning("Click stream relay poll failed.", exc_info=True)
+        finally:
+            with self._lock:
+                if self._relay is threading.current_thread():
+                    self._relay = None
+            connections.close_all()
+
+
+def click_frame(event) -> bytes:
+    """One SSE ``click`` frame; ``clicks`` is the counter delta."""
+    from .serializers import ClickEventSerializer
+
+    data = dict(ClickEventSerializer(event).data, short_url=str(event.short_url_id), clicks=1)
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return f"id: {event.pk}\nevent: click\ndata: {payload}\n\n".encode()
+
+
+def iter_sse(subscription: Subscription):
+    """Sync SSE body: frames as they arrive, keep-alives in between."""
+    deadline = time.monotonic() + settings.CLICK_STREAM_MAX_SECONDS
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        while time.monotonic() < deadline:
+            frames = subscription.wait(settings.CLICK_STREAM_HEARTBEAT_SECONDS)
+            yield b"".join(frames) if frames else b": keep-alive\n\n"
+    finally:
+        click_stream.unsubscribe(subscription)
+
+
+async def aiter_sse(subscription: Subscription):
+    """``iter_sse`` for ASGI servers."""
+    deadline = time.monotonic() + settings.CLICK_STREAM_MAX_SECONDS
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        while time.monotonic() < deadline:
+            frames = await subscription.wait_async(settings.CLICK_STREAM_HEARTBEAT_SECONDS)
+            yield b"".join(frames) if frames else b": keep-alive\n\n"
+    finally:
+        click_stream.unsubscribe(subscription)
+
+
+click_stream = ClickStream(
+    max_subscribers=settings.CLICK_STREAM_MAX_SUBSCRIBERS,
+    max_sync_subscribers=settings.CLICK_STREAM_WSGI_MAX_SUBSCRIBERS,
+    max_pending=settings.CLICK_STREAM_MAX_PENDING,
+)
@@ -0,0 +1,69 @@
+"""
+Shortener background and maintenance tasks (see ``apps.tasks``).
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.tasks.registry import task
+from core.logging import shortener_logger as logger
+
+from . import health, leaderboard, rollups, services
+
+
+@task(max_attempts=3, retry_backoff=5)
+def prerender_qr_code(*, short_key: str, user_id=None) -> None:
+    """Render a new link's QR code into the cache before anyone asks for it."""
+    services.get_qr_code(short_key, user_id=user_id)
+
+
+@task(every=30, concurrency=1)
+def roll_up_clicks() -> int:
+    """Add clicks since the last run to the click rollups (see ``rollups``)."""
+    return sum(rollups.roll_up(shard) for shard in settings.SHORT_URL_SHARDS)
+
+
+@task(every=3_600, concurrency=1)
+def sweep_expired_links() -> int:
+    """Delete links expired for over ``EXPIRED_LINK_RETENTION_DAYS`` (0 keeps them)."""
+    days = settings.EXPIRED_LINK_RETENTION_DAYS
+    if not days:
+        return 0
+    deleted = services.delete_expired_short_urls(
+        expired_before=timezone.now() - timedelta(days=days)
+    )
+    if deleted:
+        logger.info("Deleted %d link(s) expired over %d days ago.", deleted, days)
+    return deleted
+
+
+@task(every=3_600, concurrency=1)
+def purge_idempotency_keys() -> int:
+    """Delete Idempotency-Keys past their lock or ``IDEMPOTENCY_KEY_TTL_SECONDS``."""
+    return services.purge_expired_idempotency_keys()
+
+
+@task(every=300, concurrency=1)
+def reconcile_leaderboard() -> int:
+    """Repair leaderboard entries that missed a flush (links clicked since the last run)."""
+    written = sum(leaderboard.reconcile(shard) for shard in settings.SHORT_URL_SHARDS)
+    if written:
+        logger.info("Reconciled %d leaderboard entr(ies).", written)
+    return written
+
+
+@task(every=900, concurrency=1)
+def check_link_health() -> int:
+    """Probe destinations whose last health check is older than ``LINK_HEALTH_TTL_SECONDS``."""
+    outcomes = Counter()
+    for shard in settings.SHORT_URL_SHARDS:
+        outcomes += health.check_stale_destinations(
+            shard, limit=settings.LINK_HEALTH_BATCH_SIZE
+        )
+    checked = sum(outcomes.values())
+    if checked:
+        logger.info("Checked %d destination(s): %s", checked, dict(outcomes))
+    return checked
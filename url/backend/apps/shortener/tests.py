@@ -2,22 +2,95 @@
 Tests for the shortener app — CRUD, redirect, analytics.
 """
 
-from datetime import timedelta
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch
 
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from apps.shortener.models import ShortURL
+from apps.common.utils import generate_short_key
+from apps.shortener.domains import short_domains
+from apps.shortener.keyfilter import ShortKeyFilter, short_key_filter
+from apps.shortener.leaderboard import LeaderboardBuffer, leaderboard
+from apps.shortener.middleware import classify_short_key_path, reserved_segments
+from apps.shortener import columnar, enrichment, health, selectors, services
+from apps.shortener.models import (
+    ClickEvent,
+    Destination,
+    IdempotencyKey,
+    LeaderboardEntry,
+    LinkClickRollup,
+    LinkListVersion,
+    ShortDomain,
+    ShortURL,
+)
+from apps.shortener.resolution import resolution_cache
+from apps.shortener.sharding import home_shard, shard_for_key
+from apps.shortener.serializers import ShortURLResponseSerializer
+from apps.shortener.stream import click_stream
+from apps.shortener.tasks import (
+    check_link_health,
+    purge_idempotency_keys,
+    reconcile_leaderboard,
+    roll_up_clicks,
+    sweep_expired_links,
+)
+from apps.shortener.versions import bump_links_version
+from apps.tasks.models import Task
+from core.throttling import RedirectNotFoundThrottle
 
 User = get_user_model()
 
 
+def _roll_up_clicks() -> int:
+    """Run ``roll_up_clicks`` over every click so far, settled or not."""
+    with override_settings(CLICK_ROLLUP_SETTLE_SECONDS=0):
+        return roll_up_clicks()
+
+
+def _on_all_shards(model, **filters) -> list:
+    """*model* rows matching *filters* on every ``SHORT_URL_SHARDS`` database."""
+    return [
+        row
+        for alias in settings.SHORT_URL_SHARDS
+        for row in model.objects.using(alias).filter(**filters)
+    ]
+
+
 class ShortenerTestMixin:
     """Common setup for shortener tests."""
 
+    # Links may live on any SHORT_URL_SHARDS database (SQLITE_SHARDS=N).
+    databases = "__all__"
+
     def setUp(self):
         self.client = APIClient()
         self.user = User.objects.create_user(
@@ -85,6 +158,137 @@ class CreateShortURLTests(ShortenerTestMixin, TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class DestinationStorageTests(ShortenerTestMixin, TestCase):
+    """Interned destinations and the compact custom-key flag."""
+
+    def test_same_destination_is_stored_once(self):
+        for _ in range(3):
+            self.client.post(self.api_url, {"original_url": "https://popular.com"})
+        self.assertEqual(len(_on_all_shards(ShortURL)), 3)
+        self.assertEqual(len(_on_all_shards(Destination, url="https://popular.com")), 1)
+
+    def test_custom_key_is_a_flag(self):
+        response = self.client.post(
+            self.api_url, {"original_url": "https://c.com", "custom_key": "flagged"}
+        )
+        self.assertEqual(response.data["custom_key"], "flagged")
+        short_url = ShortURL.objects.using(shard_for_key("flagged")).get(short_key="flagged")
+        self.assertTrue(short_url.is_custom)
+
+        response = self.client.post(self.api_url, {"original_url": "https://c.com"})
+        self.assertIsNone(response.data["custom_key"])
+
+    def test_update_repoints_destination(self):
+        response = self.client.post(self.api_url, {"original_url": "https://before.com"})
+        self.client.patch(
+            f"{self.api_url}{response.data['id']}/", {"original_url": "https://after.com"}
+        )
+        [short_url] = _on_all_shards(ShortURL, pk=response.data["id"])
+        self.assertEqual(short_url.original_url, "https://after.com")
+
+    def test_existing_link_lookup(self):
+        self.client.post(self.api_url, {"original_url": "https://seen.com"})
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        existing = selectors.get_existing_short_url(user=self.user, original_url="https://seen.com")
+        self.assertEqual(existing.original_url, "https://seen.com")
+        self.assertIsNone(
+            selectors.get_existing_short_url(user=other, original_url="https://seen.com")
+        )
+        self.assertIsNone(
+            selectors.get_existing_short_url(user=self.user, original_url="https://new.com")
+        )
+
+
+class IdempotentCreateTests(ShortenerTestMixin, TestCase):
+    """Idempotency-Key and reuse_existing on POST /api/urls/"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _post(self, data, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post(self.api_url, data, format="json", **headers)
+
+    def test_retry_with_same_key_returns_same_link(self):
+        first = self._post({"original_url": "https://retry.com"}, key="abc-1")
+        with patch("apps.shortener.services.generate_short_key") as generate:
+            second = self._post({"original_url": "https://retry.com"}, key="abc-1")
+        generate.assert_not_called()
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["id"], second.data["id"])
+        self.assertEqual(len(_on_all_shards(ShortURL)), 1)
+
+    def test_same_key_different_body_is_rejected(self):
+        self._post({"original_url": "https://one.com"}, key="abc-2")
+        response = self._post({"original_url": "https://two.com"}, key="abc-2")
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(response.data["code"], "IDEMPOTENCY_KEY_REUSED")
+
+    def _hold_key(self, key, *, expires_in):
+        return IdempotencyKey.objects.create(
+            user=self.user,
+            key=hashlib.sha256(key.encode()).hexdigest(),
+            fingerprint="x",
+            expires_at=timezone.now() + timedelta(seconds=expires_in),
+        )
+
+    def test_key_in_progress_conflicts(self):
+        self._hold_key("abc-3", expires_in=30)
+        cache.clear()  # held by a request on another worker
+        response = self._post({"original_url": "https://busy.com"}, key="abc-3")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_abandoned_lock_is_taken_over(self):
+        self._hold_key("abc-5", expires_in=-1)  # its request died mid-create
+        first = self._post({"original_url": "https://taken.com"}, key="abc-5")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        second = self._post({"original_url": "https://taken.com"}, key="abc-5")
+        self.assertEqual((second.status_code, second.data["id"]), (200, first.data["id"]))
+
+    def test_expired_keys_are_purged(self):
+        self._hold_key("old", expires_in=-1)
+        self._post({"original_url": "https://kept.com"}, key="new")
+        self.assertEqual(purge_idempotency_keys(), 1)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_failed_create_releases_key(self):
+        ShortURL.objects.create(user=self.user, original_url="https://x.com", short_key="dupe1")
+        data = {"original_url": "https://x.com", "custom_key": "dupe1"}
+        self.assertEqual(self._post(data, key="abc-4").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._post(data, key="abc-4").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keys_are_scoped_per_user(self):
+        self._post({"original_url": "https://scoped.com"}, key="shared")
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        self.client.force_authenticate(user=other)
+        response = self._post({"original_url": "https://scoped.com"}, key="shared")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_reuse_existing_returns_existing_link(self):
+        first = self._post({"original_url": "https://reuse.com"})
+        second = self._post({"original_url": "https://reuse.com", "reuse_existing": True})
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["id"], second.data["id"])
+        third = self._post({"original_url": "https://reuse.com"})
+        self.assertEqual(third.status_code, status.HTTP_201_CREATED)
+
+    def test_reuse_existing_skips_expired_links(self):
+        ShortURL.objects.create(
+            user=self.user,
+            original_url="https://stale.com",
+            short_key="stale01",
+            expires_at=timezone.now() - timedelta(days=1),
+        )
+        response = self._post({"original_url": "https://stale.com", "reuse_existing": True})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
 class ListShortURLTests(ShortenerTestMixin, TestCase):
     """GET /api/urls/"""
 
@@ -142,6 +346,8 @@ class DeleteShortURLTests(ShortenerTestMixin, TestCase):
 class RedirectTests(TestCase):
     """GET /{short_key}/"""
 
+    databases = "__all__"
+
     def setUp(self):
         self.client = APIClient()
         self.user = User.objects.create_user(
@@ -187,6 +393,592 @@ class RedirectTests(TestCase):
         self.assertEqual(short_url.click_events.count(), 1)
 
 
+class RedirectCachePolicyTests(TestCase):
+    """Per-link status code and cache headers on GET /{short_key}/"""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="policy", email="policy@example.com", password="StrongPass123!"
+        )
+
+    def _link(self, short_key, **fields):
+        return ShortURL.objects.create(
+            user=self.user, original_url=f"https://{short_key}.com", short_key=short_key, **fields
+        )
+
+    def test_exact_mode_is_uncacheable(self):
+        self._link("pol1111")
+        response = self.client.get("/pol1111/")
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertIn("no-store", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_permanent_redirect(self):
+        self._link("pol2222", redirect_type=ShortURL.RedirectType.PERMANENT)
+        response = self.client.get("/pol2222/")
+        self.assertEqual(response.status_code, status.HTTP_301_MOVED_PERMANENTLY)
+        self.assertIn("no-store", response["Cache-Control"])
+
+    @override_settings(REDIRECT_CACHE_MAX_AGE=300)
+    def test_edge_mode_is_cacheable(self):
+        self._link("pol3333", analytics_mode=ShortURL.AnalyticsMode.EDGE)
+        response = self.client.get("/pol3333/")
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("max-age=300", response["Cache-Control"])
+        self.assertIn("Expires", response)
+        self.assertNotIn("Vary", response)
+
+    @override_settings(REDIRECT_PERMANENT_MAX_AGE=86_400)
+    def test_max_age_clamped_to_expiry(self):
+        self._link(
+            "pol4444",
+            redirect_type=ShortURL.RedirectType.PERMANENT,
+            analytics_mode=ShortURL.AnalyticsMode.EDGE,
+            expires_at=timezone.now() + timedelta(seconds=90),
+        )
+        response = self.client.get("/pol4444/")
+        max_age = int(response["Cache-Control"].split("max-age=")[1].split(",")[0])
+        self.assertLessEqual(max_age, 90)
+        self.assertGreater(max_age, 0)
+
+    def test_policy_set_via_api(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/urls/",
+            {"original_url": "https://api-policy.com", "redirect_type": "permanent"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["redirect_type"], "permanent")
+        self.assertEqual(response.data["analytics_mode"], "exact")
+
+        response = self.client.patch(
+            f"/api/urls/{response.data['id']}/", {"analytics_mode": "edge"}, format="json"
+        )
+        self.assertEqual(response.data["analytics_mode"], "edge")
+        self.assertEqual(response.data["redirect_type"], "permanent")
+
+
+class RedirectAbuseProtectionTests(TestCase):
+    """Key filter and 404 rate limiting on GET /{short_key}/"""
+
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        short_key_filter.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="StrongPass123!"
+        )
+
+    def test_unknown_key_rejected_without_queries(self):
+        short_key_filter.might_exist("warm0up")
+        short_domains.invalidate()
+        short_domains.snapshot()  # the tenant lookup reloads on its own schedule
+        with self.assertNumQueries(0):
+            response = self.client.get("/zzzzzzz/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_new_key_visible_immediately(self):
+        short_key_filter.might_exist("warm0up")
+        ShortURL.objects.create(
+            user=self.user, original_url="https://new.com", short_key="new1111"
+        )
+        response = self.client.get("/new1111/")
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+    def test_key_created_by_another_process_is_synced(self):
+        short_key_filter.might_exist("warm0up")
+        with patch("apps.shortener.signals.short_key_filter"):
+            ShortURL.objects.create(
+                user=self.user, original_url="https://other.com", short_key="oth1111"
+            )
+        short_key_filter.sync_seconds = 0
+        self.addCleanup(setattr, short_key_filter, "sync_seconds", 1)
+        self.assertTrue(short_key_filter.might_exist("oth1111"))
+
+    def test_key_committed_late_by_another_process_is_pulled(self):
+        short_key_filter.might_exist("warm0up")
+        other_process = ShortKeyFilter(capacity=100, error_rate=0.01, sync_seconds=60)
+        with patch("apps.shortener.signals.short_key_filter", other_process):
+            with self.captureOnCommitCallbacks(using=shard_for_key("late111"), execute=True):
+                link = ShortURL.objects.create(
+                    user=self.user, original_url="https://late.com", short_key="late111"
+                )
+                # Its transaction ran far longer than the database sync overlap.
+                ShortURL.objects.using(link._state.db).filter(pk=link.pk).update(
+                    created_at=timezone.now() - timedelta(hours=1)
+                )
+        with self.assertNumQueries(0):
+            self.assertTrue(short_key_filter.might_exist("late111"))
+
+    def test_repeated_misses_are_throttled(self):
+        ShortURL.objects.create(
+            user=self.user, original_url="https://ok.com", short_key="ok11111"
+        )
+        with patch.object(RedirectNotFoundThrottle, "rate", "2/minute", create=True):
+            codes = [self.client.get(f"/miss{i}00/").status_code for i in range(3)]
+            self.assertEqual(codes, [404, 404, 429])
+            # Once over the miss limit, the client is blocked until the window slides.
+            self.assertEqual(self.client.get("/ok11111/").status_code, 429)
+
+
+class ResolutionCacheTests(TestCase):
+    """Per-process redirect cache and startup warm-up."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        resolution_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="StrongPass123!"
+        )
+
+    def _link(self, key, clicks=0):
+        short_url = ShortURL.objects.create(
+            user=self.user, original_url=f"https://{key}.com", short_key=key
+        )
+        ClickEvent.objects.using(short_url._state.db).bulk_create(
+            ClickEvent(short_url=short_url, ip_address="10.0.0.1") for _ in range(clicks)
+        )
+        return short_url
+
+    @override_settings(SHORT_URL_SHARDS=["default"])  # the limit is split between shards
+    def test_warm_up_loads_hottest_links(self):
+        self._link("cold111", clicks=1)
+        self._link("warm111", clicks=2)
+        self._link("hot1111", clicks=3)
+        loaded = resolution_cache.warm_up(limit=2, budget_seconds=5, window_hours=24)
+        self.assertEqual(loaded, 2)
+        self.assertIsNotNone(resolution_cache.get("hot1111"))
+        self.assertIsNotNone(resolution_cache.get("warm111"))
+        self.assertIsNone(resolution_cache.get("cold111"))
+
+    def test_cached_redirect_skips_lookup(self):
+        self._link("cch1111")
+        self.client.get("/cch1111/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/cch1111/")
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertFalse(any(q["sql"].startswith("SELECT") for q in queries))
+
+    def test_update_invalidates_cached_destination(self):
+        short_url = self._link("upd2222")
+        self.client.get("/upd2222/")
+        short_url.original_url = "https://moved.com"
+        short_url.save()
+        response = self.client.get("/upd2222/")
+        self.assertEqual(response["Location"], "https://moved.com")
+
+    def test_replaced_row_is_reloaded(self):
+        self._link("rpl1111")
+        self.client.get("/rpl1111/")
+        # Simulate another worker deleting and re-creating the key.
+        ShortURL.objects.using(shard_for_key("rpl1111")).filter(short_key="rpl1111").delete()
+        self._link("rpl1111")
+        resolution_cache.put("rpl1111", uuid.uuid4(), "https://stale.com", None)
+        response = self.client.get("/rpl1111/")
+        self.assertEqual(response["Location"], "https://rpl1111.com")
+
+
+class RedirectRoutingTests(TestCase):
+    """ShortKeyDispatchMiddleware and the short key path converter."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="route@example.com", username="route", password="Str0ngP@ss!"
+        )
+
+    def test_classify_short_key_path(self):
+        reserved = frozenset({"admin", "api"})
+        self.assertEqual(classify_short_key_path("/abc1234/", reserved), "abc1234")
+        self.assertIsNone(classify_short_key_path("/ab/", reserved))
+        self.assertIsNone(classify_short_key_path("/" + "a" * 21 + "/", reserved))
+        self.assertIsNone(classify_short_key_path("/abc-123/", reserved))
+        self.assertIsNone(classify_short_key_path("/abc1234", reserved))
+        self.assertIsNone(classify_short_key_path("/api/", reserved))
+        self.assertIsNone(classify_short_key_path("/ábc1234/", reserved))
+
+    def test_reserved_segments_cover_root_routes(self):
+        reserved = reserved_segments()
+        self.assertIn("admin", reserved)
+        self.assertIn("api", reserved)
+
+    def test_admin_is_not_dispatched_as_redirect(self):
+        response = self.client.get("/admin/")
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertIn("/admin/login/", response["Location"])
+
+    def test_valid_key_redirects(self):
+        ShortURL.objects.create(
+            user=self.user, original_url="https://routed.com", short_key="rte1111"
+        )
+        response = self.client.get("/rte1111/")
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(response["Location"], "https://routed.com")
+
+    def test_malformed_key_404s_without_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/not-a-key!/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(queries), 0)
+
+
+class ExportTests(ShortenerTestMixin, TestCase):
+    """GET /api/urls/export/ and /api/urls/{id}/clicks/export/"""
+
+    def setUp(self):
+        super().setUp()
+        self.short_url = ShortURL.objects.create(
+            user=self.user, original_url="https://export.com", short_key="exp0001"
+        )
+        ShortURL.objects.create(
+            user=self.user, original_url="https://export.com/2", short_key="exp0002"
+        )
+        for i in range(3):
+            ClickEvent.objects.create(
+                short_url=self.short_url, ip_address=f"10.0.0.{i}", user_agent="ua, \"quoted\""
+            )
+
+    def _body(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_links_csv(self):
+        response = self.client.get(f"{self.api_url}export/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="links.csv"', response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(self._body(response).decode())))
+        self.assertEqual(rows[0][:3], ["short_key", "short_url", "original_url"])
+        self.assertEqual({row[0] for row in rows[1:]}, {"exp0001", "exp0002"})
+
+    def test_links_exclude_other_users(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        self.client.force_authenticate(user=other)
+        body = self._body(self.client.get(f"{self.api_url}export/"))
+        self.assertEqual(len(body.decode().splitlines()), 1)  # header only
+
+    def test_clicks_ndjson_gzip(self):
+        response = self.client.get(
+            f"{self.api_url}{self.short_url.id}/clicks/export/?fmt=ndjson&compress=gzip"
+        )
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn(".ndjson.gz", response["Content-Disposition"])
+        lines = gzip.decompress(self._body(response)).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]["user_agent"], 'ua, "quoted"')
+        self.assertEqual(records[0]["ip_address"], "10.0.0.0")
+
+    def test_clicks_of_other_users_link_404(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"{self.api_url}{self.short_url.id}/clicks/export/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_format_rejected(self):
+        response = self.client.get(f"{self.api_url}export/?fmt=xml")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_exports_page_by_key_without_server_side_cursors(self):
+        shard = self.short_url._state.db
+        settings_dict = connections[shard].settings_dict
+        with patch.dict(settings_dict, DISABLE_SERVER_SIDE_CURSORS=True):
+            body = self._body(self.client.get(f"{self.api_url}export/"))
+            with CaptureQueriesContext(connections[shard]) as queries:
+                rows = list(selectors.iter_click_history(
+                    fields=("ip_address",), user=self.user, chunk_size=2
+                ))
+        self.assertEqual(len(body.decode().splitlines()), 3)  # header and both links
+        self.assertEqual(rows, [("10.0.0.0",), ("10.0.0.1",), ("10.0.0.2",)])
+        pages = [q["sql"] for q in queries if "click_events" in q["sql"]]
+        self.assertEqual(len(pages), 2)
+        self.assertTrue(all("LIMIT 2" in sql for sql in pages))
+
+
+class ColumnarExportTests(ShortenerTestMixin, TestCase):
+    """GET /api/urls/clicks/export/ and the export_clicks command."""
+
+    def setUp(self):
+        super().setUp()
+        self.url = f"{self.api_url}clicks/export/"
+        self.short_url = ShortURL.objects.create(
+            user=self.user, original_url="https://columnar.com", short_key="col0001"
+        )
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        ShortURL.objects.create(
+            user=other, original_url="https://columnar.com/other", short_key="col0002"
+        )
+        visitor = APIClient()
+        for _ in range(3):
+            visitor.get("/col0001/", HTTP_USER_AGENT="Mozilla/5.0 (iPhone; CPU iPhone OS 17_0)")
+        visitor.get("/col0002/")
+        old = ClickEvent.objects.create(short_url=self.short_url, ip_address="10.0.0.9")
+        ClickEvent.objects.using(old._state.db).filter(pk=old.pk).update(
+            created_at=datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        )
+        _roll_up_clicks()
+
+    def _read(self, export_format, body):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if export_format == "parquet":
+            return pq.read_table(io.BytesIO(body))
+        return pa.ipc.open_stream(body).read_all()
+
+    def _table(self, response, export_format="parquet"):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], columnar.COLUMNAR_FORMATS[export_format])
+        self.assertTrue(response.streaming)
+        return self._read(export_format, b"".join(response.streaming_content))
+
+    def test_clicks_parquet(self):
+        table = self._table(self.client.get(self.url))
+        self.assertEqual(table.column_names, [name for name, _, _ in columnar.CLICK_COLUMNS])
+        rows = table.to_pylist()
+        self.assertEqual(len(rows), 4)  # not the other user's click
+        self.assertEqual({row["short_key"] for row in rows}, {"col0001"})
+        self.assertEqual(rows[0]["ip_address"], "10.0.0.9")  # oldest first
+        self.assertEqual(rows[-1]["device"], "Mobile")
+        self.assertEqual(rows[-1]["short_url_id"], str(self.short_url.pk))
+
+    def test_rollups_arrow_in_range(self):
+        response = self.client.get(
+            self.url, {"dataset": "rollups", "fmt": "arrow", "from": "2026-01-01T00:00:00Z"}
+        )
+        self.assertIn('filename="rollups.arrows"', response["Content-Disposition"])
+        rows = self._table(response, "arrow").to_pylist()
+        self.assertEqual(
+            sorted((row["resolution"], row["clicks"]) for row in rows), [("Day", 3), ("Hour", 3)]
+        )
+
+    def test_batches_are_written_as_they_fill(self):
+        for export_format in columnar.COLUMNAR_FORMATS:
+            rows = columnar.iter_dataset("clicks")
+            chunks = list(columnar.encode(export_format, "clicks", rows, batch_rows=2))
+            self.assertGreaterEqual(len(chunks), 3)
+            self.assertEqual(self._read(export_format, b"".join(chunks)).num_rows, 5)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "clicks.parquet")
+            out = io.StringIO()
+            call_command("export_clicks", path, "--from", "2026-01-01", stdout=out)
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path)
+        self.assertIn("Exported 4 clicks rows", out.getvalue())
+        self.assertEqual(
+            sorted(table.column("short_key").to_pylist()), ["col0001"] * 3 + ["col0002"]
+        )
+
+    def test_invalid_query(self):
+        for params in (
+            {"fmt": "csv"}, {"dataset": "links"}, {"from": "2026-02-01", "to": "2026-01-01"}
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_without_pyarrow(self):
+        with patch.object(columnar, "available", return_value=False):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+            self.assertEqual(response.data["code"], "EXPORT_FORMAT_UNAVAILABLE")
+            with self.assertRaises(CommandError):
+                call_command("export_clicks", "clicks.parquet")
+
+
+class BulkImportTests(ShortenerTestMixin, TestCase):
+    """manage.py import_links"""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def _import(self, path, *args):
+        out = io.StringIO()
+        call_command(
+            "import_links", path, "--user", self.user.email, "--workers", "0", *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_csv_import(self):
+        ShortURL.objects.create(user=self.user, original_url="https://old.com", short_key="taken1")
+        path = self._write("links.csv", (
+            "original_url,custom_key,expires_at\n"
+            "https://a.com,,\n"
+            "https://b.com,mykey1,\n"
+            "not-a-url,,\n"
+            "https://c.com,mykey1,\n"
+            "https://d.com,taken1,\n"
+            "https://a.com,,\n"
+        ))
+        output = self._import(path, "--batch-size", "4")
+
+        self.assertIn("Imported 3 links, rejected 3 rows", output)
+        self.assertIn("rows/s", output)
+        self.assertTrue(_on_all_shards(ShortURL, short_key="mykey1", is_custom=True))
+        self.assertEqual(len(_on_all_shards(ShortURL, destination__url="https://a.com")), 2)
+        self.assertEqual(len(_on_all_shards(Destination, url="https://a.com")), 1)
+        with open(f"{path}.rejects", encoding="utf-8") as f:
+            rejected_lines = [int(line.split("\t")[0]) for line in f]
+        self.assertEqual(sorted(rejected_lines), [3, 4, 5])
+
+    def test_imported_keys_redirect(self):
+        short_key_filter.warm()
+        path = self._write("links.ndjson", (
+            '{"original_url": "https://nd.com", "custom_key": "ndkey1", '
+            '"redirect_type": "permanent"}\n'
+            "not json\n"
+        ))
+        output = self._import(path)
+
+        self.assertIn("Imported 1 links, rejected 1 rows", output)
+        response = APIClient().get("/ndkey1/")
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], "https://nd.com")
+
+    def test_resumes_from_checkpoint(self):
+        path = self._write(
+            "links.csv", "original_url\n" + "".join(f"https://r{i}.com\n" for i in range(5))
+        )
+        with open(f"{path}.checkpoint", "w", encoding="utf-8") as f:
+            json.dump(
+                {"source": os.path.abspath(path), "line": 3, "created": 3, "rejected": 0}, f
+            )
+        output = self._import(path)
+
+        self.assertIn("Resuming after line 3", output)
+        self.assertIn("Imported 5 links", output)
+        self.assertEqual(
+            {link.destination.url for link in _on_all_shards(ShortURL)},
+            {"https://r3.com", "https://r4.com"},
+        )
+        with open(f"{path}.checkpoint", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["line"], 5)
+
+    def test_resume_after_crash_before_checkpoint_does_not_duplicate(self):
+        path = self._write(
+            "links.csv", "original_url,custom_key\n"
+            + "".join(f"https://c{i}.com,\n" for i in range(3))
+            + "https://c3.com,crash1\n"
+        )
+        # The batch commits, then the process dies before the checkpoint file is written.
+        with patch(
+            "apps.shortener.management.commands.import_links.Command._save_checkpoint",
+            side_effect=KeyboardInterrupt,
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self._import(path)
+        self.assertEqual(len(_on_all_shards(ShortURL)), 4)
+
+        output = self._import(path)
+
+        self.assertIn("Imported 4 links, rejected 0 rows", output)
+        self.assertEqual(len(_on_all_shards(ShortURL)), 4)
+        self._import(path, "--restart")
+        self.assertEqual(len(_on_all_shards(ShortURL)), 7)  # crash1 is taken now
+
+    def test_parallel_validation(self):
+        path = self._write(
+            "links.csv", "original_url\n" + "".join(f"https://p{i}.com\n" for i in range(6))
+        )
+        out = io.StringIO()
+        call_command(
+            "import_links", path, "--user", self.user.email,
+            "--workers", "2", "--batch-size", "2", stdout=out,
+        )
+        self.assertIn("Imported 6 links", out.getvalue())
+        self.assertEqual(len(_on_all_shards(ShortURL)), 6)
+
+
+IPHONE_UA = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
+)
+WINDOWS_CHROME_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class ClickEnrichmentTests(TestCase):
+    """User agent, referrer and country derived at ingest."""
+
+    databases = "__all__"
+
+    def test_parse_user_agent(self):
+        D, B, O = ClickEvent.Device, ClickEvent.Browser, ClickEvent.OperatingSystem
+        cases = {
+            IPHONE_UA: (D.MOBILE, B.SAFARI, O.IOS),
+            WINDOWS_CHROME_UA: (D.DESKTOP, B.CHROME, O.WINDOWS),
+            WINDOWS_CHROME_UA + " Edg/120.0": (D.DESKTOP, B.EDGE, O.WINDOWS),
+            "Mozilla/5.0 (Linux; Android 14) Chrome/120.0": (D.TABLET, B.CHROME, O.ANDROID),
+            "Googlebot/2.1 (+http://www.google.com/bot.html)": (D.BOT, B.OTHER, O.OTHER),
+            "": (D.UNKNOWN, B.OTHER, O.OTHER),
+        }
+        for user_agent, expected in cases.items():
+            self.assertEqual(enrichment.parse_user_agent(user_agent), expected, user_agent)
+
+    def test_parsed_user_agents_are_cached(self):
+        enrichment.parse_user_agent.cache_clear()
+        for _ in range(3):
+            enrichment.parse_user_agent(IPHONE_UA)
+        self.assertEqual(enrichment.parse_user_agent.cache_info().hits, 2)
+
+    def test_referrer_host(self):
+        self.assertEqual(enrichment.referrer_host("https://WWW.Example.com/a?b"), "example.com")
+        self.assertEqual(enrichment.referrer_host(""), "")
+        self.assertEqual(enrichment.referrer_host("http://[bad"), "")
+
+    def test_country_lookup(self):
+        lookup = enrichment.CountryLookup("")
+        self.assertEqual(lookup.country("8.8.8.8"), "")
+
+        response = SimpleNamespace(country=SimpleNamespace(iso_code="US"))
+        reader = SimpleNamespace(country=lambda ip: response)
+        with patch.object(lookup, "_open", return_value=reader):
+            lookup._loaded = False
+            self.assertEqual(lookup.country("8.8.8.8"), "US")
+            self.assertEqual(lookup.country("10.0.0.1"), "")
+
+    def test_redirect_stores_enriched_click(self):
+        user = User.objects.create_user(
+            username="enrich", email="enrich@example.com", password="StrongPass123!"
+        )
+        ShortURL.objects.create(user=user, original_url="https://e.com", short_key="enrich1")
+        with patch.object(enrichment.country_lookup, "country", return_value="DE"):
+            APIClient().get("/enrich1/", HTTP_USER_AGENT=IPHONE_UA, HTTP_REFERER="https://t.co/x")
+        click = ClickEvent.objects.using(shard_for_key("enrich1")).get()
+        self.assertEqual(click.get_device_display(), "Mobile")
+        self.assertEqual(click.get_browser_display(), "Safari")
+        self.assertEqual(click.get_os_display(), "iOS")
+        self.assertEqual((click.referrer_host, click.country), ("t.co", "DE"))
+
+
 class AnalyticsTests(ShortenerTestMixin, TestCase):
     """GET /api/urls/{id}/analytics/"""
 
@@ -204,8 +996,1106 @@ class AnalyticsTests(ShortenerTestMixin, TestCase):
         self.assertEqual(response.data["click_count"], 1)
         self.assertEqual(len(response.data["recent_clicks"]), 1)
 
-    def test_analytics_not_found(self):
-        import uuid
+    def test_breakdowns(self):
+        short_url = ShortURL.objects.create(
+            user=self.user, original_url="https://analytics.com", short_key="anl2222"
+        )
+        visitor = APIClient()
+        for user_agent in (IPHONE_UA, IPHONE_UA, WINDOWS_CHROME_UA):
+            visitor.get(
+                f"/{short_url.short_key}/",
+                HTTP_USER_AGENT=user_agent,
+                HTTP_REFERER="https://www.news.example/story",
+            )
+        response = self.client.get(f"{self.api_url}{short_url.id}/analytics/")
 
+        breakdowns = response.data["breakdowns"]
+        self.assertEqual(breakdowns["device"], [
+            {"value": "Mobile", "count": 2}, {"value": "Desktop", "count": 1},
+        ])
+        self.assertEqual(breakdowns["os"][0], {"value": "iOS", "count": 2})
+        self.assertEqual(breakdowns["referrer_host"], [{"value": "news.example", "count": 3}])
+        self.assertEqual(response.data["recent_clicks"][0]["browser"], "Chrome")
+
+    def test_analytics_not_found(self):
         response = self.client.get(f"{self.api_url}{uuid.uuid4()}/analytics/")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AccountAnalyticsTests(ShortenerTestMixin, TestCase):
+    """GET /api/urls/analytics/"""
+
+    def setUp(self):
+        super().setUp()
+        self.links = [
+            ShortURL.objects.create(
+                user=self.user, original_url=f"https://acct{i}.com", short_key=f"acct{i:03d}"
+            )
+            for i in range(3)
+        ]
+        visitor = APIClient()
+        for link, clicks in zip(self.links, (1, 3, 2)):
+            for _ in range(clicks):
+                visitor.get(f"/{link.short_key}/")
+        _roll_up_clicks()
+        leaderboard.flush()
+
+    def test_totals_top_links_and_series(self):
+        response = self.client.get(f"{self.api_url}analytics/?days=7&top=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_clicks"], 6)
+        self.assertEqual(response.data["link_count"], 3)
+        self.assertEqual(
+            [link["short_key"] for link in response.data["top_links"]], ["acct001", "acct002"]
+        )
+        series = response.data["clicks_over_time"]
+        self.assertEqual(len(series), 7)
+        self.assertEqual(series[-1], {"date": timezone.localdate().isoformat(), "clicks": 6})
+        self.assertEqual(sum(point["clicks"] for point in series), 6)
+
+    def test_rollups_do_not_scan_links(self):
+        for i in range(20):
+            ShortURL.objects.create(
+                user=self.user, original_url="https://more.com", short_key=f"more{i:03d}"
+            )
+        self.client.get(f"{self.api_url}analytics/")  # creates the links version row
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(f"{self.api_url}analytics/")
+        # Ignoring the UserShard index lookups made when links are sharded.
+        queries = [q["sql"] for q in captured if "user_shards" not in q["sql"]]
+        self.assertFalse(any("click_events" in sql for sql in queries))
+        self.assertLessEqual(len(queries), 8)
+
+    def test_deleting_a_link_removes_its_clicks(self):
+        self.client.delete(f"{self.api_url}{self.links[1].id}/")
+        response = self.client.get(f"{self.api_url}analytics/")
+        self.assertEqual(response.data["total_clicks"], 3)
+        self.assertEqual(response.data["clicks_over_time"][-1]["clicks"], 3)
+
+    def test_totals_are_rolled_up_off_the_redirect_path(self):
+        key = self.links[0].short_key
+        with CaptureQueriesContext(connections[shard_for_key(key)]) as captured:
+            APIClient().get(f"/{key}/")
+        rollups = ("account_click_totals", "daily_click_rollups", "link_click_rollups")
+        self.assertFalse(any(table in q["sql"] for q in captured for table in rollups))
+
+        def total():
+            return self.client.get(f"{self.api_url}analytics/").data["total_clicks"]
+
+        self.assertEqual(total(), 6)
+        self.assertEqual(roll_up_clicks(), 0)  # still settling
+        self.assertEqual(_roll_up_clicks(), 1)
+        self.assertEqual(total(), 7)
+        self.assertEqual(_roll_up_clicks(), 0)
+
+    def test_deleted_clicks_not_yet_rolled_up_are_not_subtracted(self):
+        APIClient().get(f"/{self.links[1].short_key}/")
+        self.client.delete(f"{self.api_url}{self.links[1].id}/")
+        self.assertEqual(_roll_up_clicks(), 0)
+        response = self.client.get(f"{self.api_url}analytics/")
+        self.assertEqual(response.data["total_clicks"], 3)
+
+    def test_other_users_are_excluded(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"{self.api_url}analytics/")
+        self.assertEqual(response.data["total_clicks"], 0)
+        self.assertEqual(response.data["top_links"], [])
+
+    def test_invalid_range(self):
+        response = self.client.get(f"{self.api_url}analytics/?days=0")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CLICK_STREAM_RELAY_SECONDS=0)
+class ClickStreamTests(ShortenerTestMixin, TestCase):
+    """GET /api/urls/stream/ and /api/urls/{id}/stream/"""
+
+    def setUp(self):
+        super().setUp()
+        click_stream.reset()
+        self.short_url = ShortURL.objects.create(
+            user=self.user, original_url="https://live.com", short_key="live001"
+        )
+
+    def _click(self, short_key="live001"):
+        with self.captureOnCommitCallbacks(using=shard_for_key(short_key), execute=True):
+            APIClient().get(f"/{short_key}/", HTTP_USER_AGENT=IPHONE_UA)
+
+    def _events(self, frames):
+        return [
+            json.loads(line.removeprefix("data: "))
+            for frame in frames
+            for line in frame.decode().splitlines()
+            if line.startswith("data: ")
+        ]
+
+    def test_link_stream_pushes_clicks(self):
+        response = self.client.get(f"{self.api_url}{self.short_url.id}/stream/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = iter(response.streaming_content)
+        self.assertTrue(next(stream).startswith(b"retry:"))
+
+        self._click()
+        self._click()
+        frame = next(stream)
+        events = self._events([frame])
+        self.assertIn(b"event: click", frame)
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]["short_url"], str(self.short_url.id))
+        self.assertEqual(events[0]["clicks"], 1)
+        self.assertEqual(events[0]["device"], "Mobile")
+
+        response.close()
+        self.assertFalse(click_stream.has_subscribers(self.short_url.pk, self.user.pk))
+
+    def test_account_stream_only_sees_own_links(self):
+        other = User.objects.create_user(
+            username="streamer", email="streamer@example.com", password="StrongPass123!"
+        )
+        ShortURL.objects.create(user=other, original_url="https://o.com", short_key="live002")
+        subscription = click_stream.subscribe(("user", self.user.pk))
+        self.addCleanup(click_stream.unsubscribe, subscription)
+
+        self._click("live002")
+        self.assertEqual(subscription.wait(0), [])
+        self._click("live001")
+        self.assertEqual(len(subscription.wait(0)), 1)
+
+    def test_no_work_without_subscribers(self):
+        with patch("apps.shortener.stream.click_frame") as click_frame:
+            self._click()
+        click_frame.assert_not_called()
+
+    def test_relay_picks_up_clicks_from_other_processes(self):
+        subscription = click_stream.subscribe(("link", self.short_url.pk))
+        self.addCleanup(click_stream.unsubscribe, subscription)
+        ClickEvent.objects.create(short_url=self.short_url, ip_address="10.0.0.9")
+
+        click_stream.relay_once(timezone.now())
+        self.assertEqual(len(subscription.wait(0)), 1)
+        click_stream.relay_once(timezone.now())
+        self.assertEqual(subscription.wait(0), [])
+
+    def test_async_wait(self):
+        subscription = click_stream.subscribe(("link", "async"))
+        self.addCleanup(click_stream.unsubscribe, subscription)
+
+        async def wait():
+            threading.Timer(0.05, subscription.deliver, [b"frame"]).start()
+            return await subscription.wait_async(5)
+
+        self.assertEqual(asyncio.run(wait()), [b"frame"])
+
+    def test_capacity_limit(self):
+        with patch.object(click_stream, "max_subscribers", 0):
+            response = self.client.get(f"{self.api_url}stream/")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data["code"], "STREAM_BUSY")
+
+    def test_wsgi_streams_are_off_by_default(self):
+        with patch.object(click_stream, "max_sync_subscribers", 0):
+            response = self.client.get(f"{self.api_url}stream/")
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+        self.assertEqual(response.data["code"], "STREAM_UNAVAILABLE")
+
+    def test_asgi_streams_skip_the_wsgi_cap(self):
+        token = RefreshToken.for_user(self.user).access_token
+
+        async def first_frame():
+            response = await AsyncClient().get(
+                f"{self.api_url}stream/", headers={"Authorization": f"Bearer {token}"}
+            )
+            stream = aiter(response.streaming_content)
+            try:
+                return response.status_code, await anext(stream)
+            finally:
+                await stream.aclose()
+
+        with patch.object(click_stream, "max_sync_subscribers", 0):
+            status_code, frame = async_to_sync(first_frame)()
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertTrue(frame.startswith(b"retry:"))
+        self.assertFalse(click_stream.has_subscribers(self.short_url.pk, self.user.pk))
+
+    def test_wsgi_streams_have_their_own_cap(self):
+        with patch.object(click_stream, "max_sync_subscribers", 1):
+            held = click_stream.subscribe(("user", self.user.pk), sync=True)
+            self.addCleanup(click_stream.unsubscribe, held)
+            self.assertIsNone(click_stream.subscribe(("user", self.user.pk), sync=True))
+            async_subscription = click_stream.subscribe(("user", self.user.pk))
+            self.assertIsNotNone(async_subscription)
+            click_stream.unsubscribe(async_subscription)
+            click_stream.unsubscribe(held)
+            replacement = click_stream.subscribe(("user", self.user.pk), sync=True)
+            self.assertIsNotNone(replacement)
+            click_stream.unsubscribe(replacement)
+
+    def test_unknown_link(self):
+        response = self.client.get(f"{self.api_url}{uuid.uuid4()}/stream/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TimeseriesTests(ShortenerTestMixin, TestCase):
+    """GET /api/urls/{id}/analytics/timeseries/"""
+
+    HOUR = LinkClickRollup.Resolution.HOUR
+    DAY = LinkClickRollup.Resolution.DAY
+
+    def setUp(self):
+        super().setUp()
+        self.short_url = ShortURL.objects.create(
+            user=self.user, original_url="https://series.com", short_key="series01"
+        )
+        self.url = f"{self.api_url}{self.short_url.id}/analytics/timeseries/"
+
+    def _seed(self, resolution, *points):
+        LinkClickRollup.objects.using(self.short_url._state.db).bulk_create(
+            LinkClickRollup(
+                short_url=self.short_url, resolution=resolution, start=start, clicks=clicks
+            )
+            for start, clicks in points
+        )
+
+    def _get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data, [bucket["clicks"] for bucket in response.data["buckets"]]
+
+    def test_redirects_maintain_rollups(self):
+        visitor = APIClient()
+        for _ in range(3):
+            visitor.get(f"/{self.short_url.short_key}/")
+        self.assertEqual(self._get()[0]["total"], 0)  # not rolled up yet
+        _roll_up_clicks()
+        data, counts = self._get(granularity="hour")
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(counts[-1], 3)
+        self.assertEqual(len(counts), 30 * 24 + 1)
+        self.assertEqual(self._get()[1][-1], 3)
+        self.assertEqual(
+            sorted(
+                LinkClickRollup.objects.using(self.short_url._state.db)
+                .values_list("resolution", "clicks")
+            ),
+            [(self.HOUR, 3), (self.DAY, 3)],
+        )
+
+    def test_gaps_are_zero_filled_per_granularity(self):
+        utc = dt_timezone.utc
+        self._seed(
+            self.DAY,
+            (datetime(2025, 1, 1, tzinfo=utc), 2),  # a Wednesday
+            (datetime(2025, 1, 6, tzinfo=utc), 5),
+            (datetime(2025, 2, 15, tzinfo=utc), 3),
+            (datetime(2025, 3, 1, tzinfo=utc), 100),  # outside the range
+        )
+        bounds = {"from": "2025-01-01T00:00:00Z", "to": "2025-03-01T00:00:00Z"}
+
+        data, counts = self._get(granularity="day", **bounds)
+        self.assertEqual(len(counts), 59)
+        self.assertEqual((counts[0], counts[5], counts[45], data["total"]), (2, 5, 3, 10))
+
+        data, counts = self._get(granularity="week", **bounds)
+        self.assertEqual(data["start"], "2024-12-30T00:00:00Z")
+        self.assertEqual(counts[:3], [2, 5, 0])
+
+        data, counts = self._get(granularity="month", **bounds)
+        self.assertEqual(counts, [7, 3])
+        self.assertEqual(data["end"], "2025-03-01T00:00:00Z")
+
+    def test_hours_read_the_hourly_rollups(self):
+        start = datetime(2025, 6, 1, tzinfo=dt_timezone.utc)
+        self._seed(self.HOUR, (start + timedelta(hours=5), 4))
+        self._seed(self.DAY, (start, 4))
+        data, counts = self._get(
+            granularity="hour", **{"from": "2025-06-01T00:30:00Z", "to": "2025-06-02T00:00:00Z"}
+        )
+        self.assertEqual(data["start"], "2025-06-01T00:00:00Z")
+        self.assertEqual(len(counts), 24)
+        self.assertEqual(counts[5], 4)
+        self.assertEqual(data["total"], 4)
+
+    def test_a_year_by_hour_is_one_rollup_read(self):
+        start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        self._seed(self.HOUR, *((start + timedelta(hours=i), 1) for i in range(0, 8760, 3)))
+        with CaptureQueriesContext(connection) as queries:
+            data, counts = self._get(
+                granularity="hour", **{"from": "2025-01-01T00:00:00Z", "to": "2026-01-01T00:00:00Z"}
+            )
+        self.assertEqual(len(counts), 8760)
+        self.assertEqual(data["total"], 2920)
+        rollup_reads = [q for q in queries.captured_queries if "link_click_rollups" in q["sql"]]
+        self.assertEqual(len(rollup_reads), 1)
+        self.assertFalse(any("click_events" in q["sql"] for q in queries.captured_queries))
+
+    def test_invalid_ranges(self):
+        for params in (
+            {"from": "2025-02-01T00:00:00Z", "to": "2025-01-01T00:00:00Z"},
+            {"from": "2020-01-01T00:00:00Z", "to": "2025-01-01T00:00:00Z", "granularity": "hour"},
+            {"granularity": "minute"},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_other_users_link_is_not_found(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_conditional_get(self):
+        params = {"granularity": "day"}
+        response = self.client.get(self.url, params)
+        revalidated = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+        APIClient().get(f"/{self.short_url.short_key}/")
+        changed = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+
+
+class LeaderboardTests(ShortenerTestMixin, TestCase):
+    """GET /api/urls/top/, the global board and the admin filter."""
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(
+            username="ranked", email="ranked@example.com", password="StrongPass123!"
+        )
+        visitor = APIClient()
+        for owner, key, clicks in (
+            (self.user, "top0001", 2), (self.user, "top0002", 5),
+            (self.user, "top0003", 1), (self.other, "top0004", 9),
+        ):
+            ShortURL.objects.create(user=owner, original_url=f"https://{key}.com", short_key=key)
+            for _ in range(clicks):
+                visitor.get(f"/{key}/")
+        leaderboard.flush()
+
+    def test_user_top_links(self):
+        response = self.client.get(f"{self.api_url}top/?limit=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([link["short_key"] for link in response.data], ["top0002", "top0001"])
+
+    def test_global_top_links(self):
+        top = selectors.get_top_links(limit=2)
+        self.assertEqual([link.short_key for link in top], ["top0004", "top0002"])
+
+    def test_top_links_read_the_leaderboard_index(self):
+        with CaptureQueriesContext(connection) as captured:
+            selectors.get_top_links(user=self.user, limit=3)
+        queries = [q["sql"] for q in captured if "user_shards" not in q["sql"]]
+        self.assertEqual(len(queries), 1)
+        self.assertIn("link_leaderboard", queries[0])
+
+    def test_clicks_are_buffered_until_flush(self):
+        def leader():
+            return selectors.get_top_links(user=self.user, limit=1)[0].short_key
+
+        for _ in range(10):
+            APIClient().get("/top0003/")
+        self.assertEqual(leader(), "top0002")
+        leaderboard.flush()
+        self.assertEqual(leader(), "top0003")
+
+    def test_flush_runs_on_its_own_thread(self):
+        buffer = LeaderboardBuffer()
+        flushed = threading.Event()
+        with override_settings(LEADERBOARD_FLUSH_SECONDS=0.01), patch.object(
+            buffer, "flush", side_effect=flushed.set
+        ):
+            buffer.note_click("default", uuid.uuid4())
+            self.assertFalse(flushed.is_set())  # never on the clicking thread
+            buffer.start()
+            self.assertTrue(flushed.wait(5))
+            buffer.stop()
+
+    def test_flush_moves_the_account_analytics_etag(self):
+        url = f"{self.api_url}analytics/"
+        APIClient().get("/top0001/")
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        leaderboard.flush()  # no new click, but top_links may have changed
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+
+    def test_deleted_links_leave_the_board(self):
+        link = ShortURL.objects.using(shard_for_key("top0002")).get(short_key="top0002")
+        self.client.delete(f"{self.api_url}{link.id}/")
+        self.assertNotIn("top0002", [link.short_key for link in selectors.get_top_links()])
+
+    @override_settings(SHORT_URL_SHARDS=["default"])  # the admin browses the primary only
+    def test_admin_filter(self):
+        visitor = APIClient()
+        for key, clicks in (("adm0001", 3), ("adm0002", 7)):
+            ShortURL.objects.create(
+                user=self.other, original_url=f"https://{key}.com", short_key=key
+            )
+            for _ in range(clicks):
+                visitor.get(f"/{key}/")
+        leaderboard.flush()
+        admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="StrongPass123!"
+        )
+        self.client.force_login(admin_user)
+        response = self.client.get("/admin/shortener/shorturl/?top=100")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        self.assertLess(content.index("adm0002"), content.index("adm0001"))
+
+
+class MaintenanceTaskTests(ShortenerTestMixin, TestCase):
+    """Shortener background tasks: QR pre-rendering, expiry sweep, leaderboard repair."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    @override_settings(TASKS_BACKEND="local", TASKS_LOCAL_THREADS=0)
+    @patch("apps.shortener.services.cache_is_shared", return_value=True)
+    def test_new_links_prerender_their_qr_code(self, _):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.api_url, {"original_url": "https://qr.example.com"}, format="json"
+            )
+        key = f"{services.QR_CODE_CACHE_PREFIX}{response.data['short_key']}"
+        url, image = cache.get(key)
+        self.assertEqual(url, response.data["short_url"])
+        self.assertTrue(image.startswith(b"\x89PNG"))
+
+        with patch("apps.shortener.services.generate_qr_code") as render:
+            qr = self.client.get(f"{self.api_url}{response.data['id']}/qr/")
+        render.assert_not_called()
+        self.assertEqual(qr.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(qr), image)
+
+    @override_settings(TASKS_BACKEND="database")
+    def test_no_prerender_into_a_process_local_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                self.api_url, {"original_url": "https://qr.example.com"}, format="json"
+            )
+        self.assertFalse(Task.objects.filter(name__endswith="prerender_qr_code").exists())
+
+    def test_sweep_expired_links(self):
+        now = timezone.now()
+        for key, expires_at in (
+            ("old0001", now - timedelta(days=10)),
+            ("new0001", now - timedelta(days=1)),
+            ("live001", None),
+        ):
+            ShortURL.objects.create(
+                user=self.user, original_url=f"https://{key}.com", short_key=key,
+                expires_at=expires_at,
+            )
+        self.assertEqual(sweep_expired_links(), 0)  # retention disabled by default
+        with override_settings(EXPIRED_LINK_RETENTION_DAYS=7):
+            self.assertEqual(sweep_expired_links(), 1)
+        self.assertEqual(
+            {link.short_key for link in _on_all_shards(ShortURL)}, {"new0001", "live001"}
+        )
+
+    def test_reconcile_leaderboard(self):
+        link = ShortURL.objects.create(
+            user=self.user, original_url="https://lost.example.com", short_key="lost001"
+        )
+        shard = link._state.db
+        rows = ShortURL.objects.using(shard).filter(pk=link.pk)
+        rows.update(click_count=4, last_clicked_at=timezone.now())  # a lost flush
+        self.assertEqual(reconcile_leaderboard(), 1)
+        self.assertEqual(LeaderboardEntry.objects.using(shard).get(short_url=link).clicks, 4)
+
+        rows.update(click_count=6, last_clicked_at=timezone.now())
+        self.assertEqual(reconcile_leaderboard(), 1)
+        self.assertEqual(LeaderboardEntry.objects.using(shard).get(short_url=link).clicks, 6)
+        self.assertEqual(reconcile_leaderboard(), 0)
+
+    def test_reconcile_only_reads_recently_clicked_links(self):
+        link = ShortURL.objects.create(
+            user=self.user, original_url="https://old.example.com", short_key="old0001"
+        )
+        reconcile_leaderboard()
+        long_ago = timezone.now() - timedelta(days=1)
+        ShortURL.objects.using(link._state.db).filter(pk=link.pk).update(
+            click_count=3, last_clicked_at=long_ago, updated_at=long_ago
+        )
+        self.assertEqual(reconcile_leaderboard(), 0)
+        cache.clear()  # no cursor: a full pass
+        self.assertEqual(reconcile_leaderboard(), 1)
+
+
+@override_settings(SHORT_URL_BASE="https://sho.rt/s/", ALLOWED_HOSTS=["*"])
+class ShortDomainTests(ShortenerTestMixin, TestCase):
+    """Short URL rendering and per-user custom short domains."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        short_domains.invalidate()
+        self.addCleanup(short_domains.invalidate)
+        self.other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        self.own = ShortURL.objects.create(
+            user=self.user, original_url="https://own.example.com", short_key="own0001"
+        )
+        self.foreign = ShortURL.objects.create(
+            user=self.other, original_url="https://foreign.example.com", short_key="frn0001"
+        )
+
+    def add_domain(self, host="go.example.com"):
+        return ShortDomain.objects.create(user=self.user, host=host)
+
+    def test_default_base_keeps_its_path_prefix(self):
+        response = self.client.get(self.api_url)
+        self.assertEqual(response.data[0]["short_url"], "https://sho.rt/s/own0001")
+
+    def test_links_render_with_their_owner_domain(self):
+        self.add_domain()
+        response = self.client.get(self.api_url)
+        self.assertEqual(response.data[0]["short_url"], "https://go.example.com/own0001")
+        self.assertEqual(
+            short_domains.short_url("frn0001", self.other.pk), "https://sho.rt/s/frn0001"
+        )
+
+        export = self.client.get(f"{self.api_url}export/")
+        self.assertIn("https://go.example.com/own0001", b"".join(export).decode())
+
+    def test_domain_changes_apply_at_once(self):
+        first = self.client.get(self.api_url)
+        domain = self.add_domain()
+        second = self.client.get(self.api_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data[0]["short_url"], "https://go.example.com/own0001")
+        domain.delete()
+        self.assertEqual(
+            short_domains.short_url("own0001", self.user.pk), "https://sho.rt/s/own0001"
+        )
+
+    def test_serializing_many_links_takes_one_snapshot(self):
+        ShortURL.objects.using(self.own._state.db).bulk_create([
+            ShortURL(
+                user=self.user, destination=self.own.destination, short_key=f"many{n:03d}"
+            )
+            for n in range(20)
+        ])
+        links = list(selectors.get_user_short_urls(user=self.user))
+        with patch.object(short_domains, "snapshot", wraps=short_domains.snapshot) as snapshot:
+            data = ShortURLResponseSerializer(links, many=True).data
+        self.assertEqual(snapshot.call_count, 1)
+        self.assertEqual(len({link["short_url"] for link in data}), 21)
+
+    def test_custom_domain_only_resolves_its_owner_links(self):
+        self.add_domain()
+        client = APIClient()
+        own = client.get("/own0001/", HTTP_HOST="go.example.com")
+        self.assertEqual(own.status_code, status.HTTP_302_FOUND)
+        foreign = client.get("/frn0001/", HTTP_HOST="go.example.com:443")
+        self.assertEqual(foreign.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(client.get("/frn0001/", HTTP_HOST="sho.rt").status_code, 302)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.click_count, 1)
+
+    def test_qr_code_follows_the_domain(self):
+        with patch("apps.shortener.services.generate_qr_code", return_value=b"png") as render:
+            services.get_qr_code("own0001", user_id=self.user.pk)
+            self.add_domain()
+            services.get_qr_code("own0001", user_id=self.user.pk)
+            services.get_qr_code("own0001", user_id=self.user.pk)
+        self.assertEqual(
+            [call.args[0] for call in render.call_args_list],
+            ["https://sho.rt/s/own0001", "https://go.example.com/own0001"],
+        )
+
+    def test_host_validation(self):
+        domain = ShortDomain(user=self.user, host=" Go.Example.COM. ")
+        domain.full_clean()
+        self.assertEqual(domain.host, "go.example.com")
+        for host in ("localhost", "go.example.com:8080", "https://go.example.com", "sho.rt"):
+            with self.assertRaises(ValidationError):
+                ShortDomain(user=self.other, host=host).full_clean()
+
+
+class StubDestinationHandler(BaseHTTPRequestHandler):
+    """Local stand-in for link destinations, recording what it was asked."""
+
+    requests = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_HEAD(self):
+        self._respond()
+
+    def do_GET(self):
+        self._respond()
+
+    def _respond(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append((self.command, self.path, time.monotonic()))
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            path = self.path.split("?")[0]
+            if path == "/slow":
+                time.sleep(0.3)
+            if path == "/no-head" and self.command == "HEAD":
+                self.send_response(405)
+            elif path == "/moved":
+                self.send_response(301)
+                self.send_header("Location", "/ok")
+            elif path == "/loop":
+                self.send_response(302)
+                self.send_header("Location", "/loop")
+            elif path == "/gone":
+                self.send_response(404)
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(
+    LINK_HEALTH_ALLOW_PRIVATE=True,
+    LINK_HEALTH_HOST_INTERVAL_SECONDS=0,
+    LINK_HEALTH_TIMEOUT_SECONDS=2,
+)
+class LinkHealthTests(ShortenerTestMixin, TestCase):
+    """Background destination health checks against a local HTTP server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubDestinationHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        StubDestinationHandler.requests = []
+        StubDestinationHandler.max_in_flight = 0
+
+    def checker(self, **options):
+        return health.HealthChecker(
+            **{"concurrency": 10, "host_interval": 0, "timeout": 2, "allow_private": True,
+               **options}
+        )
+
+    def test_probe_outcomes(self):
+        results = self.checker().check_many(
+            f"{self.base}{path}" for path in ("/ok", "/no-head", "/gone", "/moved", "/loop")
+        )
+        outcome = {
+            url.removeprefix(self.base): (result.status, result.http_status)
+            for url, result in results.items()
+        }
+        self.assertEqual(outcome, {
+            "/ok": ("ok", 200),
+            "/no-head": ("ok", 200),
+            "/gone": ("broken", 404),
+            "/moved": ("ok", 200),
+            "/loop": ("broken", 302),
+        })
+        requests = StubDestinationHandler.requests
+        methods = [method for method, path, _ in requests if path == "/no-head"]
+        self.assertEqual(methods, ["HEAD", "GET"])
+
+    def test_unreachable_destinations(self):
+        with socket.socket() as closed:
+            closed.bind(("127.0.0.1", 0))
+            port = closed.getsockname()[1]
+        refused = f"http://127.0.0.1:{port}/"
+        slow = f"{self.base}/slow"
+        results = self.checker(timeout=0.1).check_many([refused, slow])
+        self.assertEqual(results[refused].status, "unreachable")
+        self.assertTrue(results[refused].error)
+        self.assertEqual(results[slow].error, "No response within 0.1s.")
+
+    def test_private_addresses_are_not_contacted(self):
+        url = f"{self.base}/ok"
+        result = self.checker(allow_private=False).check_many([url])[url]
+        self.assertEqual(result.status, "unreachable")
+        self.assertIn("public address", result.error)
+        self.assertEqual(StubDestinationHandler.requests, [])
+
+    def test_concurrency_is_bounded(self):
+        self.checker(concurrency=2).check_many(f"{self.base}/slow?n={n}" for n in range(6))
+        self.assertEqual(len(StubDestinationHandler.requests), 6)
+        self.assertEqual(StubDestinationHandler.max_in_flight, 2)
+
+    def test_requests_to_one_host_are_spaced(self):
+        self.checker(host_interval=0.1).check_many(f"{self.base}/ok?n={n}" for n in range(4))
+        starts = sorted(started for _, _, started in StubDestinationHandler.requests)
+        self.assertEqual(len(starts), 4)
+        self.assertGreaterEqual(starts[-1] - starts[0], 0.29)
+
+    def test_run_budget_leaves_the_rest_for_later(self):
+        results = self.checker(concurrency=1, run_seconds=0.2).check_many(
+            f"{self.base}/slow?n={n}" for n in range(4)
+        )
+        self.assertLess(len(results), 4)
+
+    def test_task_stores_results_for_the_dashboard(self):
+        for key, path in (("hlth001", "/ok"), ("hlth002", "/gone"), ("hlth003", "/gone")):
+            # On one shard, so each URL is a single Destination row.
+            ShortURL.objects.using(home_shard(self.user)).create(
+                user=self.user, original_url=f"{self.base}{path}", short_key=key
+            )
+        first = self.client.get(self.api_url)
+        self.assertEqual({link["health"]["status"] for link in first.data}, {"unchecked"})
+
+        self.assertEqual(check_link_health(), 2)  # one probe per distinct destination
+        cache.clear()  # the task ran in the worker process, not this one
+        response = self.client.get(self.api_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        health_by_key = {link["short_key"]: link["health"] for link in response.data}
+        self.assertEqual(health_by_key["hlth001"]["status"], "ok")
+        self.assertEqual(
+            (health_by_key["hlth002"]["status"], health_by_key["hlth002"]["http_status"]),
+            ("broken", 404),
+        )
+
+        self.assertEqual(check_link_health(), 0)  # fresh until the TTL runs out
+        Destination.objects.using(home_shard(self.user)).update(
+            health_checked_at=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(check_link_health(), 2)
+
+
+# The admin browses the primary database only.
+@override_settings(
+    ADMIN_INLINE_CLICKS=3, ADMIN_EXACT_COUNT_LIMIT=100, SHORT_URL_SHARDS=["default"]
+)
+class AdminPerformanceTests(ShortenerTestMixin, TestCase):
+    """Admin pages whose cost does not grow with the click table."""
+
+    def setUp(self):
+        super().setUp()
+        admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="StrongPass123!"
+        )
+        self.client.force_login(admin_user)
+        self.short_url = ShortURL.objects.create(
+            user=self.user, original_url="https://admin.com", short_key="adm0001"
+        )
+
+    def _click(self, short_url, count, *, ip="10.0.0.1"):
+        ClickEvent.objects.bulk_create(
+            [ClickEvent(short_url=short_url, ip_address=ip) for _ in range(count)]
+        )
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_click_changelist_queries_do_not_grow_with_rows(self):
+        url = "/admin/shortener/clickevent/"
+        self._click(self.short_url, 2)
+        few = self._queries(url)
+        for i in range(5):
+            link = ShortURL.objects.create(
+                user=self.user, original_url=f"https://admin{i}.com", short_key=f"adm1{i:03}"
+            )
+            self._click(link, 2)
+        self.assertEqual(self._queries(url), few)
+
+    def test_changelists_skip_the_full_count(self):
+        self._click(self.short_url, 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/admin/shortener/clickevent/?q=adm0001")
+        counts = [q["sql"] for q in queries if "COUNT(" in q["sql"]]
+        self.assertTrue(counts)
+        self.assertTrue(all("LIMIT 101" in sql for sql in counts))
+
+    def test_inline_shows_one_page_of_recent_clicks(self):
+        self._click(self.short_url, 5, ip="10.0.0.1")
+        self._click(self.short_url, 2, ip="10.0.0.2")
+        ClickEvent.objects.filter(ip_address="10.0.0.2").update(
+            created_at=timezone.now() + timedelta(minutes=1)
+        )
+        url = f"/admin/shortener/shorturl/{self.short_url.pk}/change/"
+        content = self.client.get(url).content.decode()
+        self.assertEqual(content.count("adm0001 from 10.0.0.2"), 2)
+        self.assertEqual(content.count("adm0001 from 10.0.0.1"), 1)
+        self.assertIn("All 0 clicks", content)
+        older = self.client.get(url, {"clicks_page": 3}).content.decode()
+        self.assertEqual(older.count("adm0001 from 10.0.0.1"), 1)
+        self.assertNotIn("10.0.0.2", older)
+
+    def test_search_by_destination_url(self):
+        ShortURL.objects.create(
+            user=self.user, original_url="https://other.com", short_key="adm0002"
+        )
+        response = self.client.get("/admin/shortener/shorturl/", {"q": "https://admin.com"})
+        content = response.content.decode()
+        self.assertIn("adm0001", content)
+        self.assertNotIn("adm0002", content)
+
+
+class ConditionalGetTests(ShortenerTestMixin, TestCase):
+    """ETag / Last-Modified on the list and analytics endpoints."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.short_url = ShortURL.objects.create(
+            user=self.user, original_url="https://etag.com", short_key="etag001"
+        )
+
+    def _revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.client.get(self.api_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn("Last-Modified", first)
+        self.assertIn("private", first["Cache-Control"])
+
+        with patch("apps.shortener.views.selectors.get_user_short_urls") as get_urls:
+            second = self._revalidate(self.api_url, first)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second["ETag"], first["ETag"])
+        get_urls.assert_not_called()
+
+    def test_list_changes_with_links_and_clicks(self):
+        first = self.client.get(self.api_url)
+        ShortURL.objects.create(user=self.user, original_url="https://n.com", short_key="etag002")
+        second = self._revalidate(self.api_url, first)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(second.data), 2)
+
+        APIClient().get("/etag001/")
+        _roll_up_clicks()
+        third = self._revalidate(self.api_url, second)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._revalidate(self.api_url, third).status_code, 304)
+
+    def test_analytics_changes_with_clicks_and_edits(self):
+        url = f"{self.api_url}{self.short_url.id}/analytics/"
+        first = self.client.get(url)
+        self.assertEqual(self._revalidate(url, first).status_code, 304)
+
+        APIClient().get("/etag001/")
+        second = self._revalidate(url, first)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data["click_count"], 1)
+
+        self.client.patch(f"{self.api_url}{self.short_url.id}/", {"original_url": "https://x.com"})
+        self.assertEqual(self._revalidate(url, second).status_code, 200)
+
+    def test_analytics_changes_with_health_checks_and_domains(self):
+        url = f"{self.api_url}{self.short_url.id}/analytics/"
+        first = self.client.get(url)
+
+        Destination.objects.using(self.short_url._state.db).filter(
+            pk=self.short_url.destination_id
+        ).update(health_status=Destination.Health.BROKEN, health_checked_at=timezone.now())
+        second = self._revalidate(url, first)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data["short_url"]["health"]["status"], Destination.Health.BROKEN)
+        self.assertEqual(self._revalidate(url, second).status_code, 304)
+
+        ShortDomain.objects.create(user=self.user, host="go.etag.com")
+        third = self._revalidate(url, second)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertIn("go.etag.com", third.data["short_url"]["short_url"])
+
+    def test_account_analytics_etag_depends_on_query(self):
+        url = f"{self.api_url}analytics/"
+        first = self.client.get(url)
+        self.assertEqual(self._revalidate(url, first).status_code, 304)
+        self.assertEqual(self._revalidate(f"{url}?days=7", first).status_code, 200)
+
+    def test_links_version_is_shared_by_workers(self):
+        first = self.client.get(self.api_url)
+        cache.clear()  # another worker's (empty) cache
+        self.assertEqual(self._revalidate(self.api_url, first).status_code, 304)
+
+        bump_links_version(self.user.pk)  # e.g. from the task worker
+        self.assertEqual(self._revalidate(self.api_url, first).status_code, 200)
+
+    def test_deleting_a_user_drops_the_version(self):
+        self.client.get(self.api_url)
+        self.assertTrue(LinkListVersion.objects.filter(user=self.user).exists())
+        self.user.delete()
+        self.assertFalse(LinkListVersion.objects.exists())
+
+
+class ShardingTests(TestCase):
+    """Key → shard mapping (no extra databases needed)."""
+
+    @override_settings(SHORT_URL_SHARDS=["default", "shard_1", "shard_2"])
+    def test_keys_spread_evenly_and_deterministically(self):
+        keys = [f"key{i}" for i in range(3000)]
+        counts = Counter(shard_for_key(key) for key in keys)
+        self.assertEqual(set(counts), {"default", "shard_1", "shard_2"})
+        self.assertTrue(all(800 < count < 1200 for count in counts.values()))
+        self.assertEqual([shard_for_key(k) for k in keys], [shard_for_key(k) for k in keys])
+
+    @override_settings(SHORT_URL_SHARDS=["default", "shard_1", "shard_2"])
+    def test_generated_keys_are_allocated_in_target_shard(self):
+        for _ in range(20):
+            key = generate_short_key(
+                exists_fn=lambda k: False,
+                accept_fn=lambda k: shard_for_key(k) == "shard_2",
+            )
+            self.assertEqual(shard_for_key(key), "shard_2")
+
+    @override_settings(SHORT_URL_SHARDS=["default"])
+    def test_single_shard_is_default(self):
+        self.assertEqual(shard_for_key("anything"), "default")
+
+
+SHARD_ALIASES = [alias for alias in settings.DATABASES if alias.startswith("shard_")]
+
+
+@skipUnless(SHARD_ALIASES, "set SQLITE_SHARDS=N to run against several SQLite files")
+class ShardedStorageTests(TestCase):
+    """End-to-end behaviour with short_urls spread over several databases."""
+
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        short_key_filter.reset()
+        resolution_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="sharded", email="sharded@example.com", password="StrongPass123!"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _keys_per_shard(self):
+        keys = {}
+        for i in range(200):
+            keys.setdefault(shard_for_key(f"shd{i:04d}"), f"shd{i:04d}")
+        return keys
+
+    def test_links_live_on_their_key_shard(self):
+        for shard, key in self._keys_per_shard().items():
+            self.client.post("/api/urls/", {"original_url": "https://s.com", "custom_key": key})
+            for alias in settings.SHORT_URL_SHARDS:
+                exists = ShortURL.objects.using(alias).filter(short_key=key).exists()
+                self.assertEqual(exists, alias == shard)
+
+    def test_generated_keys_stay_in_home_shard(self):
+        for _ in range(5):
+            response = self.client.post("/api/urls/", {"original_url": "https://h.com"})
+            self.assertEqual(shard_for_key(response.data["short_key"]), home_shard(self.user))
+
+    def test_bulk_import_places_rows_by_key(self):
+        keys = self._keys_per_shard()
+        entries = [{"original_url": "https://b.com", "custom_key": key} for key in keys.values()]
+        entries.append({"original_url": "https://b.com"})
+        created, skipped = services.bulk_import_short_urls(user=self.user, entries=entries)
+        self.assertEqual((created, skipped), (len(entries), []))
+        for shard, key in keys.items():
+            self.assertTrue(ShortURL.objects.using(shard).filter(short_key=key).exists())
+        self.assertEqual(len(self.client.get("/api/urls/").data), len(entries))
+
+    def test_account_analytics_span_shards(self):
+        keys = self._keys_per_shard().values()
+        for key in keys:
+            self.client.post("/api/urls/", {"original_url": "https://a.com", "custom_key": key})
+            self.client.get(f"/{key}/")
+        self.assertEqual(_roll_up_clicks(), len(keys))
+        response = self.client.get("/api/urls/analytics/")
+        self.assertEqual(response.data["total_clicks"], len(keys))
+        self.assertEqual(response.data["link_count"], len(keys))
+
+    def test_admin_reads_one_selected_shard(self):
+        keys = self._keys_per_shard()
+        for key in keys.values():
+            self.client.post("/api/urls/", {"original_url": "https://adm.com", "custom_key": key})
+            APIClient().get(f"/{key}/")
+        leaderboard.flush()
+        admin_client = APIClient()
+        admin_client.force_login(User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="StrongPass123!"
+        ))
+        other = SHARD_ALIASES[0]
+
+        content = admin_client.get("/admin/shortener/shorturl/").content.decode()
+        self.assertIn(keys["default"], content)
+        self.assertNotIn(keys[other], content)
+        for params in ({"shard": other}, {"shard": other, "top": "100"}):
+            content = admin_client.get("/admin/shortener/shorturl/", params).content.decode()
+            self.assertIn(keys[other], content)
+            self.assertNotIn(keys["default"], content)
+
+        link = ShortURL.objects.using(other).get(short_key=keys[other])
+        content = admin_client.get(f"/admin/shortener/shorturl/{link.pk}/change/").content.decode()
+        self.assertIn(f"shard={other}", content)  # the link to its clicks
+        self.assertIn(f"{keys[other]} from", content)  # the clicks inline
+        response = admin_client.post(f"/admin/shortener/shorturl/{link.pk}/change/", {
+            "user": self.user.pk, "destination": link.destination_id, "short_key": link.short_key,
+            "redirect_type": "permanent", "analytics_mode": "exact",
+            "click_events-TOTAL_FORMS": 0, "click_events-INITIAL_FORMS": 0,
+        })
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        link.refresh_from_db()
+        self.assertEqual(link.redirect_type, "permanent")
+
+    def test_redirect_queries_only_the_key_shard(self):
+        key = self._keys_per_shard()[SHARD_ALIASES[0]]
+        self.client.post("/api/urls/", {"original_url": "https://r.com", "custom_key": key})
+        short_key_filter.warm()
+        with CaptureQueriesContext(connections["default"]) as primary_queries:
+            response = self.client.get(f"/{key}/")
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(len(primary_queries), 0)
+        link = ShortURL.objects.using(SHARD_ALIASES[0]).get(short_key=key)
+        self.assertEqual(link.click_count, 1)
+        self.assertEqual(ClickEvent.objects.using(SHARD_ALIASES[0]).count(), 1)
+
+    def test_listing_and_detail_span_user_shards(self):
+        keys = list(self._keys_per_shard().values())
+        for key in keys:
+            self.client.post("/api/urls/", {"original_url": "https://l.com", "custom_key": key})
+        response = self.client.get("/api/urls/")
+        self.assertEqual(sorted(item["short_key"] for item in response.data), sorted(keys))
+        created = [item["created_at"] for item in response.data]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+        detail = response.data[-1]
+        response = self.client.patch(
+            f"/api/urls/{detail['id']}/", {"original_url": "https://moved.com"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_delete_removes_links_on_every_shard(self):
+        for key in self._keys_per_shard().values():
+            self.client.post("/api/urls/", {"original_url": "https://d.com", "custom_key": key})
+        self.user.delete()
+        for alias in settings.SHORT_URL_SHARDS:
+            self.assertFalse(ShortURL.objects.using(alias).exists())
+
+    @override_settings(EXPIRED_LINK_RETENTION_DAYS=1)
+    def test_expired_link_sweep_covers_every_shard(self):
+        keys = self._keys_per_shard()
+        for key in keys.values():
+            self.client.post("/api/urls/", {"original_url": "https://x.com", "custom_key": key})
+        for alias in settings.SHORT_URL_SHARDS:
+            ShortURL.objects.using(alias).update(expires_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(sweep_expired_links(), len(keys))
+        for alias in settings.SHORT_URL_SHARDS:
+            self.assertFalse(ShortURL.objects.using(alias).exists())
@@ -0,0 +1,87 @@
+"""
+Bucketing for the per-link click time series.
+
+Buckets are UTC-aligned hours, days, ISO weeks (starting Monday) or
+calendar months. Each granularity is read from the coarsest stored
+``LinkClickRollup`` resolution that divides it — hourly rollups for
+hours, daily rollups for everything else — and assembled into a
+zero-filled list of counts by integer bucket arithmetic: one pass over the
+stored rows, no per-bucket lookups.
+"""
+
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from .models import LinkClickRollup
+
+Resolution = LinkClickRollup.Resolution
+
+GRANULARITIES = ("hour", "day", "week", "month")
+# Fixed bucket widths in seconds; months are counted by calendar.
+BUCKET_SECONDS = {"hour": 3_600, "day": 86_400, "week": 7 * 86_400}
+
+
+def stored_resolution(granularity: str) -> int:
+    """The coarsest ``LinkClickRollup.Resolution`` that fits *granularity*."""
+    return Resolution.HOUR if granularity == "hour" else Resolution.DAY
+
+
+def rollup_start(moment: datetime, resolution: int) -> datetime:
+    """Start of the *resolution* bucket holding *moment*, in UTC."""
+    return floor(moment, "hour" if resolution == Resolution.HOUR else "day")
+
+
+def floor(moment: datetime, granularity: str) -> datetime:
+    """Start of the *granularity* bucket holding *moment*, in UTC."""
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return moment
+    moment = moment.replace(hour=0)
+    if granularity == "week":
+        return moment - timedelta(days=moment.weekday())
+    if granularity == "month":
+        return moment.replace(day=1)
+    return moment
+
+
+def bucket_count(first: datetime, end: datetime, granularity: str) -> int:
+    """Buckets from *first* (a bucket start) needed to cover up to *end*."""
+    if granularity == "month":
+        months = _month_index(end) - _month_index(first)
+        return months + (floor(end, "month") < end)
+    width = BUCKET_SECONDS[granularity]
+    return -(-int((end - first).total_seconds()) // width)  # ceiling division
+
+
+def bucket_starts(first: datetime, count: int, granularity: str) -> list[datetime]:
+    if granularity == "month":
+        base = _month_index(first)
+        return [
+            first.replace(year=index // 12, month=index % 12 + 1)
+            for index in range(base, base + count)
+        ]
+    width = timedelta(seconds=BUCKET_SECONDS[granularity])
+    return [first + width * i for i in range(count)]
+
+
+def assemble(rows, first: datetime, count: int, granularity: str) -> list[int]:
+    """
+    Sum ``(start, clicks)`` rollup *rows* into *count* buckets from
+    *first*; buckets without rows stay zero.
+    """
+    counts = [0] * count
+    if granularity == "month":
+        base = _month_index(first)
+        for start, clicks in rows:
+            counts[_month_index(start) - base] += clicks
+        return counts
+    origin = int(first.timestamp())
+    width = BUCKET_SECONDS[granularity]
+    for start, clicks in rows:
+        counts[(int(start.timestamp()) - origin) // width] += clicks
+    return counts
+
+
+def _month_index(moment: datetime) -> int:
+    moment = moment.astimezone(dt_timezone.utc)
+    return moment.year * 12 + moment.month - 1
@@ -8,7 +8,23 @@ app_name = "shortener"
 
 urlpatterns = [
     path("", views.ShortURLListCreateView.as_view(), name="list-create"),
+    path("analytics/", views.AccountAnalyticsView.as_view(), name="account-analytics"),
+    path("export/", views.ShortURLExportView.as_view(), name="export"),
+    path("clicks/export/", views.ColumnarExportView.as_view(), name="clicks-export-columnar"),
+    path("top/", views.TopLinksView.as_view(), name="top"),
+    path("stream/", views.AccountClickStreamView.as_view(), name="stream"),
     path("<uuid:url_id>/", views.ShortURLDetailView.as_view(), name="detail"),
     path("<uuid:url_id>/analytics/", views.ShortURLAnalyticsView.as_view(), name="analytics"),
+    path(
+        "<uuid:url_id>/analytics/timeseries/",
+        views.ShortURLTimeseriesView.as_view(),
+        name="analytics-timeseries",
+    ),
     path("<uuid:url_id>/qr/", views.ShortURLQRCodeView.as_view(), name="qr-code"),
+    path("<uuid:url_id>/stream/", views.ShortURLClickStreamView.as_view(), name="stream-link"),
+    path(
+        "<uuid:url_id>/clicks/export/",
+        views.ClickEventExportView.as_view(),
+        name="clicks-export",
+    ),
 ]
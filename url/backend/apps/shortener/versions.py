@@ -0,0 +1,76 @@
+"""
+Per-user "links version" for conditional GETs on the link list.
+
+Any change to a user's set of links (create, edit, delete — via signals,
+``bump_links_version`` for bulk inserts, ``bump_links_versions`` for
+background jobs touching many users' links) stores a fresh random token and a
+timestamp in the user's ``LinkListVersion`` row. The row lives on the
+primary, so a version bumped by one worker (or by ``run_tasks``) is what
+every other worker validates against. Clicks are tracked separately, by the
+account click rollup, so the hot redirect path never touches this row.
+
+The same row carries the user's leaderboard watermark
+(``mark_leaderboard_flushed``): top links come from ``link_leaderboard``,
+which moves with flushes rather than clicks, so the account analytics
+validators include it.
+
+Tokens are random rather than counters: a row deleted with its user and
+created again never repeats a token a client may still hold.
+"""
+
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.db_router import PRIMARY
+
+from .models import LinkListVersion
+
+
+def links_version(user_pk) -> tuple[str, object, object]:
+    """Return ``(token, modified_at, leaderboard_at)`` for *user_pk*'s links."""
+    version = (
+        LinkListVersion.objects.using(PRIMARY)
+        .filter(user_id=user_pk)
+        .values_list("token", "modified_at", "leaderboard_at")
+        .first()
+    )
+    if version is None:
+        version = (uuid.uuid4().hex, timezone.now(), None)
+        try:
+            with transaction.atomic(using=PRIMARY):
+                LinkListVersion.objects.using(PRIMARY).create(
+                    user_id=user_pk, token=version[0], modified_at=version[1]
+                )
+        except IntegrityError:  # created concurrently
+            version = (
+                LinkListVersion.objects.using(PRIMARY)
+                .filter(user_id=user_pk)
+                .values_list("token", "modified_at", "leaderboard_at")
+                .get()
+            )
+    return version
+
+
+def bump_links_version(user_pk) -> None:
+    # An UPDATE only: with no row yet, no client can hold a token, and the
+    # next read creates one. Never inserting here keeps cascading user
+    # deletes (whose link deletes send these signals) from resurrecting it.
+    LinkListVersion.objects.using(PRIMARY).filter(user_id=user_pk).update(
+        token=uuid.uuid4().hex, modified_at=timezone.now()
+    )
+
+
+def bump_links_versions(user_pks) -> None:
+    """``bump_links_version`` for many users in one statement."""
+    LinkListVersion.objects.using(PRIMARY).filter(user_id__in=list(user_pks)).update(
+        token=uuid.uuid4().hex, modified_at=timezone.now()
+    )
+
+
+def mark_leaderboard_flushed(user_pks) -> None:
+    """Record that leaderboard entries of *user_pks* were just written."""
+    LinkListVersion.objects.using(PRIMARY).filter(user_id__in=list(user_pks)).update(
+        leaderboard_at=timezone.now()
+    )
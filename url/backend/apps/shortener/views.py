@@ -2,52 +2,119 @@
 Shortener views — thin wrappers delegating to services and selectors.
 """
 
-from django.http import HttpResponse
+import hashlib
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.http.request import split_domain_port
+from django.utils import timezone
+from django.utils.cache import (
+    add_never_cache_headers,
+    get_conditional_response,
+    patch_cache_control,
+    patch_response_headers,
+)
+from django.utils.http import http_date, quote_etag
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.common.utils import build_short_url, generate_qr_code
+from apps.common.constants import IDEMPOTENCY_KEY_MAX_LENGTH
+from core.exceptions import ClickStreamBusy, ClickStreamUnavailable, ExportFormatUnavailable
+from core.throttling import RedirectNotFoundThrottle
 
-from . import selectors, services
+from . import columnar, exports, selectors, services, timeseries
+from .domains import short_domains
+from .models import ShortURL
 from .serializers import (
+    AccountAnalyticsQuerySerializer,
+    AccountAnalyticsSerializer,
     AnalyticsSerializer,
+    ColumnarExportQuerySerializer,
     ShortURLCreateSerializer,
     ShortURLResponseSerializer,
     ShortURLUpdateSerializer,
+    TimeseriesQuerySerializer,
+    TimeseriesSerializer,
+    TopLinksQuerySerializer,
 )
+from .stream import aiter_sse, click_stream, iter_sse
 
 
 # ---------------------------------------------------------------------------
 # CRUD views (authenticated)
 # ---------------------------------------------------------------------------
 
-class ShortURLListCreateView(APIView):
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified from cheap validators, so an unchanged payload is
+    answered with 304 before anything is queried for or serialized.
+    """
+
+    def conditional_response(self, request, parts, last_modified, build):
+        """
+        Return 304 if the client's validators match *parts* /
+        *last_modified*; otherwise ``build()``. Either way the response
+        carries the validators and must be revalidated on every use.
+        """
+        parts = (*parts, request.accepted_renderer.format)
+        etag = quote_etag(hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = build()
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ShortURLListCreateView(ConditionalGetMixin, APIView):
     """
     GET  /api/urls/      — list the authenticated user's URLs.
-    POST /api/urls/      — create a new short URL.
+    POST /api/urls/      — create a new short URL (201), or return an
+                           existing one (200) for a replayed
+                           ``Idempotency-Key`` or ``reuse_existing``.
     """
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        urls = selectors.get_user_short_urls(user=request.user)
-        serializer = ShortURLResponseSerializer(urls, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        def build():
+            urls = selectors.get_user_short_urls(user=request.user)
+            serializer = ShortURLResponseSerializer(urls, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        parts, last_modified = selectors.get_links_freshness(user=request.user)
+        return self.conditional_response(request, parts, last_modified, build)
 
     def post(self, request):
         serializer = ShortURLCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        short_url = services.create_short_url(
+        idempotency_key = request.headers.get("Idempotency-Key") or None
+        if idempotency_key and len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise ValidationError(
+                {"Idempotency-Key": [f"Must be at most {IDEMPOTENCY_KEY_MAX_LENGTH} characters."]}
+            )
+        short_url, created = services.create_or_get_short_url(
             user=request.user,
+            idempotency_key=idempotency_key,
+            reuse_existing=serializer.validated_data["reuse_existing"],
             original_url=serializer.validated_data["original_url"],
             custom_key=serializer.validated_data.get("custom_key"),
             expires_at=serializer.validated_data.get("expires_at"),
+            redirect_type=serializer.validated_data["redirect_type"],
+            analytics_mode=serializer.validated_data["analytics_mode"],
         )
         return Response(
             ShortURLResponseSerializer(short_url).data,
-            status=status.HTTP_201_CREATED,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
         )
 
 
@@ -78,6 +145,8 @@ class ShortURLDetailView(APIView):
             short_url=short_url,
             original_url=serializer.validated_data.get("original_url"),
             expires_at=serializer.validated_data.get("expires_at"),
+            redirect_type=serializer.validated_data.get("redirect_type"),
+            analytics_mode=serializer.validated_data.get("analytics_mode"),
         )
         return Response(
             ShortURLResponseSerializer(updated).data,
@@ -95,7 +164,7 @@ class ShortURLDetailView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ShortURLAnalyticsView(APIView):
+class ShortURLAnalyticsView(ConditionalGetMixin, APIView):
     """GET /api/urls/{id}/analytics/ — click analytics for a URL."""
 
     permission_classes = [IsAuthenticated]
@@ -107,9 +176,242 @@ class ShortURLAnalyticsView(APIView):
                 {"error": "Not found.", "code": "NOT_FOUND"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        data = selectors.get_analytics(short_url=short_url)
-        serializer = AnalyticsSerializer(data)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+        def build():
+            data = selectors.get_analytics(short_url=short_url)
+            serializer = AnalyticsSerializer(data)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        # The row already loaded for the ownership check carries the
+        # validators: edits move updated_at, clicks move click_count, health
+        # checks move the destination's checked_at. The embedded link also
+        # renders with the owner's current prefix (custom domain).
+        checked_at = short_url.destination.health_checked_at
+        parts = (
+            short_url.pk, short_url.updated_at, short_url.click_count, checked_at,
+            short_domains.snapshot().for_user(short_url.user_id),
+        )
+        last_modified = max(
+            filter(None, (short_url.updated_at, short_url.last_clicked_at, checked_at))
+        )
+        return self.conditional_response(request, parts, last_modified, build)
+
+
+class ShortURLTimeseriesView(ConditionalGetMixin, APIView):
+    """
+    GET /api/urls/{id}/analytics/timeseries/?from=&to=&granularity= —
+    clicks per hour, day, week or month.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, url_id):
+        query = TimeseriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        short_url = selectors.get_short_url_by_id(url_id=url_id, user=request.user)
+        if short_url is None:
+            return Response(
+                {"error": "Not found.", "code": "NOT_FOUND"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        def build():
+            data = selectors.get_click_timeseries(short_url=short_url, **query.validated_data)
+            return Response(TimeseriesSerializer(data).data, status=status.HTTP_200_OK)
+
+        # Validators as for the link's analytics, plus the buckets asked
+        # for (a default ``to`` of "now" only changes them per bucket).
+        start, end, granularity = (
+            query.validated_data[name] for name in ("start", "end", "granularity")
+        )
+        first = timeseries.floor(start, granularity)
+        parts = (
+            short_url.pk, short_url.updated_at, short_url.click_count,
+            granularity, first, timeseries.bucket_count(first, end, granularity),
+        )
+        last_modified = max(filter(None, (short_url.updated_at, short_url.last_clicked_at)))
+        return self.conditional_response(request, parts, last_modified, build)
+
+
+class AccountAnalyticsView(ConditionalGetMixin, APIView):
+    """GET /api/urls/analytics/ — click totals, top links and daily clicks for the account."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = AccountAnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        def build():
+            data = selectors.get_account_analytics(user=request.user, **query.validated_data)
+            return Response(AccountAnalyticsSerializer(data).data, status=status.HTTP_200_OK)
+
+        # Same inputs as the link list plus the leaderboard watermark, the
+        # query and the day the series ends on.
+        parts, last_modified = selectors.get_account_analytics_freshness(user=request.user)
+        parts = (*parts, *sorted(query.validated_data.items()), timezone.localdate())
+        return self.conditional_response(request, parts, last_modified, build)
+
+
+class TopLinksView(APIView):
+    """GET /api/urls/top/ — the user's most-clicked links (``?limit=10``)."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = TopLinksQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        links = selectors.get_top_links(user=request.user, **query.validated_data)
+        return Response(
+            ShortURLResponseSerializer(links, many=True).data, status=status.HTTP_200_OK
+        )
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients send ``Accept: text/event-stream``; errors become an ``error`` event."""
+
+    media_type = "text/event-stream"
+    format = "sse"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"event: error\ndata: " + JSONRenderer().render(data) + b"\n\n"
+
+
+class ClickStreamMixin:
+    """
+    Serve ``text/event-stream`` of ``click`` events for the given topics.
+
+    Each frame's data is a ``ClickEventSerializer`` payload plus
+    ``short_url`` and ``clicks`` (the counter delta, always 1). Streams
+    close after ``CLICK_STREAM_MAX_SECONDS``; ``EventSource`` reconnects.
+    Under WSGI a stream ties up a request thread, so they are only served
+    up to ``CLICK_STREAM_WSGI_MAX_SUBSCRIBERS`` (501 when that is 0).
+    """
+
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def stream_response(self, request, *topics):
+        sync = not isinstance(request._request, ASGIRequest)
+        if sync and click_stream.max_sync_subscribers <= 0:
+            raise ClickStreamUnavailable()
+        subscription = click_stream.subscribe(*topics, sync=sync)
+        if subscription is None:
+            raise ClickStreamBusy()
+        body = iter_sse(subscription) if sync else aiter_sse(subscription)
+        response = StreamingHttpResponse(body, content_type="text/event-stream")
+        add_never_cache_headers(response)
+        # Ask nginx-style proxies not to buffer the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class AccountClickStreamView(ClickStreamMixin, APIView):
+    """GET /api/urls/stream/ — live clicks on all of the user's links."""
+
+    def get(self, request):
+        return self.stream_response(request, ("user", request.user.pk))
+
+
+class ShortURLClickStreamView(ClickStreamMixin, APIView):
+    """GET /api/urls/{id}/stream/ — live clicks on one URL."""
+
+    def get(self, request, url_id):
+        short_url = selectors.get_short_url_by_id(url_id=url_id, user=request.user)
+        if short_url is None:
+            return Response(
+                {"error": "Not found.", "code": "NOT_FOUND"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return self.stream_response(request, ("link", short_url.pk))
+
+
+class ExportMixin:
+    """
+    Stream rows as a download.
+
+    ``?fmt=csv`` (default) or ``?fmt=ndjson``; add ``?compress=gzip`` for a
+    gzip file. (``format`` is left to DRF's content negotiation.)
+    """
+
+    def export_response(self, request, *, filename: str, header, rows):
+        export_format = request.query_params.get("fmt", "csv")
+        if export_format not in exports.EXPORT_FORMATS:
+            raise ValidationError(
+                {"fmt": [f"Must be one of: {', '.join(exports.EXPORT_FORMATS)}."]}
+            )
+        gzip = request.query_params.get("compress") == "gzip"
+        filename = f"{filename}.{export_format}" + (".gz" if gzip else "")
+        response = StreamingHttpResponse(
+            exports.encode(export_format, header, rows, gzip=gzip),
+            content_type="application/gzip" if gzip else exports.EXPORT_FORMATS[export_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ShortURLExportView(ExportMixin, APIView):
+    """GET /api/urls/export/ — stream all of the user's links."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        prefix = short_domains.snapshot().for_user(request.user.pk)
+        rows = (
+            (short_key, prefix + short_key, *rest)
+            for short_key, *rest in selectors.iter_user_links_for_export(user=request.user)
+        )
+        header = ("short_key", "short_url", "original_url", *selectors.LINK_EXPORT_COLUMNS[2:])
+        return self.export_response(request, filename="links", header=header, rows=rows)
+
+
+class ClickEventExportView(ExportMixin, APIView):
+    """GET /api/urls/{id}/clicks/export/ — stream every click on a URL."""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, url_id):
+        short_url = selectors.get_short_url_by_id(url_id=url_id, user=request.user)
+        if short_url is None:
+            return Response(
+                {"error": "Not found.", "code": "NOT_FOUND"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return self.export_response(
+            request,
+            filename=f"clicks-{short_url.short_key}",
+            header=selectors.CLICK_EXPORT_COLUMNS,
+            rows=selectors.iter_click_events_for_export(short_url=short_url),
+        )
+
+
+class ColumnarExportView(APIView):
+    """
+    GET /api/urls/clicks/export/?dataset=clicks|rollups&fmt=parquet|arrow&from=&to=
+    — the user's click history (or link rollups) as a Parquet or Arrow file.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = ColumnarExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        if not columnar.available():
+            raise ExportFormatUnavailable()
+        dataset, export_format = query.validated_data["dataset"], query.validated_data["fmt"]
+        rows = columnar.iter_dataset(
+            dataset,
+            start=query.validated_data["start"],
+            end=query.validated_data["end"],
+            user=request.user,
+        )
+        response = StreamingHttpResponse(
+            columnar.encode(export_format, dataset, rows),
+            content_type=columnar.COLUMNAR_FORMATS[export_format],
+        )
+        filename = f"{dataset}.{columnar.FILE_EXTENSIONS[export_format]}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
 
 
 class ShortURLQRCodeView(APIView):
@@ -124,8 +426,7 @@ class ShortURLQRCodeView(APIView):
                 {"error": "Not found.", "code": "NOT_FOUND"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        full_url = build_short_url(short_url.short_key)
-        image_bytes = generate_qr_code(full_url)
+        image_bytes = services.get_qr_code(short_url.short_key, user_id=short_url.user_id)
         return HttpResponse(image_bytes, content_type="image/png")
 
 
@@ -138,19 +439,39 @@ class RedirectView(APIView):
 
     permission_classes = [AllowAny]
     authentication_classes = []  # skip JWT lookup for speed
-    throttle_classes = []  # public redirects must not be throttled
+    # A single renderer keeps DRF from adding ``Vary: Accept``, which would
+    # split edge-cached redirects per Accept header.
+    renderer_classes = [JSONRenderer]
+    # Only 404s count against the throttle, so normal traffic is never
+    # limited; a client over the miss limit (a key scanner) is refused
+    # everything, working links included, until its window slides.
+    throttle_classes = [RedirectNotFoundThrottle]
 
     def get(self, request, short_key):
-        original_url = services.resolve_and_track(
+        link = services.resolve_and_track(
             short_key=short_key,
             request=request,
+            tenant=short_domains.tenant_for_host(split_domain_port(request.get_host())[0]),
         )
-        if original_url is None:
+        if link is None:
+            for throttle in self.get_throttles():
+                throttle.record_miss(request, self)
             return Response(
                 {"error": "Short URL not found.", "code": "NOT_FOUND"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        return Response(
-            status=status.HTTP_302_FOUND,
-            headers={"Location": original_url},
-        )
+        if link.redirect_type == ShortURL.RedirectType.PERMANENT:
+            status_code = status.HTTP_301_MOVED_PERMANENTLY
+        else:
+            status_code = status.HTTP_302_FOUND
+        response = Response(status=status_code, headers={"Location": link.original_url})
+
+        # Cacheable redirects are absorbed by browsers/CDNs — and so are
+        # their clicks. Exact-analytics links must reach us every time.
+        max_age = services.redirect_cache_seconds(link)
+        if max_age:
+            patch_response_headers(response, cache_timeout=max_age)
+            patch_cache_control(response, public=True)
+        else:
+            add_never_cache_headers(response)
+        return response
@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_at", "duration_ms", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("=name",)
+    ordering = ("-id",)
+    readonly_fields = (
+        "attempts", "last_error", "locked_by", "created_at", "started_at", "finished_at",
+        "duration_ms",
+    )
+    show_full_result_count = False
+    actions = ["requeue"]
+
+    @admin.action(description="Run selected tasks again")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=Task.Status.RUNNING).update(
+            status=Task.Status.QUEUED, run_at=timezone.now(), attempts=0, locked_by=""
+        )
+        self.message_user(request, f"Queued {updated} task(s).")
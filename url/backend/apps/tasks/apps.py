@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TasksConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.tasks"
+    verbose_name = "Background tasks"
+
+    def ready(self):
+        # Register every app's ``tasks`` module with the task registry.
+        autodiscover_modules("tasks")
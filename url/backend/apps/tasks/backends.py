@@ -0,0 +1,110 @@
+"""
+Where ``TaskSpec.delay`` sends work (``TASKS_BACKEND``).
+
+• ``database`` — a ``Task`` row on the primary, written in the caller's
+  transaction, run by ``python manage.py run_tasks`` workers with retries
+  and cross-worker concurrency limits. Survives restarts.
+• ``local`` — an in-process thread pool (``TASKS_LOCAL_THREADS``; ``0``
+  runs inline), started when the caller's transaction commits. Needs no
+  broker or worker process and keeps slow work off request threads, but
+  queued work is lost if the process exits, and countdowns and retry
+  back-offs wait inside a pool thread.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.logging import tasks_logger as logger
+
+
+class DatabaseBackend:
+    def enqueue(self, spec, kwargs: dict, *, countdown: float = 0) -> None:
+        from .models import Task
+
+        Task.objects.create(
+            name=spec.name,
+            kwargs=kwargs,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+            max_attempts=spec.max_attempts,
+        )
+
+
+class LocalBackend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._semaphores = {}
+
+    def enqueue(self, spec, kwargs: dict, *, countdown: float = 0) -> None:
+        transaction.on_commit(partial(self._submit, spec, kwargs, countdown))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _submit(self, spec, kwargs: dict, countdown: float) -> None:
+        threads = settings.TASKS_LOCAL_THREADS
+        if threads <= 0:
+            self._run(spec, kwargs, countdown)
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(threads, thread_name_prefix="tasks")
+            self._executor.submit(self._run_in_thread, spec, kwargs, countdown)
+
+    def _run_in_thread(self, spec, kwargs: dict, countdown: float) -> None:
+        try:
+            self._run(spec, kwargs, countdown)
+        finally:
+            close_old_connections()
+
+    def _run(self, spec, kwargs: dict, countdown: float) -> None:
+        if countdown:
+            time.sleep(countdown)
+        for attempt in range(1, spec.max_attempts + 1):
+            try:
+                with self._semaphore(spec):
+                    spec.execute(kwargs)
+                return
+            except Exception:
+                if attempt == spec.max_attempts:
+                    logger.exception("Task %s failed after %d attempt(s).", spec.name, attempt)
+                    return
+                delay = spec.retry_delay(attempt)
+                logger.warning(
+                    "Task %s failed; retrying in %.0fs.", spec.name, delay, exc_info=True
+                )
+                time.sleep(delay)
+
+    def _semaphore(self, spec):
+        if not spec.concurrency:
+            return nullcontext()
+        with self._lock:
+            if spec.name not in self._semaphores:
+                self._semaphores[spec.name] = threading.BoundedSemaphore(spec.concurrency)
+            return self._semaphores[spec.name]
+
+
+database_backend = DatabaseBackend()
+local_backend = LocalBackend()
+BACKENDS = {"database": database_backend, "local": local_backend}
+
+
+def get_backend():
+    try:
+        return BACKENDS[settings.TASKS_BACKEND]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"TASKS_BACKEND must be one of {', '.join(BACKENDS)}, not {settings.TASKS_BACKEND!r}."
+        ) from None
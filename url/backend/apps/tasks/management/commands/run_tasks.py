@@ -0,0 +1,58 @@
+"""
+Run background tasks queued with the database backend::
+
+    python manage.py run_tasks --concurrency 4
+
+Also queues periodic tasks when they are due, so run at least one worker
+wherever maintenance should happen. Stops cleanly on SIGTERM/SIGINT after
+the running tasks finish. ``--once`` runs what is due and exits (for cron
+or tests).
+"""
+
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.tasks.metrics import task_stats
+from apps.tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks and schedule periodic ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.TASKS_WORKER_CONCURRENCY,
+            help="Tasks run at once by this worker.",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.TASKS_POLL_SECONDS,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Run the tasks that are due, then exit."
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options["concurrency"], poll_interval=options["poll_interval"]
+        )
+        if options["once"]:
+            worker.schedule_periodic()
+            worker.requeue_expired()
+            try:
+                ran = worker.drain()
+            finally:
+                worker.close()
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} task(s)."))
+            for name, entry in sorted(task_stats().items()):
+                self.stdout.write(
+                    f"  {name}: {entry['runs']} run(s), {entry['failures']} failed, "
+                    f"avg {entry['ms_avg']:.1f}ms, max {entry['ms_max']:.1f}ms"
+                )
+            return
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: worker.stop())
+        worker.run()
@@ -0,0 +1,57 @@
+"""
+Per-process task timings, readable with ``task_stats()``.
+
+Every attempt — by a ``run_tasks`` worker or the local backend — is
+recorded here (and, for queued tasks, in ``Task.duration_ms``). Workers
+log the snapshot when they stop.
+"""
+
+import threading
+
+from django.conf import settings
+
+from core.logging import tasks_logger as logger
+
+
+class TaskStats:
+    """Thread-safe run, failure and duration counters per task name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tasks.clear()
+
+    def record(self, name: str, elapsed_ms: float, *, ok: bool) -> None:
+        with self._lock:
+            entry = self._tasks.setdefault(
+                name, {"runs": 0, "failures": 0, "ms_total": 0.0, "ms_max": 0.0}
+            )
+            entry["runs"] += 1
+            entry["failures"] += not ok
+            entry["ms_total"] += elapsed_ms
+            entry["ms_max"] = max(entry["ms_max"], elapsed_ms)
+        if elapsed_ms >= settings.TASKS_SLOW_MS:
+            logger.warning("Slow task: %s %.1fms", name, elapsed_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "runs": entry["runs"],
+                    "failures": entry["failures"],
+                    "ms_avg": entry["ms_total"] / entry["runs"],
+                    "ms_max": entry["ms_max"],
+                }
+                for name, entry in self._tasks.items()
+            }
+
+
+stats = TaskStats()
+
+
+def task_stats() -> dict:
+    """Return this process's task metrics."""
+    return stats.snapshot()
@@ -0,0 +1,44 @@
+"""
+Background task queue — one row per queued, running or finished task.
+"""
+
+from django.db import models
+
+
+class Task(models.Model):
+    """
+    A call of a registered task, waiting for, running in or done with a
+    ``run_tasks`` worker. Always stored on the primary database.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    # Earliest time the task may start; pushed back between retries.
+    run_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    last_error = models.TextField(blank=True, default="")
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Wall time of the last attempt.
+    duration_ms = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        db_table = "tasks"
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="idx_task_status_run_at"),
+            models.Index(fields=["name", "created_at"], name="idx_task_name_created"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,96 @@
+"""
+Task registration.
+
+Functions become tasks with the ``task`` decorator; each app's ``tasks``
+module is imported at start-up (``TasksConfig.ready``) so every process —
+web or worker — knows the same names::
+
+    from apps.tasks.registry import task
+
+    @task(max_attempts=3, every=3600, concurrency=1)
+    def sweep_expired_links():
+        ...
+
+    sweep_expired_links.delay()           # run in the background
+    sweep_expired_links.delay(countdown=60, **kwargs)
+    sweep_expired_links()                 # run now, in this thread
+
+Keyword arguments must be JSON-serialisable: with the database backend
+they are stored on the ``Task`` row.
+"""
+
+import time
+
+from .metrics import stats
+
+registry = {}
+
+
+class TaskSpec:
+    """A registered task and its execution policy."""
+
+    def __init__(
+        self,
+        func,
+        *,
+        name: str,
+        max_attempts: int = 1,
+        retry_backoff: float = 10.0,
+        concurrency: int | None = None,
+        every: float | None = None,
+    ):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        # Seconds before the first retry; doubled for each further attempt.
+        self.retry_backoff = retry_backoff
+        # Most attempts of this task running at once, across all workers.
+        self.concurrency = concurrency
+        # Period in seconds for tasks that ``run_tasks`` schedules itself.
+        self.every = every
+        self.__doc__ = func.__doc__
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def __repr__(self) -> str:
+        return f"<TaskSpec {self.name}>"
+
+    def delay(self, *, countdown: float = 0, **kwargs) -> None:
+        """Queue a call with *kwargs* on the configured backend."""
+        from .backends import get_backend
+
+        get_backend().enqueue(self, kwargs, countdown=countdown)
+
+    def retry_delay(self, attempt: int) -> float:
+        """Seconds to wait after failed *attempt* (1-based)."""
+        return self.retry_backoff * 2 ** (attempt - 1)
+
+    def execute(self, kwargs: dict) -> float:
+        """Run once, recording the timing; returns the elapsed milliseconds."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            self.func(**kwargs)
+            ok = True
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats.record(self.name, elapsed_ms, ok=ok)
+        return elapsed_ms
+
+
+def task(func=None, *, name: str | None = None, **options):
+    """Register *func* as a task; see ``TaskSpec`` for *options*."""
+
+    def register(func):
+        spec = TaskSpec(func, name=name or f"{func.__module__}.{func.__name__}", **options)
+        if registry.get(spec.name, spec).func is not func:
+            raise ValueError(f"Task {spec.name!r} is already registered.")
+        registry[spec.name] = spec
+        return spec
+
+    return register(func) if func is not None else register
+
+
+def periodic_tasks() -> list[TaskSpec]:
+    return [spec for spec in registry.values() if spec.every]
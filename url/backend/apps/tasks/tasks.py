@@ -0,0 +1,26 @@
+"""
+Housekeeping for the task queue itself.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Task
+from .registry import task
+
+PURGE_BATCH_SIZE = 5_000
+
+
+@task(every=86_400, concurrency=1)
+def purge_finished_tasks() -> int:
+    """Delete tasks that finished more than ``TASKS_RESULT_TTL_DAYS`` ago."""
+    cutoff = timezone.now() - timedelta(days=settings.TASKS_RESULT_TTL_DAYS)
+    finished = Task.objects.filter(
+        status__in=(Task.Status.SUCCEEDED, Task.Status.FAILED), finished_at__lt=cutoff
+    )
+    removed = 0
+    while batch := list(finished.values_list("pk", flat=True)[:PURGE_BATCH_SIZE]):
+        removed += Task.objects.filter(pk__in=batch).delete()[0]
+    return removed
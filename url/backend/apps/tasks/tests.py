@@ -0,0 +1,195 @@
+"""
+Tests for the background task runner — registry, backends and worker.
+"""
+
+import io
+import threading
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.tasks.backends import local_backend
+from apps.tasks.metrics import stats, task_stats
+from apps.tasks.models import Task
+from apps.tasks.registry import registry, task
+from apps.tasks.tasks import purge_finished_tasks
+from apps.tasks.worker import Worker
+
+calls = []
+
+
+@task(name="tests.record")
+def record(*, value):
+    calls.append(value)
+
+
+@task(name="tests.flaky", max_attempts=2, retry_backoff=60)
+def flaky():
+    calls.append("flaky")
+    raise RuntimeError("boom")
+
+
+@task(name="tests.limited", concurrency=1)
+def limited():
+    calls.append("limited")
+
+
+@task(name="tests.hourly", every=3_600)
+def hourly():
+    calls.append("hourly")
+
+
+def queued(name, **fields):
+    return Task.objects.create(name=name, run_at=timezone.now(), **fields)
+
+
+@override_settings(TASKS_BACKEND="database")
+class WorkerTests(TestCase):
+    """Database backend and the ``run_tasks`` worker."""
+
+    def setUp(self):
+        calls.clear()
+        stats.reset()
+        self.worker = Worker(name="test-worker")
+
+    def test_delay_queues_a_row(self):
+        record.delay(value=1, countdown=30)
+        queued_task = Task.objects.get()
+        self.assertEqual((queued_task.name, queued_task.kwargs), ("tests.record", {"value": 1}))
+        self.assertGreater(queued_task.run_at, timezone.now())
+        self.assertEqual(self.worker.drain(), 0)  # not due yet
+
+    def test_runs_due_tasks_and_records_timing(self):
+        record.delay(value=1)
+        record.delay(value=2)
+        self.assertEqual(self.worker.drain(), 2)
+        self.assertEqual(calls, [1, 2])
+        done = Task.objects.get(kwargs={"value": 1})
+        self.assertEqual((done.status, done.attempts), (Task.Status.SUCCEEDED, 1))
+        self.assertIsNotNone(done.duration_ms)
+        self.assertEqual(task_stats()["tests.record"]["runs"], 2)
+
+    def test_retries_with_backoff_then_fails(self):
+        with self.assertLogs("apps.tasks", level="WARNING"):
+            flaky.delay()
+            self.worker.drain()
+        retry = Task.objects.get()
+        self.assertEqual((retry.status, retry.attempts), (Task.Status.QUEUED, 1))
+        self.assertIn("RuntimeError: boom", retry.last_error)
+        self.assertGreater(retry.run_at, timezone.now() + timedelta(seconds=50))
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs("apps.tasks", level="ERROR"):
+            self.worker.drain()
+        failed = Task.objects.get()
+        self.assertEqual((failed.status, failed.attempts), (Task.Status.FAILED, 2))
+        self.assertEqual(calls, ["flaky", "flaky"])
+        self.assertEqual(task_stats()["tests.flaky"]["failures"], 2)
+
+    def test_unknown_tasks_fail(self):
+        queued("tests.missing")
+        with self.assertLogs("apps.tasks", level="ERROR"):
+            self.worker.drain()
+        self.assertEqual(Task.objects.get().status, Task.Status.FAILED)
+
+    def test_concurrency_limit(self):
+        queued("tests.limited", status=Task.Status.RUNNING, started_at=timezone.now())
+        queued("tests.limited")
+        self.assertEqual(self.worker.drain(), 0)
+        Task.objects.filter(status=Task.Status.RUNNING).update(status=Task.Status.SUCCEEDED)
+        self.assertEqual(self.worker.drain(), 1)
+
+    @override_settings(TASKS_LEASE_SECONDS=60)
+    def test_expired_leases_are_requeued(self):
+        long_ago = timezone.now() - timedelta(minutes=5)
+        lost = queued(
+            "tests.record", kwargs={"value": 3}, status=Task.Status.RUNNING,
+            started_at=long_ago, attempts=1, max_attempts=2,
+        )
+        spent = queued(
+            "tests.record", kwargs={"value": 4}, status=Task.Status.RUNNING,
+            started_at=long_ago, attempts=1, max_attempts=1,
+        )
+        with self.assertLogs("apps.tasks", level="WARNING"):
+            self.assertEqual(self.worker.requeue_expired(), 2)
+        lost.refresh_from_db()
+        spent.refresh_from_db()
+        self.assertEqual((lost.status, spent.status), (Task.Status.QUEUED, Task.Status.FAILED))
+        self.worker.drain()
+        self.assertEqual(calls, [3])
+
+    def test_periodic_tasks_are_queued_once_per_period(self):
+        self.worker.schedule_periodic()
+        Worker(name="other-worker").schedule_periodic()
+        self.assertEqual(Task.objects.filter(name="tests.hourly").count(), 1)
+        Task.objects.filter(name="tests.hourly").update(
+            created_at=timezone.now() - timedelta(hours=2)
+        )
+        Worker(name="third-worker").schedule_periodic()
+        self.assertEqual(Task.objects.filter(name="tests.hourly").count(), 2)
+
+    def test_run_tasks_once(self):
+        record.delay(value=5)
+        out = io.StringIO()
+        call_command("run_tasks", "--once", "--concurrency", "1", stdout=out)
+        self.assertIn("tests.record: 1 run(s)", out.getvalue())
+        self.assertIn(5, calls)
+
+    def test_purge_finished_tasks(self):
+        old = timezone.now() - timedelta(days=30)
+        queued("tests.record", status=Task.Status.SUCCEEDED, finished_at=old)
+        queued("tests.record", status=Task.Status.FAILED, finished_at=old)
+        queued("tests.record", status=Task.Status.SUCCEEDED, finished_at=timezone.now())
+        self.assertEqual(purge_finished_tasks(), 2)
+        self.assertEqual(Task.objects.count(), 1)
+
+
+class LocalBackendTests(TestCase):
+    """The in-process backend — no worker, no broker."""
+
+    def setUp(self):
+        calls.clear()
+
+    @override_settings(TASKS_BACKEND="local", TASKS_LOCAL_THREADS=0)
+    def test_runs_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            record.delay(value=1)
+            self.assertEqual(calls, [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_BACKEND="local", TASKS_LOCAL_THREADS=2)
+    def test_runs_off_the_calling_thread(self):
+        seen = []
+
+        @task(name="tests.thread")
+        def which_thread():
+            seen.append(threading.current_thread().name)
+
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                which_thread.delay()
+            local_backend.shutdown()
+        finally:
+            del registry["tests.thread"]
+        self.assertTrue(seen[0].startswith("tasks"))
+
+    @override_settings(TASKS_BACKEND="local", TASKS_LOCAL_THREADS=0)
+    def test_retries(self):
+        flaky.retry_backoff = 0
+        try:
+            with self.assertLogs("apps.tasks", level="WARNING") as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    flaky.delay()
+        finally:
+            flaky.retry_backoff = 60
+        self.assertEqual(calls, ["flaky", "flaky"])
+        self.assertIn("failed after 2 attempt(s)", logs.output[-1])
+
+    def test_duplicate_names_are_rejected(self):
+        with self.assertRaises(ValueError):
+            task(name="tests.record")(lambda: None)
@@ -0,0 +1,245 @@
+"""
+The ``run_tasks`` worker for the database backend.
+
+Each loop the worker
+
+1. queues any periodic task (``every=``) not created within its period —
+   checked against the ``tasks`` table, so any number of workers agree;
+2. hands tasks left ``running`` past ``TASKS_LEASE_SECONDS`` (a worker
+   died mid-task) back to the queue;
+3. claims due tasks up to its free slots with a conditional ``UPDATE``
+   (``status = queued`` → ``running``), so two workers never run the same
+   row, skipping tasks at their ``concurrency`` limit;
+4. runs them — inline with ``concurrency=1``, else on a thread pool — and
+   records the outcome, retrying failures with exponential back-off until
+   ``max_attempts``.
+
+Concurrency limits are counted from ``running`` rows when claiming; two
+workers claiming in the same instant can briefly exceed one.
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, F
+from django.utils import timezone
+
+from core.logging import tasks_logger as logger
+
+from .backends import database_backend
+from .metrics import task_stats
+from .models import Task
+from .registry import periodic_tasks, registry
+
+# Candidates read per claim, per free slot (some may be taken or limited).
+CLAIM_OVERSCAN = 4
+# Longest wait before re-checking whether a periodic task is due.
+SCHEDULE_RECHECK_SECONDS = 60
+ERROR_MAX_LENGTH = 4_000
+
+
+class Worker:
+    def __init__(self, *, concurrency: int = 1, poll_interval: float = 1.0, name: str = ""):
+        self.concurrency = max(concurrency, 1)
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._next_schedule_check = {}
+        self._executor = (
+            ThreadPoolExecutor(self.concurrency, thread_name_prefix="task-worker")
+            if self.concurrency > 1 else None
+        )
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def run(self) -> None:
+        """Work until ``stop()`` is called."""
+        logger.info("Task worker %s started (concurrency=%d).", self.name, self.concurrency)
+        try:
+            while not self._stopping.is_set():
+                close_old_connections()
+                try:
+                    self.schedule_periodic()
+                    self.requeue_expired()
+                    claimed = self.run_once()
+                except Exception:
+                    logger.exception("Task worker %s loop failed.", self.name)
+                    claimed = 0
+                if not claimed:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+        finally:
+            self.close()
+            logger.info("Task worker %s stopped; stats: %s", self.name, task_stats())
+
+    def drain(self) -> int:
+        """Run due tasks until none are left; returns how many ran."""
+        total = 0
+        while True:
+            claimed = self.run_once()
+            total += claimed
+            if not claimed:
+                with self._lock:
+                    if not self._in_flight:
+                        return total
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wake.set()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    # -- scheduling ----------------------------------------------------------
+
+    def schedule_periodic(self) -> int:
+        """Queue periodic tasks that are due; returns how many were queued."""
+        queued = 0
+        now, clock = timezone.now(), time.monotonic()
+        for spec in periodic_tasks():
+            if self._next_schedule_check.get(spec.name, 0) > clock:
+                continue
+            recent = Task.objects.filter(
+                name=spec.name, created_at__gt=now - timedelta(seconds=spec.every)
+            )
+            if not recent.exists():
+                database_backend.enqueue(spec, {})
+                queued += 1
+            self._next_schedule_check[spec.name] = clock + min(
+                spec.every, SCHEDULE_RECHECK_SECONDS
+            )
+        return queued
+
+    def requeue_expired(self) -> int:
+        """Return tasks whose worker's lease ran out to the queue (or fail them)."""
+        now = timezone.now()
+        expired = Task.objects.filter(
+            status=Task.Status.RUNNING,
+            started_at__lt=now - timedelta(seconds=settings.TASKS_LEASE_SECONDS),
+        )
+        error = "Worker lease expired."
+        failed = expired.filter(attempts__gte=F("max_attempts")).update(
+            status=Task.Status.FAILED, finished_at=now, last_error=error
+        )
+        requeued = expired.update(
+            status=Task.Status.QUEUED, locked_by="", run_at=now, last_error=error
+        )
+        if failed or requeued:
+            logger.warning("Requeued %d and failed %d expired task(s).", requeued, failed)
+        return failed + requeued
+
+    # -- claiming and running ------------------------------------------------
+
+    def run_once(self) -> int:
+        """Claim due tasks for the free slots and start them; returns how many."""
+        with self._lock:
+            free = self.concurrency - self._in_flight
+        tasks = self._claim(free)
+        for task in tasks:
+            if self._executor is None:
+                self._execute(task)
+                continue
+            with self._lock:
+                self._in_flight += 1
+            self._executor.submit(self._execute_in_thread, task)
+        return len(tasks)
+
+    def _claim(self, limit: int) -> list[Task]:
+        if limit <= 0:
+            return []
+        now = timezone.now()
+        candidates = list(
+            Task.objects.filter(status=Task.Status.QUEUED, run_at__lte=now)
+            .order_by("run_at", "id")
+            .values_list("pk", "name")[: limit * CLAIM_OVERSCAN]
+        )
+        limited = {
+            name for _, name in candidates
+            if name in registry and registry[name].concurrency
+        }
+        running = Counter()
+        if limited:
+            running.update(dict(
+                Task.objects.filter(status=Task.Status.RUNNING, name__in=limited)
+                .values_list("name")
+                .annotate(count=Count("id"))
+                .order_by()
+            ))
+
+        claimed = []
+        for pk, name in candidates:
+            spec = registry.get(name)
+            if spec is not None and spec.concurrency and running[name] >= spec.concurrency:
+                continue
+            taken = Task.objects.filter(pk=pk, status=Task.Status.QUEUED).update(
+                status=Task.Status.RUNNING,
+                locked_by=self.name,
+                started_at=now,
+                attempts=F("attempts") + 1,
+            )
+            if taken:
+                claimed.append(pk)
+                running[name] += 1
+                if len(claimed) == limit:
+                    break
+        return list(Task.objects.filter(pk__in=claimed).order_by("run_at", "id"))
+
+    def _execute_in_thread(self, task: Task) -> None:
+        try:
+            self._execute(task)
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._in_flight -= 1
+            self._wake.set()
+
+    def _execute(self, task: Task) -> None:
+        spec = registry.get(task.name)
+        started = time.perf_counter()
+        error = ""
+        try:
+            if spec is None:
+                raise LookupError(f"No task named {task.name!r} is registered.")
+            spec.execute(task.kwargs)
+        except Exception:
+            error = traceback.format_exc()[-ERROR_MAX_LENGTH:]
+        duration_ms = (time.perf_counter() - started) * 1000
+        now = timezone.now()
+        if not error:
+            outcome = {"status": Task.Status.SUCCEEDED, "finished_at": now, "last_error": ""}
+        elif spec is not None and task.attempts < task.max_attempts:
+            delay = spec.retry_delay(task.attempts)
+            outcome = {
+                "status": Task.Status.QUEUED,
+                "run_at": now + timedelta(seconds=delay),
+                "locked_by": "",
+                "last_error": error,
+            }
+            logger.warning(
+                "Task %s #%s failed (attempt %d/%d); retrying in %.0fs.",
+                task.name, task.pk, task.attempts, task.max_attempts, delay,
+            )
+        else:
+            outcome = {"status": Task.Status.FAILED, "finished_at": now, "last_error": error}
+            logger.error(
+                "Task %s #%s failed after %d attempt(s):\n%s",
+                task.name, task.pk, task.attempts, error,
+            )
+        # Only if the row is still ours (not re-queued as expired meanwhile).
+        Task.objects.filter(pk=task.pk, locked_by=self.name, status=Task.Status.RUNNING).update(
+            duration_ms=duration_ms, **outcome
+        )
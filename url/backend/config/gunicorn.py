@@ -0,0 +1,51 @@
+"""
+Gunicorn server hooks.
+
+Used with ``gunicorn -c config/gunicorn.py config.wsgi:application`` for the
+API and redirects (gthread workers), and with
+``gunicorn -c config/gunicorn.py -k uvicorn_worker.UvicornWorker
+config.asgi:application`` for the live click streams: under ASGI an open
+stream waits on the event loop instead of holding a request thread (see
+``apps.shortener.stream``). docker-compose runs both, as ``web`` and
+``stream``.
+"""
+
+ASGI_WORKER_CLASS = "uvicorn_worker.UvicornWorker"
+
+
+def post_worker_init(worker):
+    """
+    Warm per-process redirect caches, start the password hashing pool and
+    the leaderboard flush thread once the Django app is loaded, before the
+    worker accepts requests.
+
+    Database connections are per thread, so the one used here would never
+    serve a request: it is closed, and each request thread connects on its
+    first query (see ``core.db.metrics``).
+
+    Stream workers (``ASGI_WORKER_CLASS``) serve neither redirects nor
+    logins, so they skip all three.
+    """
+    if worker.cfg.worker_class_str == ASGI_WORKER_CLASS:
+        return
+
+    from django.db import connections
+
+    from apps.authentication.hashing import hash_pool
+    from apps.shortener.leaderboard import leaderboard
+    from apps.shortener.services import warm_caches
+
+    warm_caches()
+    hash_pool.start()
+    leaderboard.start()
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    """Flush pending leaderboard counts and log database connection metrics."""
+    from apps.shortener.leaderboard import leaderboard
+    from core.db.metrics import connection_stats, logger
+
+    leaderboard.stop()
+    leaderboard.flush()
+    logger.info("Database connection stats (pid=%s): %s", worker.pid, connection_stats())
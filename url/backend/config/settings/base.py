@@ -6,6 +6,7 @@ are in development.py and production.py.
 """
 
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -47,6 +48,7 @@ LOCAL_APPS = [
     "apps.users",
     "apps.authentication",
     "apps.shortener",
+    "apps.tasks",
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -56,6 +58,8 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 # ---------------------------------------------------------------------------
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Serves /{short_key}/ before URL resolution and the rest of the stack.
+    "apps.shortener.middleware.ShortKeyDispatchMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -86,11 +90,33 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# ---------------------------------------------------------------------------
+# Database routing (see core/db_router.py)
+# ---------------------------------------------------------------------------
+# Environment settings define DATABASES; aliases listed in DATABASE_REPLICAS
+# serve lag-tolerant reads (redirect lookups, link lists, analytics).
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+DATABASE_REPLICAS = []
+# How long reads stay on the primary after a user's write
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=int)
+# Database aliases holding short_urls/click_events (see
+# apps/shortener/sharding.py). Cannot be resized without rebalancing.
+SHORT_URL_SHARDS = ["default"]
+# Connects slower than this are logged (see core/db/metrics.py)
+DB_SLOW_CONNECT_MS = config("DB_SLOW_CONNECT_MS", default=100, cast=int)
+
 # ---------------------------------------------------------------------------
 # Auth
 # ---------------------------------------------------------------------------
 AUTH_USER_MODEL = "users.User"
 
+AUTHENTICATION_BACKENDS = ["apps.authentication.backends.PooledModelBackend"]
+
+# Password hashing runs in a bounded per-process pool (0 = hash inline)
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=2, cast=int)
+PASSWORD_HASH_QUEUE_SIZE = config("PASSWORD_HASH_QUEUE_SIZE", default=16, cast=int)
+PASSWORD_HASH_TIMEOUT_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -139,6 +165,7 @@ REST_FRAMEWORK = {
         "anon_sustained": "100/day",
         "user_burst": "30/minute",
         "user_sustained": "500/day",
+        "redirect_not_found": "30/minute",
     },
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
@@ -148,6 +175,21 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Throttle counters (see core/counters.py). Use SharedMemoryCounterStore to
+# share limits between workers on one host without a shared cache.
+THROTTLE_COUNTER_STORE = config("THROTTLE_COUNTER_STORE", default="core.counters.CacheCounterStore")
+THROTTLE_CACHE_ALIAS = "default"
+# The slot table lives in RAM-backed /dev/shm where the host has it (Linux),
+# otherwise in the temp directory.
+THROTTLE_SHARED_MEMORY_PATH = config(
+    "THROTTLE_SHARED_MEMORY_PATH",
+    default=os.path.join(
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+        "url-shortener-throttle.bin",
+    ),
+)
+THROTTLE_SHARED_MEMORY_SLOTS = 65536
+
 # ---------------------------------------------------------------------------
 # Simple JWT
 # ---------------------------------------------------------------------------
@@ -161,8 +203,15 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_REFRESH_SERIALIZER": "apps.authentication.serializers.TokenRefreshSerializer",
 }
 
+# In-memory blacklist filter (see apps/authentication/blacklist.py)
+TOKEN_BLACKLIST_FILTER_CAPACITY = config("TOKEN_BLACKLIST_FILTER_CAPACITY", default=1_000_000, cast=int)
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = 0.001
+TOKEN_BLACKLIST_RECENT_SIZE = 10_000
+TOKEN_BLACKLIST_SYNC_SECONDS = config("TOKEN_BLACKLIST_SYNC_SECONDS", default=5, cast=int)
+
 # ---------------------------------------------------------------------------
 # CORS
 # ---------------------------------------------------------------------------
@@ -173,7 +222,108 @@ CORS_ALLOWED_ORIGINS = config(
 )
 CORS_ALLOW_CREDENTIALS = True
 
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+# Per-process LocMem: enough for a single development process. Anything run
+# as several processes (gunicorn workers, run_tasks) needs a shared cache;
+# production.py configures Redis and `check --deploy` rejects LocMem.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
 # ---------------------------------------------------------------------------
 # Application constants (overridable via env)
 # ---------------------------------------------------------------------------
 SHORT_URL_BASE = config("SHORT_URL_BASE", default="http://localhost:8000")
+# How often each process reloads users' custom short domains (see
+# apps/shortener/domains.py); custom hosts must also be in ALLOWED_HOSTS
+SHORT_DOMAINS_SYNC_SECONDS = config("SHORT_DOMAINS_SYNC_SECONDS", default=30, cast=float)
+
+# In-memory short_key filter in front of redirect lookups
+SHORT_KEY_FILTER_CAPACITY = config("SHORT_KEY_FILTER_CAPACITY", default=1_000_000, cast=int)
+SHORT_KEY_FILTER_ERROR_RATE = 0.01
+SHORT_KEY_FILTER_SYNC_SECONDS = config("SHORT_KEY_FILTER_SYNC_SECONDS", default=1, cast=int)
+
+# Per-process redirect resolution cache and worker warm-up
+RESOLUTION_CACHE_SIZE = config("RESOLUTION_CACHE_SIZE", default=50_000, cast=int)
+RESOLUTION_CACHE_TTL_SECONDS = config("RESOLUTION_CACHE_TTL_SECONDS", default=60, cast=int)
+WARMUP_LINKS = config("WARMUP_LINKS", default=5_000, cast=int)
+WARMUP_BUDGET_SECONDS = config("WARMUP_BUDGET_SECONDS", default=5, cast=float)
+WARMUP_WINDOW_HOURS = 24
+
+# Click enrichment (see apps/shortener/enrichment.py): parsed user agents
+# kept per process, and an optional offline GeoIP2/GeoLite2 country database
+USER_AGENT_CACHE_SIZE = config("USER_AGENT_CACHE_SIZE", default=10_000, cast=int)
+GEOIP_COUNTRY_DB = config("GEOIP_COUNTRY_DB", default="")
+
+# How long an Idempotency-Key on POST /api/urls/ is remembered (seconds)
+IDEMPOTENCY_KEY_TTL_SECONDS = config("IDEMPOTENCY_KEY_TTL_SECONDS", default=86_400, cast=int)
+
+# Clicks younger than this are left for the next roll_up_clicks run, so one
+# whose transaction commits after a later click's is not skipped (see
+# apps/shortener/rollups.py)
+CLICK_ROLLUP_SETTLE_SECONDS = config("CLICK_ROLLUP_SETTLE_SECONDS", default=10, cast=float)
+
+# How often each gunicorn worker's flush thread copies clicked links' counts
+# into the top-links leaderboard (see apps/shortener/leaderboard.py)
+LEADERBOARD_FLUSH_SECONDS = config("LEADERBOARD_FLUSH_SECONDS", default=5, cast=float)
+
+# Server-Sent Events click streams (see apps/shortener/stream.py). The relay
+# polls click_events for clicks ingested by other processes (0 disables it).
+# MAX_SUBSCRIBERS caps streams served by an ASGI server, where they are
+# async — docker-compose's ``stream`` service (see config/gunicorn.py).
+# Under WSGI each stream holds a request thread for up to
+# CLICK_STREAM_MAX_SECONDS, so the gthread ``web`` workers answer them with
+# 501 by default; if enabled, keep the cap well below the thread count.
+CLICK_STREAM_MAX_SUBSCRIBERS = config("CLICK_STREAM_MAX_SUBSCRIBERS", default=1_000, cast=int)
+CLICK_STREAM_WSGI_MAX_SUBSCRIBERS = config(
+    "CLICK_STREAM_WSGI_MAX_SUBSCRIBERS", default=0, cast=int
+)
+CLICK_STREAM_MAX_PENDING = 1_000
+CLICK_STREAM_HEARTBEAT_SECONDS = 15
+CLICK_STREAM_MAX_SECONDS = config("CLICK_STREAM_MAX_SECONDS", default=300, cast=int)
+CLICK_STREAM_RELAY_SECONDS = config("CLICK_STREAM_RELAY_SECONDS", default=1, cast=float)
+
+# Background tasks (see apps/tasks). "local" runs them on a thread pool in
+# the enqueuing process; "database" queues them for `manage.py run_tasks`
+# workers, which also run the periodic maintenance tasks.
+TASKS_BACKEND = config("TASKS_BACKEND", default="local")
+TASKS_LOCAL_THREADS = config("TASKS_LOCAL_THREADS", default=2, cast=int)
+TASKS_WORKER_CONCURRENCY = config("TASKS_WORKER_CONCURRENCY", default=4, cast=int)
+TASKS_POLL_SECONDS = 1.0
+# A task still running after this long is assumed lost with its worker
+TASKS_LEASE_SECONDS = config("TASKS_LEASE_SECONDS", default=900, cast=int)
+TASKS_SLOW_MS = config("TASKS_SLOW_MS", default=10_000, cast=int)
+TASKS_RESULT_TTL_DAYS = config("TASKS_RESULT_TTL_DAYS", default=7, cast=int)
+
+# Maintenance: expired links are deleted this many days after expiring
+# (0 keeps them, answering 410), and rendered QR codes are cached (seconds)
+EXPIRED_LINK_RETENTION_DAYS = config("EXPIRED_LINK_RETENTION_DAYS", default=0, cast=int)
+QR_CODE_CACHE_SECONDS = config("QR_CODE_CACHE_SECONDS", default=86_400, cast=int)
+
+# Destination health checks (see apps/shortener/health.py): each periodic
+# run probes up to LINK_HEALTH_BATCH_SIZE destinations per shard whose last
+# check is older than the TTL, for at most LINK_HEALTH_RUN_SECONDS.
+# Destinations resolving to private addresses are only probed when allowed.
+LINK_HEALTH_TTL_SECONDS = config("LINK_HEALTH_TTL_SECONDS", default=86_400, cast=int)
+LINK_HEALTH_BATCH_SIZE = config("LINK_HEALTH_BATCH_SIZE", default=1_000, cast=int)
+LINK_HEALTH_RUN_SECONDS = config("LINK_HEALTH_RUN_SECONDS", default=300, cast=float)
+LINK_HEALTH_CONCURRENCY = config("LINK_HEALTH_CONCURRENCY", default=20, cast=int)
+LINK_HEALTH_HOST_INTERVAL_SECONDS = config(
+    "LINK_HEALTH_HOST_INTERVAL_SECONDS", default=1.0, cast=float
+)
+LINK_HEALTH_TIMEOUT_SECONDS = config("LINK_HEALTH_TIMEOUT_SECONDS", default=10, cast=float)
+LINK_HEALTH_ALLOW_PRIVATE = config("LINK_HEALTH_ALLOW_PRIVATE", default=False, cast=bool)
+
+# Django admin on large tables (see core/db/estimates.py): changelists count
+# exactly up to this many rows and use the database's estimate beyond it;
+# the link change page shows this many clicks per inline page
+ADMIN_EXACT_COUNT_LIMIT = config("ADMIN_EXACT_COUNT_LIMIT", default=10_000, cast=int)
+ADMIN_INLINE_CLICKS = 20
+
+# Redirect cacheability for links in "edge" analytics mode (seconds)
+REDIRECT_CACHE_MAX_AGE = config("REDIRECT_CACHE_MAX_AGE", default=300, cast=int)
+REDIRECT_PERMANENT_MAX_AGE = config("REDIRECT_PERMANENT_MAX_AGE", default=86_400, cast=int)
@@ -3,6 +3,8 @@ Development settings — extends base.py.
 Uses SQLite for zero-setup local development.
 """
 
+from decouple import config
+
 from .base import *  # noqa: F401, F403
 
 # ---------------------------------------------------------------------------
@@ -20,6 +22,33 @@ DATABASES = {
     }
 }
 
+# Optional stand-in replica: a second SQLite file (e.g. a copy of db.sqlite3)
+# to exercise replica routing and read-your-writes pinning locally.
+if config("SQLITE_REPLICA_PATH", default=""):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": config("SQLITE_REPLICA_PATH"),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS = ["replica"]
+
+# Optional extra short_urls shards: SQLITE_SHARDS=N adds shard_1 … shard_N
+# as separate SQLite files (migrate each with --database shard_N).
+for _index in range(1, config("SQLITE_SHARDS", default=0, cast=int) + 1):
+    DATABASES[f"shard_{_index}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / f"shard_{_index}.sqlite3",
+    }
+SHORT_URL_SHARDS = ["default", *(alias for alias in DATABASES if alias.startswith("shard_"))]
+
+# ---------------------------------------------------------------------------
+# Click streams — runserver starts a thread per request, so a few
+# synchronous streams cannot starve it
+# ---------------------------------------------------------------------------
+CLICK_STREAM_WSGI_MAX_SUBSCRIBERS = config(
+    "CLICK_STREAM_WSGI_MAX_SUBSCRIBERS", default=8, cast=int
+)
+
 # ---------------------------------------------------------------------------
 # CORS — allow everything in development
 # ---------------------------------------------------------------------------
@@ -3,7 +3,7 @@ Production settings — extends base.py.
 Uses PostgreSQL and hardened security.
 """
 
-from decouple import config
+from decouple import Csv, config
 
 from .base import *  # noqa: F401, F403
 
@@ -15,21 +15,67 @@ DEBUG = False
 # ---------------------------------------------------------------------------
 # Database — PostgreSQL for production
 # ---------------------------------------------------------------------------
+# Connections are per thread: each gunicorn request thread connects on its
+# first query and keeps the connection for the worker's lifetime
+# (DB_CONN_MAX_AGE unset = no limit), so only that first request pays for a
+# connect. CONN_HEALTH_CHECKS replaces a connection the server dropped
+# before it is used, instead of failing the request.
+#
+# DB_POOL_MODE=pgbouncer points workers at PgBouncer in transaction-pooling
+# mode (as docker-compose does): connecting to a local pooler is cheap, the
+# pooler bounds real Postgres connections however many workers and threads
+# run, and server-side cursors (which do not survive transaction pooling)
+# are disabled — streaming exports page by key instead
+# (``apps.shortener.selectors.iter_keyset``), so they stay bounded.
+DB_POOL_MODE = config("DB_POOL_MODE", default="direct")
+_conn_max_age = config("DB_CONN_MAX_AGE", default="")
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql",
         "NAME": config("DB_NAME", default="url_shortener"),
         "USER": config("DB_USER", default="postgres"),
         "PASSWORD": config("DB_PASSWORD"),
         "HOST": config("DB_HOST", default="localhost"),
         "PORT": config("DB_PORT", default="5432"),
-        "CONN_MAX_AGE": 600,
+        "CONN_MAX_AGE": int(_conn_max_age) if _conn_max_age else None,
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": DB_POOL_MODE == "pgbouncer",
         "OPTIONS": {
             "connect_timeout": 10,
         },
     }
 }
 
+# Read replicas — same credentials as the primary, one alias per host.
+for _index, _host in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv()), 1):
+    DATABASES[f"replica_{_index}"] = {
+        **DATABASES["default"],
+        "HOST": _host,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
+# Extra short_urls shards — one alias per host, same credentials. Append
+# only with a rebalancing plan: keys are placed by hash modulo shard count.
+for _index, _host in enumerate(config("DB_SHARD_HOSTS", default="", cast=Csv()), 1):
+    DATABASES[f"shard_{_index}"] = {**DATABASES["default"], "HOST": _host}
+SHORT_URL_SHARDS = ["default", *(alias for alias in DATABASES if alias.startswith("shard_"))]
+
+# ---------------------------------------------------------------------------
+# Cache — shared by every worker process (required)
+# ---------------------------------------------------------------------------
+# Read-your-writes pins, token blacklist watermarks, throttle counters and
+# rendered QR codes are published through the cache;
+# the per-process LocMem default would keep each worker (and the
+# run_tasks process) on its own copy.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("REDIS_URL"),
+    }
+}
+
 # ---------------------------------------------------------------------------
 # Security
 # ---------------------------------------------------------------------------
@@ -7,6 +7,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/auth/", include("apps.authentication.urls")),
     path("api/urls/", include("apps.shortener.urls", namespace="shortener-api")),
-    # Redirect endpoint — must be last to avoid prefix collisions
+    # Redirect endpoint — must be last to avoid prefix collisions. Most
+    # redirects never get here: ShortKeyDispatchMiddleware serves them first.
     path("", include("apps.shortener.redirect_urls", namespace="shortener-redirect")),
 ]
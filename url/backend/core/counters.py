@@ -0,0 +1,154 @@
+"""
+Fixed-memory counter stores for rate limiting.
+
+A counter store exposes two operations — ``get(key)`` and an atomic
+``incr(key, ttl, delta)`` — which is all a sliding-window-counter throttle
+needs. Two backends ship:
+
+• ``CacheCounterStore`` — Django cache ``add``/``incr``. Atomic and shared
+  across workers/hosts with Redis or Memcached; per-process with LocMem.
+• ``SharedMemoryCounterStore`` — a fixed-size, memory-mapped slot table in
+  a local file (``THROTTLE_SHARED_MEMORY_PATH``: under ``/dev/shm`` where
+  it exists, else the temp directory). Shared by every worker on one host
+  without any external service.
+
+The active backend is chosen by ``THROTTLE_COUNTER_STORE`` (dotted path) and
+returned by ``get_counter_store()``.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class CacheCounterStore:
+    """Counters kept in a Django cache alias."""
+
+    def __init__(self, alias: str = "default"):
+        self.cache = caches[alias]
+
+    @classmethod
+    def from_settings(cls):
+        return cls(alias=settings.THROTTLE_CACHE_ALIAS)
+
+    def get(self, key: str) -> int:
+        return self.cache.get(key, 0)
+
+    def incr(self, key: str, ttl: int, delta: int = 1) -> int:
+        if delta > 0 and self.cache.add(key, delta, ttl):
+            return delta
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # Expired between add() and incr().
+            self.cache.set(key, max(delta, 0), ttl)
+            return max(delta, 0)
+
+
+class SharedMemoryCounterStore:
+    """
+    Counters in a memory-mapped file shared by all processes on the host.
+
+    The file is a flat table of *slots* 16-byte records
+    ``(fingerprint: u64, expires_at: u32, count: u32)``. A key hashes to a
+    slot and probes a few neighbours; when they are all live, the entry
+    closest to expiry is evicted, so memory use never grows. Writers
+    serialise on ``flock`` (between processes) plus a thread lock (within
+    one process).
+    """
+
+    RECORD = struct.Struct("<QII")
+    PROBES = 8
+
+    def __init__(self, path: str, slots: int = 65536):
+        self.path = str(path)
+        self.slots = slots
+        self._thread_lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            path=settings.THROTTLE_SHARED_MEMORY_PATH,
+            slots=settings.THROTTLE_SHARED_MEMORY_SLOTS,
+        )
+
+    # -- public API ---------------------------------------------------------
+
+    def get(self, key: str) -> int:
+        fingerprint = self._fingerprint(key)
+        now = int(time.time())
+        with self._locked():
+            for offset in self._probe(fingerprint):
+                fp, expires_at, count = self.RECORD.unpack_from(self._map, offset)
+                if fp == fingerprint and expires_at > now:
+                    return count
+        return 0
+
+    def incr(self, key: str, ttl: int, delta: int = 1) -> int:
+        fingerprint = self._fingerprint(key)
+        now = int(time.time())
+        with self._locked():
+            victim = victim_expiry = None
+            for offset in self._probe(fingerprint):
+                fp, expires_at, count = self.RECORD.unpack_from(self._map, offset)
+                if fp == fingerprint and expires_at > now:
+                    count = max(0, count + delta)
+                    self.RECORD.pack_into(self._map, offset, fp, expires_at, count)
+                    return count
+                if victim is None or expires_at < victim_expiry:
+                    victim, victim_expiry = offset, expires_at
+            count = max(0, delta)
+            self.RECORD.pack_into(self._map, victim, fingerprint, now + ttl, count)
+            return count
+
+    # -- internals ----------------------------------------------------------
+
+    @staticmethod
+    def _fingerprint(key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") | 1  # 0 marks an empty slot
+
+    def _probe(self, fingerprint: int):
+        start = fingerprint % self.slots
+        for i in range(self.PROBES):
+            yield ((start + i) % self.slots) * self.RECORD.size
+
+    def _open(self) -> None:
+        # Re-open after fork: flock only excludes *different* open file
+        # descriptions, so each process needs its own.
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = self.slots * self.RECORD.size
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=None)
+def get_counter_store():
+    """Return the process-wide counter store configured in settings."""
+    return import_string(settings.THROTTLE_COUNTER_STORE).from_settings()
@@ -0,0 +1,52 @@
+"""
+PostgreSQL backend with connection metrics.
+
+Behaves exactly like ``django.db.backends.postgresql`` and additionally
+counts open connections, times every new connection and every checkout
+(getting a usable connection for a request's first query), and counts
+connections dropped by ``CONN_HEALTH_CHECKS`` (see ``core.db.metrics``).
+"""
+
+import time
+
+from django.db.backends.postgresql import base
+
+from core.db.metrics import stats
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def connect(self):
+        started = time.monotonic()
+        super().connect()
+        stats.record_connect(self.alias, (time.monotonic() - started) * 1000)
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            if self.connection is not None:
+                stats.record_close(self.alias)
+
+    def _cursor(self, name=None):
+        if self.connection is not None and (
+            self.health_check_done or not self.health_check_enabled
+        ):
+            return super()._cursor(name)
+        # First query of a request (health check due) or no connection yet.
+        started = time.monotonic()
+        cursor = super()._cursor(name)
+        stats.record_checkout(self.alias, (time.monotonic() - started) * 1000)
+        return cursor
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+        ):
+            return
+
+        if not self.is_usable():
+            stats.record_health_check_failure(self.alias)
+            self.close()
+        self.health_check_done = True
@@ -0,0 +1,51 @@
+"""
+Bounded-cost row counts for very large tables.
+
+``COUNT(*)`` over ``click_events`` reads every row. Pagination only needs
+an exact count when it is small, so ``EstimatedCountPaginator`` counts at
+most ``ADMIN_EXACT_COUNT_LIMIT + 1`` rows and, past that, falls back to
+PostgreSQL's own estimate: ``pg_class.reltuples`` for a whole table, or
+the planner's row estimate for a filtered query. Other backends have no
+estimate: up to the limit they report the exact count, past it
+``ADMIN_EXACT_COUNT_LIMIT + 1``.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset) -> int | None:
+    """PostgreSQL's row estimate for *queryset*, or ``None`` if unavailable."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Exact counts up to ``ADMIN_EXACT_COUNT_LIMIT``, estimates beyond."""
+
+    @cached_property
+    def count(self) -> int:
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        counted = self.object_list.order_by()[: limit + 1].count()
+        if counted <= limit:
+            return counted
+        return max(counted, estimate_count(self.object_list) or 0)
@@ -0,0 +1,101 @@
+"""
+Per-process database connection metrics.
+
+Recorded by the instrumented PostgreSQL backend
+(``core.db.backends.postgresql``) and readable with ``connection_stats()``.
+
+Django connections are per thread, so under gunicorn's threaded workers
+each request thread opens its own connection on its first query and keeps
+it (``CONN_MAX_AGE``); there is nothing useful to open at boot. Keep that
+first connect cheap with a local PgBouncer (``DB_POOL_MODE=pgbouncer``),
+which also bounds real Postgres connections.
+
+• ``open_connections`` / ``open_connections_max`` — the process's pool of
+  live connections across all threads, now and at its peak;
+• ``checkout_ms_*`` — how long requests waited for a usable connection:
+  the ``CONN_HEALTH_CHECKS`` ping on a request's first query, plus the
+  connect when there was none;
+• ``connects`` / ``connect_ms_*`` — new connections; a rising count once
+  every thread is connected means connections are being dropped.
+
+Waits inside PgBouncer for a server connection show up in its own
+``SHOW POOLS`` (``cl_waiting``, ``maxwait``).
+"""
+
+import threading
+
+from django.conf import settings
+
+from core.logging import get_logger
+
+logger = get_logger("db")
+
+
+class ConnectionStats:
+    """Thread-safe connection pool, checkout and health-check counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero the counters; connections still open stay counted."""
+        with self._lock:
+            self.open_connections_max = self.open_connections
+            self.connects = 0
+            self.connect_ms_total = 0.0
+            self.connect_ms_max = 0.0
+            self.checkouts = 0
+            self.checkout_ms_total = 0.0
+            self.checkout_ms_max = 0.0
+            self.health_check_failures = 0
+
+    def record_connect(self, alias: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.connects += 1
+            self.connect_ms_total += elapsed_ms
+            self.connect_ms_max = max(self.connect_ms_max, elapsed_ms)
+            self.open_connections += 1
+            self.open_connections_max = max(self.open_connections_max, self.open_connections)
+        if elapsed_ms >= settings.DB_SLOW_CONNECT_MS:
+            logger.warning("Slow database connect: alias=%s %.1fms", alias, elapsed_ms)
+
+    def record_close(self, alias: str) -> None:
+        with self._lock:
+            self.open_connections = max(self.open_connections - 1, 0)
+
+    def record_checkout(self, alias: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_ms_total += elapsed_ms
+            self.checkout_ms_max = max(self.checkout_ms_max, elapsed_ms)
+
+    def record_health_check_failure(self, alias: str) -> None:
+        with self._lock:
+            self.health_check_failures += 1
+        logger.warning("Database connection failed health check: alias=%s", alias)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "open_connections_max": self.open_connections_max,
+                "checkouts": self.checkouts,
+                "checkout_ms_avg": (
+                    self.checkout_ms_total / self.checkouts if self.checkouts else 0.0
+                ),
+                "checkout_ms_max": self.checkout_ms_max,
+                "connects": self.connects,
+                "connect_ms_avg": self.connect_ms_total / self.connects if self.connects else 0.0,
+                "connect_ms_max": self.connect_ms_max,
+                "health_check_failures": self.health_check_failures,
+            }
+
+
+stats = ConnectionStats()
+
+
+def connection_stats() -> dict:
+    """Return this process's connection metrics."""
+    return stats.snapshot()
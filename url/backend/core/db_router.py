@@ -0,0 +1,100 @@
+"""
+Primary/replica database routing.
+
+All writes — and, by default, all reads — go to the ``default`` (primary)
+database. Reads that tolerate replication lag opt in explicitly::
+
+    ShortURL.objects.using(read_replica(f"user:{user.pk}")).filter(...)
+
+``read_replica`` picks one of ``DATABASE_REPLICAS`` unless one of the given
+*sticky keys* was written recently: ``pin_to_primary`` records those keys
+in the cache for ``REPLICA_STICKY_SECONDS``, so a user who just created or
+edited a link reads it back from the primary (read-your-writes) until the
+replicas have caught up. The next request may land on another worker, so
+pins need a cache shared by all processes (Redis in production).
+
+With no replicas configured every helper returns ``"default"`` and nothing
+touches the cache.
+
+Models of ``SHARDED_APP_LABELS`` may also live on the other aliases in
+``SHORT_URL_SHARDS`` (see ``apps.shortener.sharding``); the router keeps
+their writes and related lookups on the shard an instance came from. New
+instances saved without ``using()`` go to their ``initial_shard`` when the
+model defines one, so rows created through the admin or the shell land
+where lookups will look for them.
+"""
+
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = "default"
+PIN_CACHE_PREFIX = "db_router:pin:"
+SHARDED_APP_LABELS = frozenset({"shortener"})
+
+
+def read_replica(*sticky_keys: str) -> str:
+    """Return the alias to use for a lag-tolerant read."""
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return PRIMARY
+    if sticky_keys and cache.get_many([PIN_CACHE_PREFIX + key for key in sticky_keys]):
+        return PRIMARY
+    return random.choice(replicas)
+
+
+def pin_to_primary(*sticky_keys: str) -> None:
+    """Send reads for *sticky_keys* to the primary for a short while."""
+    if not settings.DATABASE_REPLICAS or not sticky_keys:
+        return
+    cache.set_many(
+        {PIN_CACHE_PREFIX + key: 1 for key in sticky_keys},
+        settings.REPLICA_STICKY_SECONDS,
+    )
+
+
+def _shard_of(model, instance):
+    """The shard *instance* lives (or belongs) on, if *model* is sharded."""
+    if instance is None or model._meta.app_label not in SHARDED_APP_LABELS:
+        return None
+    db = instance._state.db
+    if instance._state.adding:
+        # Assigning a related object (e.g. the owning user) already set
+        # ``_state.db`` to that object's database.
+        db = getattr(instance, "initial_shard", None) or db
+    return db if db in settings.SHORT_URL_SHARDS else None
+
+
+class PrimaryReplicaRouter:
+    """
+    Keep writes on the primary, whatever database an instance was read from.
+
+    Without this, saving an object loaded via ``using(replica)`` would be
+    written back to the replica. Sharded models are the exception: they are
+    written to, and read related rows from, the shard they live on.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        shard = _shard_of(model, instance)
+        if shard is not None:
+            return shard
+        if instance is not None and instance._state.db in settings.DATABASE_REPLICAS:
+            # Related lookups follow the replica they start from.
+            return instance._state.db
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return _shard_of(model, hints.get("instance")) or PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *settings.DATABASE_REPLICAS, *settings.SHORT_URL_SHARDS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
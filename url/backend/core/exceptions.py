@@ -48,6 +48,48 @@ class CustomKeyTaken(APIException):
     default_code = "CUSTOM_KEY_TAKEN"
 
 
+class IdempotencyKeyInProgress(APIException):
+    """Raised when a request with the same Idempotency-Key is still running."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is already in progress."
+    default_code = "IDEMPOTENCY_IN_PROGRESS"
+
+
+class IdempotencyKeyReused(APIException):
+    """Raised when an Idempotency-Key is replayed with a different body."""
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used with a different request."
+    default_code = "IDEMPOTENCY_KEY_REUSED"
+
+
+class AuthenticationBusy(APIException):
+    """Raised when the password hashing pool is saturated."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Authentication is temporarily busy. Please retry shortly."
+    default_code = "AUTH_BUSY"
+
+
+class ClickStreamBusy(APIException):
+    """Raised when this process already serves the maximum number of click streams."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many open click streams. Please retry shortly."
+    default_code = "STREAM_BUSY"
+
+
+class ClickStreamUnavailable(APIException):
+    """Raised when a click stream is requested from a server that does not serve them."""
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "Live click streams are not available on this server."
+    default_code = "STREAM_UNAVAILABLE"
+
+
+class ExportFormatUnavailable(APIException):
+    """Raised when a columnar export is requested but pyarrow is not installed."""
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "Columnar exports are not available on this server."
+    default_code = "EXPORT_FORMAT_UNAVAILABLE"
+
+
 # ---------------------------------------------------------------------------
 # Custom exception handler
 # ---------------------------------------------------------------------------
@@ -24,4 +24,5 @@ def get_logger(name: str) -> logging.Logger:
 # Pre-built loggers for common subsystems
 auth_logger = get_logger("authentication")
 shortener_logger = get_logger("shortener")
+tasks_logger = get_logger("tasks")
 users_logger = get_logger("users")
@@ -0,0 +1,203 @@
+"""
+Tests for core — counter stores, sliding-window throttles, database
+routing and connection metrics.
+"""
+
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import AnonRateThrottle
+
+from apps.shortener import selectors, services
+from core.counters import CacheCounterStore, SharedMemoryCounterStore
+from core.db.estimates import EstimatedCountPaginator, estimate_count
+from core.db.metrics import ConnectionStats
+from core.db_router import PrimaryReplicaRouter, pin_to_primary, read_replica
+from core.throttling import SlidingWindowThrottleMixin
+
+
+class SharedMemoryCounterStoreTests(TestCase):
+    """Fixed-size, file-backed counters."""
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "counters.bin")
+        self.addCleanup(os.remove, self.path)
+
+    def test_incr_and_get(self):
+        store = SharedMemoryCounterStore(self.path, slots=64)
+        self.assertEqual(store.get("a"), 0)
+        self.assertEqual(store.incr("a", ttl=60), 1)
+        self.assertEqual(store.incr("a", ttl=60), 2)
+        self.assertEqual(store.incr("a", ttl=60, delta=-1), 1)
+        self.assertEqual(store.get("a"), 1)
+
+    def test_counts_shared_between_instances(self):
+        first = SharedMemoryCounterStore(self.path, slots=64)
+        second = SharedMemoryCounterStore(self.path, slots=64)
+        first.incr("shared", ttl=60)
+        second.incr("shared", ttl=60)
+        self.assertEqual(first.get("shared"), 2)
+
+    def test_memory_is_bounded(self):
+        store = SharedMemoryCounterStore(self.path, slots=16)
+        for i in range(1000):
+            store.incr(f"key-{i}", ttl=60)
+        self.assertEqual(os.path.getsize(self.path), 16 * store.RECORD.size)
+
+
+class SlidingWindowThrottleTests(TestCase):
+    """Sliding-window counter throttling."""
+
+    def setUp(self):
+        cache.clear()
+        self.now = 60 * 100_000 + 20.0  # 20s into a one-minute window
+
+        class Throttle(SlidingWindowThrottleMixin, AnonRateThrottle):
+            rate = "3/minute"
+            timer = lambda _self: self.now  # noqa: E731
+
+            def get_store(_self):
+                return CacheCounterStore("default")
+
+        self.throttle_class = Throttle
+        self.request = APIRequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+        self.request.user = AnonymousUser()
+
+    def _allow(self):
+        return self.throttle_class().allow_request(self.request, None)
+
+    def test_allows_up_to_limit(self):
+        self.assertEqual([self._allow() for _ in range(4)], [True, True, True, False])
+
+    def test_rejected_requests_are_not_counted(self):
+        for _ in range(10):
+            self._allow()
+        self.now += 60  # previous window full, weight 2/3 → room for one more
+        self.assertEqual([self._allow() for _ in range(2)], [True, False])
+
+    def test_window_slides(self):
+        for _ in range(3):
+            self._allow()
+        self.now += 120
+        self.assertTrue(self._allow())
+
+    def test_wait_is_bounded_by_window(self):
+        throttle = self.throttle_class()
+        for _ in range(4):
+            throttle.allow_request(self.request, None)
+        self.assertLessEqual(throttle.wait(), 40)
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica"], REPLICA_STICKY_SECONDS=5, SHORT_URL_SHARDS=["default"]
+)
+class DatabaseRoutingTests(TestCase):
+    """Replica reads, primary writes and read-your-writes pinning."""
+
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+
+    def test_no_replicas_reads_primary(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(read_replica("user:1"), "default")
+
+    def test_reads_go_to_replica_unless_pinned(self):
+        self.assertEqual(read_replica("user:1"), "replica")
+        pin_to_primary("user:1")
+        self.assertEqual(read_replica("user:1"), "default")
+        self.assertEqual(read_replica("user:2"), "replica")
+
+    def test_writes_always_go_to_primary(self):
+        user = get_user_model()(username="r", email="r@example.com")
+        user._state.db = "replica"
+        self.assertEqual(self.router.db_for_write(type(user), instance=user), "default")
+        self.assertEqual(self.router.db_for_read(type(user), instance=user), "replica")
+        self.assertEqual(self.router.db_for_read(type(user)), "default")
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate("replica", "shortener"))
+        self.assertIsNone(self.router.allow_migrate("default", "shortener"))
+
+    def test_create_pins_owner_and_key_to_primary(self):
+        User = get_user_model()
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="StrongPass123!"
+        )
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="StrongPass123!"
+        )
+        services.create_short_url(
+            user=author, original_url="https://pinned.com", custom_key="pin1111"
+        )
+        self.assertEqual(selectors.get_user_short_urls(user=author).db, "default")
+        self.assertEqual(read_replica("short_key:pin1111"), "default")
+        self.assertEqual(selectors.get_user_short_urls(user=other).db, "replica")
+
+
+class ConnectionStatsTests(TestCase):
+    """Per-process connect timings and health-check counters."""
+
+    @override_settings(DB_SLOW_CONNECT_MS=50)
+    def test_records_connects(self):
+        stats = ConnectionStats()
+        stats.record_connect("default", 10.0)
+        with self.assertLogs("apps.db", level="WARNING"):
+            stats.record_connect("default", 70.0)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["connects"], 2)
+        self.assertEqual(snapshot["connect_ms_avg"], 40.0)
+        self.assertEqual(snapshot["connect_ms_max"], 70.0)
+
+    def test_tracks_pool_size_and_checkout_waits(self):
+        stats = ConnectionStats()
+        stats.record_connect("default", 1.0)
+        stats.record_connect("default", 1.0)
+        stats.record_close("default")
+        stats.record_checkout("default", 2.0)
+        stats.record_checkout("default", 4.0)
+        snapshot = stats.snapshot()
+        self.assertEqual((snapshot["open_connections"], snapshot["open_connections_max"]), (1, 2))
+        self.assertEqual((snapshot["checkouts"], snapshot["checkout_ms_avg"]), (2, 3.0))
+        self.assertEqual(snapshot["checkout_ms_max"], 4.0)
+        stats.reset()
+        self.assertEqual(stats.snapshot()["open_connections_max"], 1)
+
+    def test_records_health_check_failures(self):
+        stats = ConnectionStats()
+        with self.assertLogs("apps.db", level="WARNING"):
+            stats.record_health_check_failure("default")
+        self.assertEqual(stats.snapshot()["health_check_failures"], 1)
+        stats.reset()
+        self.assertEqual(stats.snapshot()["health_check_failures"], 0)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Capped counts for admin changelists."""
+
+    def setUp(self):
+        for i in range(5):
+            get_user_model().objects.create_user(username=f"count{i}", email=f"count{i}@x.com")
+        self.users = get_user_model().objects.order_by("pk")
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=10)
+    def test_exact_below_limit(self):
+        self.assertEqual(EstimatedCountPaginator(self.users, 2).count, 5)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+    def test_count_reads_at_most_limit_plus_one_rows(self):
+        paginator = EstimatedCountPaginator(self.users, 2)
+        with self.assertNumQueries(1) as queries:
+            count = paginator.count
+        # SQLite has no row estimate, so the count stops at the cap.
+        self.assertEqual(count, 4)
+        self.assertIn("LIMIT 4", queries.captured_queries[0]["sql"])
+        self.assertEqual(len(paginator.page(2)), 2)
+
+    def test_no_estimate_off_postgresql(self):
+        self.assertIsNone(estimate_count(self.users))
@@ -3,22 +3,123 @@ Custom throttle classes for the URL shortener project.
 
 Provides burst and sustained rate limits for both anonymous and
 authenticated users, referenced in DRF settings.
+
+DRF's stock throttles keep a list of request timestamps per client and
+rewrite the whole list on every request. These use a *sliding window
+counter* instead: two integer counters per client (this window and the
+previous one), weighted by how far into the current window we are. Memory
+per client is constant and each request is one ``get`` plus one atomic
+``incr`` against the configured counter store (see ``core.counters``).
 """
 
 from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
 
+from .counters import get_counter_store
+
+
+class SlidingWindowThrottleMixin:
+    """
+    Replace ``SimpleRateThrottle``'s timestamp history with two counters.
+
+    Mix in before a ``SimpleRateThrottle`` subclass so its
+    ``get_cache_key`` / rate parsing are reused.
+    """
+
+    def get_store(self):
+        return get_counter_store()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        store = self.get_store()
+        previous_key, current_key = self._window_keys()
+        self.previous = store.get(previous_key)
+        self.current = store.incr(current_key, self.duration * 2)
+        if self._estimate() <= self.num_requests:
+            return self.throttle_success()
+
+        # Rejected requests do not count against the client.
+        store.incr(current_key, self.duration * 2, delta=-1)
+        self.current -= 1
+        return self.throttle_failure()
+
+    def _window_keys(self) -> tuple[str, str]:
+        self.now = self.timer()
+        window, self.elapsed = divmod(self.now, self.duration)
+        window = int(window)
+        return f"{self.key}:{window - 1}", f"{self.key}:{window}"
+
+    def _estimate(self) -> float:
+        weight = 1 - self.elapsed / self.duration
+        return self.previous * weight + self.current
 
-class AnonBurstThrottle(AnonRateThrottle):
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        remaining = self.duration - self.elapsed
+        if self.current + 1 > self.num_requests or not self.previous:
+            return remaining
+        # Time until the previous window's weighted share drops enough to
+        # admit one more request.
+        needed = 1 - (self.num_requests - self.current - 1) / self.previous
+        return max(0.0, min(remaining, needed * self.duration - self.elapsed))
+
+
+class AnonBurstThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
     scope = "anon_burst"
 
 
-class AnonSustainedThrottle(AnonRateThrottle):
+class AnonSustainedThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
     scope = "anon_sustained"
 
 
-class UserBurstThrottle(UserRateThrottle):
+class UserBurstThrottle(SlidingWindowThrottleMixin, UserRateThrottle):
     scope = "user_burst"
 
 
-class UserSustainedThrottle(UserRateThrottle):
+class UserSustainedThrottle(SlidingWindowThrottleMixin, UserRateThrottle):
     scope = "user_sustained"
+
+
+class RedirectNotFoundThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
+    """
+    Per-IP limit on redirect *misses*.
+
+    Only 404s are counted (via ``record_miss``), so clients following real
+    links are never slowed down, while key scanners are cut off with a 429
+    once they exceed the ``redirect_not_found`` rate.
+    """
+
+    scope = "redirect_not_found"
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        store = self.get_store()
+        previous_key, current_key = self._window_keys()
+        self.previous = store.get(previous_key)
+        self.current = store.get(current_key)
+        if self._estimate() < self.num_requests:
+            return True
+        return self.throttle_failure()
+
+    def record_miss(self, request, view) -> None:
+        """Count one 404 against the client."""
+        if self.rate is None:
+            return
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return
+        _, current_key = self._window_keys()
+        self.get_store().incr(current_key, self.duration * 2)
@@ -1,6 +1,13 @@
 import { client } from './client';
 import { ENDPOINTS } from '@/utils/constants';
-import type { ShortURL, Analytics, PaginatedResponse } from '@/types/api';
+import type {
+  ShortURL,
+  Analytics,
+  AccountAnalytics,
+  ClickTimeseries,
+  Granularity,
+  PaginatedResponse,
+} from '@/types/api';
 
 export const urlsApi = {
   list: async () => {
@@ -31,6 +38,16 @@ export const urlsApi = {
     return response.data;
   },
 
+  getTimeseries: async (id: string, params?: { from?: string; to?: string; granularity?: Granularity }) => {
+    const response = await client.get<ClickTimeseries>(ENDPOINTS.URLS.TIMESERIES(id), { params });
+    return response.data;
+  },
+
+  getAccountAnalytics: async (params?: { days?: number; top?: number }) => {
+    const response = await client.get<AccountAnalytics>(ENDPOINTS.URLS.ACCOUNT_ANALYTICS, { params });
+    return response.data;
+  },
+
   getQrCode: async (id: string) => {
       // Return blob for image
     const response = await client.get(ENDPOINTS.URLS.QR_CODE(id), { responseType: 'blob' });
@@ -1,6 +1,7 @@
 import { useEffect } from "react"
 import { ExternalLink } from "lucide-react"
 
+import { Badge } from "@/components/ui/badge"
 import {
   Table,
   TableBody,
@@ -10,8 +11,21 @@ import {
   TableRow,
 } from "@/components/ui/table"
 import { useUrlStore } from "@/store/url-store"
+import type { ShortURL } from "@/types/api"
 import { UrlActions } from "./url-actions"
 
+function HealthBadge({ health }: { health: ShortURL["health"] }) {
+  if (health.status !== "broken" && health.status !== "unreachable") {
+    return null
+  }
+  const detail = health.http_status ? `HTTP ${health.http_status}` : health.error
+  return (
+    <Badge variant="destructive" className="mt-1" title={detail}>
+      {health.status === "broken" ? "Broken" : "Unreachable"}
+    </Badge>
+  )
+}
+
 export function UrlTable() {
   const { urls, loading, fetchUrls } = useUrlStore()
 
@@ -56,6 +70,7 @@ export function UrlTable() {
                     {url.original_url}
                     <ExternalLink className="ml-2 h-3 w-3 opacity-50" />
                 </a>
+                {url.health && <HealthBadge health={url.health} />}
               </TableCell>
               <TableCell>
                 <div className="flex items-center gap-2">
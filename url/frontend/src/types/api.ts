@@ -22,22 +22,61 @@ export interface ShortURL {
   custom_key: string | null;
   click_count: number;
   expires_at: string | null;
+  health: DestinationHealth;
   created_at: string;
   updated_at: string;
 }
 
+export type DestinationHealthStatus = "unchecked" | "ok" | "broken" | "unreachable";
+
+// Last background check of the destination; never probed at request time.
+export interface DestinationHealth {
+  status: DestinationHealthStatus;
+  http_status: number | null;
+  error: string;
+  checked_at: string | null;
+}
+
 export interface ClickEvent {
   id: number;
   ip_address: string;
   user_agent: string;
+  referrer_host: string;
+  device: string;
+  browser: string;
+  os: string;
+  country: string; // ISO 3166-1 alpha-2, empty when unknown
   created_at: string;
   short_url: string; // ID of the short URL
 }
 
+export interface BreakdownEntry {
+  value: string;
+  count: number;
+}
+
 export interface Analytics {
   short_url: ShortURL;
   click_count: number;
   recent_clicks: ClickEvent[];
+  breakdowns: Record<"device" | "browser" | "os" | "country" | "referrer_host", BreakdownEntry[]>;
+}
+
+export interface AccountAnalytics {
+  total_clicks: number;
+  link_count: number;
+  top_links: ShortURL[];
+  clicks_over_time: { date: string; clicks: number }[];
+}
+
+export type Granularity = 'hour' | 'day' | 'week' | 'month';
+
+export interface ClickTimeseries {
+  granularity: Granularity;
+  start: string;
+  end: string;
+  total: number;
+  buckets: { start: string; clicks: number }[];
 }
 
 export interface ApiError {
@@ -17,6 +17,11 @@ export const ENDPOINTS = {
     LIST_CREATE: '/api/urls/',
     DETAIL: (id: string) => `/api/urls/${id}/`,
     ANALYTICS: (id: string) => `/api/urls/${id}/analytics/`,
+    TIMESERIES: (id: string) => `/api/urls/${id}/analytics/timeseries/`,
+    ACCOUNT_ANALYTICS: '/api/urls/analytics/',
+    ACCOUNT_STREAM: '/api/urls/stream/',
+    TOP: '/api/urls/top/',
+    STREAM: (id: string) => `/api/urls/${id}/stream/`,
     QR_CODE: (id: string) => `/api/urls/${id}/qr/`,
     REDIRECT: (key: string) => `/${key}/`,
   },